@@ -0,0 +1,383 @@
+"""热点函数基准测试：用桩交易所和不同规模的合成数据测量交易器热点函数的单次耗时，结果保存为 JSON，
+并可对比两次结果标出性能回退
+
+覆盖: 买入/卖出信号检测、波动率、EMA、ADX、OrderTracker.add_trade/get_statistics、
+日志读取（_read_log_content）、状态接口编码（handle_status）、交易通知格式化（format_trade_message）。
+所有数据写入临时目录，不访问交易所，也不修改 data/ 下的文件。
+
+用法:
+    python benchmarks/hot_paths_benchmark.py [--quick] [--filter ema] [--output results.json]
+    python benchmarks/hot_paths_benchmark.py --compare old.json new.json [--threshold 0.10]
+
+对比模式下中位数和最小值都变慢超过阈值的用例记为回退，存在回退时退出码为 1。
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('OKX_API_KEY', 'benchmark')
+os.environ.setdefault('OKX_SECRET_KEY', 'benchmark')
+os.environ.setdefault('OKX_PASSPHRASE', 'benchmark')
+
+import helpers  # noqa: E402
+import trader as trader_module  # noqa: E402
+import web_server  # noqa: E402
+from circuit_breaker import CircuitBreakers  # noqa: E402
+from config import TradingConfig  # noqa: E402
+from order_tracker import OrderTracker  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+BASE_PRICE = 600.0
+
+# 各用例的数据规模
+SIZES = {
+    'volatility': (24, 168, 720),      # K线根数
+    'ema': (100, 1000, 10000),         # 价格序列长度
+    'adx': (14, 50, 200),              # ADX 周期（请求 周期+10 根K线）
+    'add_trade': (100, 500),           # 已有交易历史条数
+    'statistics': (10, 100, 500),      # 交易历史条数
+    'read_log': (64 * 1024, 1024 * 1024, 16 * 1024 * 1024),  # 日志文件字节数
+    'status': (10, 100, 500),          # 状态中的交易记录条数
+}
+
+
+class StubClock:
+    def now_ms(self):
+        return int(time.time() * 1000)
+
+
+class StubExchange:
+    """桩交易所：返回固定余额和随机游走的合成K线，接口与 ExchangeClient 一致"""
+
+    def __init__(self, price=BASE_PRICE, seed=42):
+        self.price = price
+        self.clock = StubClock()
+        self.circuits = CircuitBreakers(enabled=False)
+        self.candle_feed = None
+        self.klines = synthetic_klines(1000, price, seed)
+
+    async def fetch_ohlcv(self, symbol, timeframe='1H', limit=None):
+        return self.klines[:limit or 100]
+
+    async def fetch_ticker(self, symbol):
+        return {'last': str(self.price)}
+
+    async def fetch_balance(self, params=None):
+        free = {'USDT': 5000.0, 'OKB': 8.0}
+        return {'free': free, 'used': {}, 'total': dict(free)}
+
+    async def fetch_funding_balance(self):
+        return {'USDT': 100.0, 'OKB': 0.5}
+
+    async def fetch_savings_balance(self):
+        return {'USDT': 0.0, 'OKB': 0.0}
+
+    def invalidate_balance_cache(self):
+        pass
+
+
+def synthetic_klines(count, price, seed):
+    """OKX 格式的1小时K线（新 → 旧），收盘价为年化约60%波动的几何随机游走"""
+    rng = random.Random(seed)
+    sigma = 0.6 / math.sqrt(24 * 365)
+    now = int(time.time()) // 3600 * 3600 * 1000
+    rows = []
+    for i in range(count):
+        open_ = price
+        price *= math.exp(rng.gauss(0, sigma))
+        high, low = max(open_, price) * (1 + rng.random() * sigma), min(open_, price) * (1 - rng.random() * sigma)
+        rows.append([str(now - i * 3_600_000), f'{open_:.4f}', f'{high:.4f}', f'{low:.4f}', f'{price:.4f}',
+                     '1000', '1000', f'{1000 * price:.2f}', '1'])
+    return rows
+
+
+def synthetic_trades(count, seed=7):
+    rng = random.Random(seed)
+    base = time.time() - count * 60
+    return [{
+        'timestamp': base + i * 60, 'side': 'buy' if i % 2 == 0 else 'sell',
+        'price': BASE_PRICE * (1 + rng.uniform(-0.05, 0.05)), 'amount': 1.0, 'fee': 0.001, 'fee_ccy': 'OKB',
+        'profit': 0.0 if i % 2 == 0 else rng.uniform(-5, 5), 'order_id': f'bench{i}'
+    } for i in range(count)]
+
+
+TRACKERS = []  # 结束时关闭写线程，临时目录删除前写完
+
+
+def make_tracker(tmp, name, history=0):
+    tracker = OrderTracker(data_dir=os.path.join(tmp, name))
+    tracker.trade_history = synthetic_trades(history)
+    TRACKERS.append(tracker)
+    return tracker
+
+
+def make_trader(tmp):
+    """在桩交易所上构造完整的 GridTrader（订单跟踪器的数据写入临时目录）"""
+    trader_module.OrderTracker = functools.partial(OrderTracker, data_dir=os.path.join(tmp, 'trader'))
+    trader = trader_module.GridTrader(StubExchange(), TradingConfig())
+    trader.base_price = BASE_PRICE
+    trader.grid_size = 2.0
+    trader.initialized = True
+    TRACKERS.append(trader.order_tracker)
+    return trader
+
+
+def write_log(path, size, seed=3):
+    """生成约 size 字节的日志文件，其中约1/4为需要过滤的 httpx 请求日志"""
+    rng = random.Random(seed)
+    lines, total = [], 0
+    while total < size:
+        if rng.random() < 0.25:
+            line = '2024-01-01 12:00:00 [httpx] INFO: HTTP Request: GET https://www.okx.com/api/v5/market/ticker "HTTP/1.1 200 OK"'
+        else:
+            line = f'2024-01-01 12:00:00 [GridTrader] INFO: 买入监测 | 当前价: {rng.uniform(580, 620):.2f} | 触发价: 588.00000'
+        lines.append(line)
+        total += len(line.encode('utf-8')) + 1
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def status_payload(trades):
+    now = time.time()
+    return {
+        'base_price': BASE_PRICE, 'current_price': 601.2345, 'grid_size': 0.02, 'threshold': 0.004,
+        'total_assets': 10234.56, 'usdt_balance': 5123.45, 'coin_balance': 8.5, 'target_order_amount': 1023.45,
+        'trade_history': [{
+            'timestamp': '2024-01-01 12:00:00', 'side': trade['side'], 'price': trade['price'],
+            'amount': trade['amount'], 'profit': trade['profit']
+        } for trade in synthetic_trades(trades)],
+        'last_trade_price': 599.8, 'last_trade_time': now, 'last_trade_time_str': '2024-01-01 12:00:00',
+        'total_profit': 234.56, 'profit_rate': 2.35, 's1_daily_high': 650.0, 's1_daily_low': 520.0,
+        'position_percentage': 49.8, 'grid_upper_band': 612.0, 'grid_lower_band': 588.0,
+        'pnl': {'method': 'fifo', 'position': 8.5, 'cost_basis': 5100.0, 'realized_pnl': 123.4, 'fees': 4.3},
+        'liquidity': {'enabled': True, 'prediction': None, 'top_ups': 0, 'shortfalls': 0},
+        'circuits': {'get_ticker': {'state': 'closed', 'reason': None, 'retry_after': None, 'calls': 12,
+                                    'failures': 0, 'slow': 0, 'trips': 0, 'rejected': 0}}
+    }
+
+
+def build_cases(tmp, quick):
+    """返回 [(用例名, 规模, 函数, 是否异步)]"""
+    trader = make_trader(tmp)
+    lower = BASE_PRICE * (1 - trader.grid_size / 100)
+    upper = BASE_PRICE * (1 + trader.grid_size / 100)
+    _, _, threshold = trader._grid_levels()
+    cases = []
+
+    # 信号检测：价格在网格内（只做比较）、越过轨道后追踪极值、回撤触发并检查余额
+    def signal(side, scenario):
+        check = trader._check_buy_signal if side == 'buy' else trader._check_sell_signal
+        state = {'tick': 0}
+
+        async def run():
+            state['tick'] += 1
+            trader.lowest = trader.highest = None
+            if scenario == 'idle':
+                trader.current_price = BASE_PRICE
+            elif scenario == 'tracking':
+                # 每次都是新的极值，会输出监测日志
+                step = 0.001 * state['tick']
+                trader.current_price = lower - step if side == 'buy' else upper + step
+            else:
+                # 价格仍在轨道外，但已从极值回撤超过阈值
+                if side == 'buy':
+                    trader.current_price, trader.lowest = lower, lower * (1 - 2 * threshold)
+                else:
+                    trader.current_price, trader.highest = upper, upper * (1 + 2 * threshold)
+            await check()
+        return run
+
+    for side in ('buy', 'sell'):
+        for scenario in ('idle', 'tracking', 'trigger'):
+            cases.append((f'check_{side}_signal', scenario, signal(side, scenario), True))
+
+    for size in SIZES['volatility']:
+        async def volatility(size=size):
+            trader.config.VOLATILITY_WINDOW = size
+            await trader._calculate_volatility()
+        cases.append(('calculate_volatility', size, volatility, True))
+
+    for size in SIZES['ema']:
+        data = [float(row[4]) for row in synthetic_klines(size, BASE_PRICE, size)]
+        cases.append(('calculate_ema', size, functools.partial(trader._calculate_ema, data, 26), False))
+
+    for size in SIZES['adx']:
+        cases.append(('get_adx_data', size, functools.partial(trader.get_adx_data, size), True))
+
+    for size in SIZES['add_trade']:
+        tracker = make_tracker(tmp, f'add_trade_{size}', size)
+        counter = {'n': 0}
+
+        def add_trade(tracker=tracker, counter=counter):
+            counter['n'] += 1
+            side = 'buy' if counter['n'] % 2 else 'sell'
+            tracker.add_trade({'timestamp': time.time(), 'side': side, 'price': BASE_PRICE, 'amount': 1.0,
+                               'order_id': f'add{counter["n"]}'})
+        cases.append(('order_tracker_add_trade', size, add_trade, False))
+
+    for size in SIZES['statistics']:
+        tracker = make_tracker(tmp, f'statistics_{size}', size)
+        cases.append(('order_tracker_get_statistics', size, tracker.get_statistics, False))
+
+    log_dir = os.path.join(tmp, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    for size in SIZES['read_log'][:2] if quick else SIZES['read_log']:
+        async def read_log(size=size):
+            web_server.LogConfig.LOG_DIR = os.path.join(log_dir, str(size))
+            await web_server._read_log_content()
+        os.makedirs(os.path.join(log_dir, str(size)), exist_ok=True)
+        write_log(os.path.join(log_dir, str(size), 'trading_system.log'), size)
+        cases.append(('read_log_content', size, read_log, True))
+
+    for size in SIZES['status']:
+        payload = status_payload(size)
+
+        async def status(payload=payload):
+            return payload
+        request = SimpleNamespace(app={'source': SimpleNamespace(status=status)})
+        cases.append(('handle_status', size, functools.partial(web_server.handle_status, request), True))
+
+    for variant, retry in (('plain', None), ('retry', (2, 10))):
+        cases.append(('format_trade_message', variant, functools.partial(
+            helpers.format_trade_message, 'buy', 'OKB/USDT', 601.23, 1.25, 751.54, 2.0, retry
+        ), False))
+    return cases
+
+
+async def measure(func, is_async, repeat, min_time):
+    """自动确定每轮调用次数（每轮至少 min_time 秒），返回每次调用耗时样本（秒）"""
+    async def run(number):
+        start = time.perf_counter()
+        if is_async:
+            for _ in range(number):
+                await func()
+        else:
+            for _ in range(number):
+                func()
+        return time.perf_counter() - start
+
+    number = 1
+    while True:
+        elapsed = await run(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.2))
+    samples = [await run(number) / number for _ in range(repeat)]
+    return samples, number
+
+
+async def run_benchmarks(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = build_cases(tmp, args.quick)
+        for name, size, func, is_async in cases:
+            key = f'{name}[{size}]'
+            if args.filter and args.filter not in key:
+                continue
+            samples, number = await measure(func, is_async, args.repeat, args.min_time)
+            results[key] = {
+                'name': name,
+                'size': size,
+                'median_us': statistics.median(samples) * 1e6,
+                'min_us': min(samples) * 1e6,
+                'stdev_us': statistics.pstdev(samples) * 1e6,
+                'number': number,
+                'repeat': len(samples)
+            }
+            print(f"{key:<48}| 中位数: {results[key]['median_us']:>12.2f}us | 最小: {results[key]['min_us']:>12.2f}us "
+                  f"| 每轮 {number} 次 x {len(samples)} 轮")
+        for tracker in TRACKERS:
+            tracker.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(old_path, new_path, threshold):
+    """对比两次结果，返回回退的用例数"""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)['results']
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)['results']
+    regressions = 0
+    print(f"{'用例':<48}| {'旧(us)':>12} | {'新(us)':>12} | {'变化':>8}")
+    # 按新结果的用例顺序输出，只在旧结果中出现的排在最后
+    for key in list(new) + [key for key in old if key not in new]:
+        if key not in old or key not in new:
+            print(f"{key:<48}| {'仅旧结果' if key in old else '仅新结果'}")
+            continue
+        ratio = new[key]['median_us'] / old[key]['median_us'] if old[key]['median_us'] else math.inf
+        min_ratio = new[key]['min_us'] / old[key]['min_us'] if old[key]['min_us'] else math.inf
+        flag = ''
+        if ratio > 1 + threshold and min_ratio > 1 + threshold:
+            flag = '  ⚠️ 回退'
+            regressions += 1
+        elif ratio < 1 - threshold and min_ratio < 1 - threshold:
+            flag = '  ✅ 提升'
+        print(f"{key:<48}| {old[key]['median_us']:>12.2f} | {new[key]['median_us']:>12.2f} | {(ratio - 1) * 100:>+7.1f}%{flag}")
+    print(f"回退用例: {regressions} 个（阈值 {threshold * 100:.0f}%）")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易器热点函数基准测试')
+    parser.add_argument('--repeat', type=int, default=7, help='每个用例的测量轮数')
+    parser.add_argument('--min-time', type=float, default=0.05, help='每轮的最短耗时（秒）')
+    parser.add_argument('--quick', action='store_true', help='快速模式：3轮、每轮至少10ms，跳过最大的日志文件')
+    parser.add_argument('--filter', help='只运行名称包含该字符串的用例')
+    parser.add_argument('--output', help='结果文件路径，默认 benchmarks/results/hot_paths_<时间>.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='对比两个结果文件')
+    parser.add_argument('--threshold', type=float, default=0.10, help='对比时判定回退的变慢比例')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+
+    if args.quick:
+        args.repeat, args.min_time = 3, 0.01
+    # 只测量函数本身的耗时，不输出交易器日志
+    logging.disable(logging.CRITICAL)
+    results = asyncio.run(run_benchmarks(args))
+    logging.disable(logging.NOTSET)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"hot_paths_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    document = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'min_time': args.min_time
+        },
+        'results': results
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""日志管道基准测试：对比同步写日志与队列异步写日志在调用方线程上的耗时
+
+用法: python benchmarks/log_benchmark.py [--records 20000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import LogConfig, LogHelper  # noqa: E402
+from latency_monitor import LatencyHistogram  # noqa: E402
+
+
+def run_mode(async_mode, records, log_dir):
+    LogConfig.LOG_DIR = log_dir
+    LogConfig.setup_logger(console_output=False, async_mode=async_mode)
+    root = logging.getLogger()
+    pipeline = root.handlers[0]
+    logger = logging.getLogger('GridTrader')
+    hist = LatencyHistogram()
+
+    start = time.perf_counter()
+    for i in range(records):
+        t0 = time.perf_counter()
+        if i % 3 == 0:
+            LogHelper.log_order_execution(logger, 'buy', 1, 5, 180.1234 + i * 0.01, 0.123456, 22.2)
+        elif i % 3 == 1:
+            LogHelper.log_balance_check(logger, '买入', 22.2, 1000.0 - i * 0.001, True)
+        else:
+            logger.info(f"当前价格: {180 + i * 0.0001:.4f} | 网格: 2.00% | 基准价: 180.0000")
+        hist.record_seconds(time.perf_counter() - t0)
+    caller_seconds = time.perf_counter() - start
+
+    stats = pipeline.snapshot()
+    # 关闭时会等待写线程把队列写完，计入总耗时
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    total_seconds = time.perf_counter() - start
+
+    summary = hist.snapshot()
+    print(
+        f"{'异步队列' if async_mode else '同步写入'} | 记录数: {records} | "
+        f"调用方总耗时: {caller_seconds * 1000:.1f}ms | 含落盘总耗时: {total_seconds * 1000:.1f}ms | "
+        f"单次 p50: {summary['p50_ms'] * 1000:.1f}us | p99: {summary['p99_ms'] * 1000:.1f}us | "
+        f"最大: {summary['max_ms']:.2f}ms | 抽样省略: {stats['sampled_out']} | 丢弃: {stats['dropped']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志管道基准测试')
+    parser.add_argument('--records', type=int, default=20000, help='每种模式写入的日志条数')
+    args = parser.parse_args()
+    for async_mode in (False, True):
+        with tempfile.TemporaryDirectory() as log_dir:
+            run_mode(async_mode, args.records, log_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""可选加速基准测试：对比 asyncio / uvloop 的事件循环吞吐，stdlib json / orjson 的状态接口编码、
+交易历史持久化和 SDK 响应解析耗时（未安装的实现会跳过）
+
+用法: python benchmarks/speedups_benchmark.py [--tasks 200000] [--rounds 2000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speedups  # noqa: E402
+
+
+def status_payload():
+    """与 /api/status 结构一致的样例数据"""
+    now = time.time()
+    return {
+        'base_price': 600.0, 'current_price': 601.2345, 'grid_size': 0.02, 'threshold': 0.004,
+        'total_assets': 10234.56, 'usdt_balance': 5123.45, 'coin_balance': 8.5, 'target_order_amount': 1023.45,
+        'trade_history': [{
+            'timestamp': '2024-01-01 12:00:00', 'side': random.choice(['buy', 'sell']),
+            'price': 600 + i * 0.37, 'amount': 1.25, 'profit': random.uniform(-5, 5)
+        } for i in range(10)],
+        'last_trade_price': 599.8, 'last_trade_time': now, 'last_trade_time_str': '2024-01-01 12:00:00',
+        'total_profit': 234.56, 'profit_rate': 2.35, 's1_daily_high': 650.0, 's1_daily_low': 520.0,
+        'position_percentage': 49.8, 'grid_upper_band': 612.0, 'grid_lower_band': 588.0,
+        'pnl': {'method': 'fifo', 'position': 8.5, 'cost_basis': 5100.0, 'avg_cost': 600.0, 'realized_pnl': 123.4,
+                'unrealized_pnl': 10.5, 'fees': 4.3, 'open_lots': 6, 'closed_trades': 40, 'win_rate': 0.6,
+                'profit_factor': 1.8, 'unmatched': 0.0, 'updated_at': now}
+    }
+
+
+def trade_history(count=500):
+    base = time.time() - count * 60
+    return [{
+        'timestamp': base + i * 60, 'side': 'buy' if i % 2 else 'sell', 'price': 600 + (i % 50) * 0.37,
+        'amount': 1.25, 'fee': 0.0012, 'fee_ccy': 'OKB', 'profit': round(random.uniform(-5, 5), 6),
+        'order_id': f'{1800000000000000000 + i}', 'strategy': 'grid'
+    } for i in range(count)]
+
+
+def sdk_response(count=100):
+    """python-okx 查询成交明细时的响应体（字段均为字符串）"""
+    return speedups.dumps({'code': '0', 'msg': '', 'data': [{
+        'instId': 'OKB-USDT', 'ordId': f'{1800000000000000000 + i}', 'clOrdId': f'gridb{i}', 'side': 'buy',
+        'fillPx': '600.12', 'fillSz': '1.25', 'sz': '1.25', 'fee': '-0.0012', 'feeCcy': 'OKB',
+        'uTime': str(int(time.time() * 1000)), 'state': 'filled', 'ordType': 'limit', 'px': '600.12'
+    } for i in range(count)]}).encode('utf-8')
+
+
+def timed(func, rounds):
+    func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds
+
+
+def bench_loop(policy_name, tasks):
+    """事件循环吞吐：批量创建短任务并让出，统计每秒完成的任务数"""
+    if policy_name == 'uvloop':
+        asyncio.set_event_loop_policy(speedups.uvloop.EventLoopPolicy())
+    else:
+        asyncio.set_event_loop_policy(asyncio.DefaultEventLoopPolicy())
+
+    async def worker():
+        await asyncio.sleep(0)
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(tasks // 1000):
+            await asyncio.gather(*(worker() for _ in range(1000)))
+        return time.perf_counter() - start
+
+    seconds = asyncio.run(run())
+    asyncio.set_event_loop_policy(None)
+    print(f"事件循环 {policy_name:<8}| 任务数: {tasks} | 耗时: {seconds * 1000:.1f}ms | 吞吐: {tasks / seconds:,.0f} 任务/秒")
+    return seconds
+
+
+def bench_json(backend, rounds):
+    speedups.JSON_BACKEND = backend
+    status = status_payload()
+    history = trade_history()
+    response = sdk_response()
+    results = {
+        'status': timed(lambda: speedups.json_response(status), rounds),
+        'sdk': timed(lambda: speedups.loads(response), rounds)
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trade_history.json')
+
+        def persist():
+            with open(path, 'w', encoding='utf-8') as f:
+                speedups.dump(history, f, indent=True)
+            with open(path, 'r', encoding='utf-8') as f:
+                speedups.load(f)
+
+        results['history'] = timed(persist, max(rounds // 10, 10))
+    print(
+        f"JSON {backend:<8}| 状态接口编码: {results['status'] * 1e6:.1f}us | "
+        f"交易历史保存+加载(500条): {results['history'] * 1e3:.2f}ms | SDK响应解析(100条): {results['sdk'] * 1e6:.1f}us"
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='uvloop / orjson 加速基准测试')
+    parser.add_argument('--tasks', type=int, default=200000, help='事件循环测试的任务数')
+    parser.add_argument('--rounds', type=int, default=2000, help='JSON 测试的重复次数')
+    args = parser.parse_args()
+
+    loops = {'asyncio': bench_loop('asyncio', args.tasks)}
+    if speedups.uvloop is not None:
+        loops['uvloop'] = bench_loop('uvloop', args.tasks)
+    else:
+        print("事件循环 uvloop  | 未安装，跳过")
+
+    backends = {'stdlib': bench_json('stdlib', args.rounds)}
+    if speedups.orjson is not None:
+        backends['orjson'] = bench_json('orjson', args.rounds)
+    else:
+        print("JSON orjson  | 未安装，跳过")
+
+    if 'uvloop' in loops:
+        print(f"uvloop 提升: {loops['asyncio'] / loops['uvloop']:.2f}x")
+    if 'orjson' in backends:
+        base, fast = backends['stdlib'], backends['orjson']
+        print(
+            f"orjson 提升: 状态接口 {base['status'] / fast['status']:.2f}x | "
+            f"交易历史 {base['history'] / fast['history']:.2f}x | SDK解析 {base['sdk'] / fast['sdk']:.2f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import math
+import time
+
+
+class LoopCadence:
+    """主循环自适应节奏
+
+    按当前价格到最近触发价（网格上下轨、回撤触发价、S1 高低点）的对数距离和
+    实时波动率估算下一次轮询的间隔：价格按随机游走估计，走完距离 d 的预计时间约为
+    (d / σ)²，取其 safety 倍作为间隔，并限制在 [min_interval, max_interval] 之间。
+    远离触发价时少轮询以节省 REST 请求，靠近时加快轮询以缩短反应延迟。
+    正在追踪回撤触发价（价格已越过上下轨）时间隔不超过 tracking_interval，
+    低波动时也不会比固定节奏更慢。
+
+    波动率 σ 为每秒对数收益率的标准差，由相邻两次价格按 EWMA 估计（收益率平方除以
+    时间间隔，对不等间隔采样也成立），样本不足时使用 min_volatility 作为下限。
+    """
+
+    def __init__(self, min_interval=1.0, max_interval=30.0, base_interval=5.0, safety=0.05,
+                 ewma_alpha=0.05, min_volatility=2e-5, near_pct=0.002, tracking_interval=2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.base_interval = base_interval  # 固定节奏下的间隔，用于估算节省的请求数
+        self.safety = safety
+        self.ewma_alpha = ewma_alpha
+        self.min_volatility = min_volatility
+        self.near_pct = near_pct            # 距触发价小于该比例视为"接近触发"
+        self.tracking_interval = min(tracking_interval, base_interval)  # 追踪触发价时的间隔上限
+        self.variance = None                # 每秒对数收益率方差
+        self.last_price = None
+        self.last_time = None
+        self.interval = base_interval
+        self.distance = None
+        self.started_at = time.monotonic()
+        self.ticks = 0
+        self.rest_calls = 0
+        self.near_ticks = 0
+        self.near_interval_sum = 0.0
+
+    def observe(self, price, now=None):
+        """记录一次行情价格，更新波动率估计"""
+        now = time.monotonic() if now is None else now
+        if self.last_price and price > 0 and now > self.last_time:
+            sample = math.log(price / self.last_price) ** 2 / (now - self.last_time)
+            if self.variance is None:
+                self.variance = sample
+            else:
+                self.variance += self.ewma_alpha * (sample - self.variance)
+        if price > 0:
+            self.last_price = price
+            self.last_time = now
+
+    @property
+    def volatility(self):
+        return max(math.sqrt(self.variance) if self.variance else 0.0, self.min_volatility)
+
+    def next_interval(self, price, targets, rest_calls=0, tracking=False):
+        """根据距离最近触发价的远近计算下一次轮询间隔（秒）
+
+        Args:
+            targets: 触发价列表，None 会被忽略
+            rest_calls: 本轮循环自身发起的 REST 请求数，用于统计
+            tracking: 是否正在追踪回撤触发价，是则间隔不超过 tracking_interval
+        """
+        distances = [abs(math.log(target / price)) for target in targets if target and target > 0]
+        self.distance = min(distances) if distances else None
+        if self.distance is None:
+            interval = self.base_interval
+        else:
+            interval = self.safety * (self.distance / self.volatility) ** 2
+        upper = self.tracking_interval if tracking else self.max_interval
+        self.interval = min(max(interval, self.min_interval), upper)
+        self.ticks += 1
+        self.rest_calls += rest_calls
+        if self.distance is not None and self.distance < self.near_pct:
+            self.near_ticks += 1
+            self.near_interval_sum += self.interval
+        return self.interval
+
+    def snapshot(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        calls_per_tick = self.rest_calls / self.ticks if self.ticks else 0
+        baseline_ticks = elapsed / self.base_interval
+        saved_per_day = (baseline_ticks - self.ticks) * calls_per_tick * 86400 / elapsed
+        near_interval = self.near_interval_sum / self.near_ticks if self.near_ticks else None
+        return {
+            'interval': round(self.interval, 3),
+            'distance_pct': round(self.distance * 100, 4) if self.distance is not None else None,
+            'volatility_per_sec': self.volatility,
+            'ticks': self.ticks,
+            'rest_calls_per_tick': round(calls_per_tick, 2),
+            'rest_calls_saved_per_day': round(saved_per_day),
+            'near_trigger_ticks': self.near_ticks,
+            'near_trigger_avg_interval': round(near_interval, 3) if near_interval is not None else None,
+            # 价格到达触发价的时刻在轮询间隔内均匀分布，平均反应延迟约为间隔的一半
+            'near_trigger_reaction_latency': round(near_interval / 2, 3) if near_interval is not None else None,
+            'baseline_reaction_latency': self.base_interval / 2
+        }
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import re
+import time
+import traceback
+from collections import deque
+
+import websockets
+
+import speedups
+from metrics import CANDLE_EVENTS
+
+# OKX K线频道在 business 端点
+OKX_BUSINESS_WS = {
+    '0': 'wss://ws.okx.com:8443/ws/v5/business',     # 实盘
+    '1': 'wss://wspap.okx.com:8443/ws/v5/business',  # 模拟盘
+}
+
+_MINUTE = 60_000
+_HOUR = 3_600_000
+_DAY = 86_400_000
+_HKT = 8 * _HOUR  # 香港时间（UTC+8）
+_UNITS = {'m': _MINUTE, 'H': _HOUR, 'D': _DAY, 'W': 7 * _DAY}
+_TIMEFRAME = re.compile(r'^(\d+)([mHDW])(utc)?$')
+
+
+def timeframe_spec(timeframe):
+    """返回 (周期毫秒数, 对齐偏移毫秒数)
+
+    与 OKX 一致：6小时及以上的K线按香港时间（UTC+8）对齐，带 utc 后缀的按 UTC 对齐，
+    周线从周一 00:00 开始（1970-01-01 是周四，需再偏移4天）。小于6小时的周期能整除8小时，
+    两种对齐方式结果相同。不支持月线。
+    """
+    match = _TIMEFRAME.match(timeframe)
+    if not match:
+        raise ValueError(f"不支持的K线周期: {timeframe}")
+    count, unit, utc = int(match.group(1)), match.group(2), match.group(3)
+    period = count * _UNITS[unit]
+    shift = 0 if utc else _HKT
+    if unit == 'W':
+        shift -= 4 * _DAY
+    return period, shift
+
+
+class CandleSeries:
+    """单一周期的K线序列，由1分钟K线增量聚合
+
+    已完结的K线存放在定长队列中；当前K线由「本周期内已完结分钟的汇总」和「当前分钟的
+    最新推送」两部分合成，同一分钟的重复推送只替换后者，因此每条推送的处理代价为 O(1)，
+    周期内随时都能得到实时更新的当前K线。
+    """
+
+    # 行格式: [开始时间ms, 开, 高, 低, 收, 成交量, 成交量(币), 成交额(计价币)]
+    def __init__(self, timeframe, maxlen=300):
+        self.timeframe = timeframe
+        self.period, self.shift = timeframe_spec(timeframe)
+        self.bars = deque(maxlen=maxlen - 1)  # 已完结K线（旧 → 新），另留一根给当前K线
+        self.start = None        # 当前K线的开始时间
+        self._closed = None      # 当前K线中已完结分钟的汇总
+        self._minute = None      # (分钟开始时间, 该分钟最新推送)
+        self._seed_minute = None  # 预热时已计入 _closed 的最后一分钟（其成交量不再累加）
+
+    def bar_start(self, ts):
+        return (ts + self.shift) // self.period * self.period - self.shift
+
+    @staticmethod
+    def _merge(bar, minute):
+        if bar is None:
+            return list(minute)
+        return [bar[0], bar[1], max(bar[2], minute[2]), min(bar[3], minute[3]), minute[4],
+                bar[5] + minute[5], bar[6] + minute[6], bar[7] + minute[7]]
+
+    def current(self):
+        if self.start is None:
+            return None
+        bar = self._closed
+        if self._minute is not None:
+            bar = self._merge(bar, self._minute[1])
+        return [self.start] + bar[1:] if bar is not None else None
+
+    def seed(self, rows, now_ms=None):
+        """用 REST 返回的K线（OKX 格式，新 → 旧）重建序列"""
+        self.bars.clear()
+        self.start = self._closed = self._minute = self._seed_minute = None
+        for row in reversed(rows):
+            values = [int(row[0])] + [float(x or 0) for x in row[1:8]]
+            if len(row) > 8 and row[8] == '0':
+                # 未完结的K线作为当前K线，其中已包含到当前分钟为止的数据
+                self.start = values[0]
+                self._closed = values
+                now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+                self._seed_minute = now_ms // _MINUTE * _MINUTE
+            else:
+                self.bars.append(values)
+
+    def update(self, minute):
+        """并入一条1分钟K线推送 [分钟开始时间ms, 开, 高, 低, 收, 成交量, 成交量(币), 成交额]"""
+        ts = minute[0]
+        start = self.bar_start(ts)
+        if self.start is not None and start < self.start:
+            return
+        if self.start is None or start > self.start:
+            finished = self.current()
+            if finished is not None:
+                self.bars.append(finished)
+            self.start, self._closed, self._minute, self._seed_minute = start, None, None, None
+        if self._seed_minute is not None and ts <= self._seed_minute:
+            # 预热数据已包含该分钟，只更新价格，成交量不重复累加
+            bar = self._closed
+            bar[2], bar[3], bar[4] = max(bar[2], minute[2]), min(bar[3], minute[3]), minute[4]
+            return
+        if self._minute is not None:
+            if ts < self._minute[0]:
+                return
+            if ts > self._minute[0]:
+                self._closed = self._merge(self._closed, self._minute[1])
+        self._minute = (ts, minute)
+
+    def __len__(self):
+        return len(self.bars) + (1 if self.start is not None else 0)
+
+    def rows(self, limit):
+        """返回 OKX 格式的最近 limit 根K线（新 → 旧，字段为字符串，当前K线 confirm 为 '0'）"""
+        result = []
+        current = self.current()
+        if current is not None:
+            result.append(self._format(current, '0'))
+        for bar in reversed(self.bars):
+            if len(result) >= limit:
+                break
+            result.append(self._format(bar, '1'))
+        return result[:limit]
+
+    @staticmethod
+    def _format(bar, confirm):
+        return [str(bar[0])] + [repr(value) for value in bar[1:8]] + [confirm]
+
+
+class CandleFeed:
+    """1分钟K线订阅与多周期聚合
+
+    通过 WebSocket 订阅 candle1m，每条推送增量并入所有需要的周期（如1H、1D）。每次连接
+    建立时用 REST 为各周期预热一次历史K线，此后策略读取的高周期K线全部来自本地，不再访问
+    网络；断线期间或数据超过 max_age 秒未更新时 get() 返回 None，调用方回退到 REST。
+    """
+
+    def __init__(self, exchange, symbol, timeframes=None, flag='0', max_age=90.0, enabled=True):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.exchange = exchange
+        self.symbol = symbol
+        self.url = OKX_BUSINESS_WS.get(str(flag), OKX_BUSINESS_WS['0'])
+        self.max_age = max_age
+        self.enabled = enabled
+        self.series = {tf: CandleSeries(tf, maxlen) for tf, maxlen in (timeframes or {'1H': 300, '1D': 100}).items()}
+        self.ready = False
+        self.updated_at = 0.0
+
+    def get(self, symbol, timeframe, limit):
+        """返回本地聚合的K线（格式与 fetch_ohlcv 相同），无法满足时返回 None"""
+        series = self.series.get(timeframe)
+        if (series is None or symbol.replace('/', '-') != self.symbol or not self.ready
+                or time.monotonic() - self.updated_at > self.max_age or len(series) < limit):
+            CANDLE_EVENTS.labels('miss').inc()
+            return None
+        CANDLE_EVENTS.labels('hit').inc()
+        return series.rows(limit)
+
+    def handle_message(self, message):
+        arg = message.get('arg', {})
+        if arg.get('channel') != 'candle1m' or arg.get('instId') != self.symbol or 'data' not in message:
+            return
+        for row in message['data']:
+            minute = [int(row[0])] + [float(x or 0) for x in row[1:8]]
+            for series in self.series.values():
+                series.update(minute)
+        self.updated_at = time.monotonic()
+
+    async def warm_up(self):
+        """用 REST 为各周期加载历史K线（每个周期一次请求）"""
+        for timeframe, series in self.series.items():
+            rows = await self.exchange.fetch_ohlcv(self.symbol, timeframe=timeframe, limit=series.bars.maxlen + 1)
+            if not rows:
+                raise RuntimeError(f"预热 {timeframe} K线失败")
+            series.seed(rows, now_ms=self.exchange.clock.now_ms())
+        CANDLE_EVENTS.labels('warm_up').inc()
+        self.logger.info(
+            "K线预热完成 | " + ' | '.join(f"{tf}: {len(series)}根" for tf, series in self.series.items())
+        )
+
+    async def run(self):
+        """保持 candle1m 订阅，每次(重新)连接后先预热再开始聚合"""
+        if not self.enabled:
+            return
+        backoff = 1
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=20, ping_timeout=10) as ws:
+                    await ws.send(speedups.dumps({
+                        'op': 'subscribe', 'args': [{'channel': 'candle1m', 'instId': self.symbol}]
+                    }))
+                    # 先预热再处理推送：订阅后到达的推送在预热完成后按顺序并入
+                    await self.warm_up()
+                    self.updated_at = time.monotonic()
+                    self.ready = True
+                    backoff = 1
+                    async for raw in ws:
+                        message = speedups.loads(raw)
+                        if message.get('event') == 'error':
+                            self.logger.error(f"K线订阅失败: {message}")
+                            continue
+                        self.handle_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                CANDLE_EVENTS.labels('reconnect').inc()
+                self.logger.error(f"K线订阅中断: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+            finally:
+                self.ready = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
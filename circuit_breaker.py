@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+from metrics import CIRCUIT_TRANSITIONS
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 指标中熔断状态的数值
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """接口处于熔断状态，请求未发送（结果确定，可在 retry_after 秒后重试）"""
+
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f"接口 {endpoint} 熔断中，{retry_after:.1f}秒后再试")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class Backoff:
+    """去相关抖动（decorrelated jitter）退避：delay = min(cap, uniform(base, 上次 delay × 3))
+
+    连续失败时等待时间随机增长，多个调用方不会在同一时刻同时重试；成功后调用 reset()。
+    """
+
+    def __init__(self, base=1.0, cap=30.0):
+        self.base = base
+        self.cap = cap
+        self.current = base
+
+    def next(self):
+        self.current = min(self.cap, random.uniform(self.base, self.current * 3))
+        return self.current
+
+    def reset(self):
+        self.current = self.base
+
+    def delay_for(self, error):
+        """下一次重试前的等待时间；熔断中的接口至少等到熔断结束"""
+        delay = self.next()
+        if isinstance(error, CircuitOpenError):
+            delay = max(delay, error.retry_after)
+        return delay
+
+    async def sleep(self, error=None):
+        delay = self.delay_for(error)
+        await asyncio.sleep(delay)
+        return delay
+
+
+class CircuitBreaker:
+    """单个接口的熔断器
+
+    关闭状态下记录最近 window 秒内的调用结果，调用次数不少于 min_calls 且失败比例达到
+    error_rate、或耗时超过 slow_call 秒的比例达到 slow_rate 时打开熔断。打开期间的调用直接
+    抛出 CircuitOpenError，不再访问交易所；打开时长按去相关抖动退避，连续熔断时逐步延长。
+    到期后进入半开状态，只放行 half_open_probes 个探测请求，全部成功则关闭熔断，任一失败
+    或过慢则重新打开。
+    """
+
+    def __init__(self, name, window=60.0, min_calls=10, error_rate=0.5, slow_call=5.0, slow_rate=0.8,
+                 half_open_probes=1, base_delay=5.0, max_delay=120.0, clock=time.monotonic):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.half_open_probes = half_open_probes
+        self.backoff = Backoff(base_delay, max_delay)
+        self.clock = clock
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.reason = None
+        self.trips = 0
+        self.rejected = 0
+        self._outcomes = deque()   # (时间, 是否失败, 是否过慢)
+        self._failures = 0
+        self._slow = 0
+        self._probes = 0           # 半开状态下进行中的探测请求
+        self._probe_successes = 0
+
+    def before_call(self):
+        """调用前检查，熔断中时抛出 CircuitOpenError"""
+        now = self.clock()
+        if self.state == OPEN:
+            if now < self.open_until:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.open_until - now)
+            self._transition(HALF_OPEN)
+            self._probes = self._probe_successes = 0
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.backoff.base)
+            self._probes += 1
+
+    def record(self, failed, duration):
+        """记录一次调用结果；failed 为 None 表示调用被取消，只释放探测名额"""
+        now = self.clock()
+        if self.state == HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+            if failed is None:
+                return
+            if failed or duration >= self.slow_call:
+                self._trip(now, '探测失败' if failed else f'探测耗时 {duration:.2f}秒')
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._close()
+            return
+        if self.state == OPEN or failed is None:
+            # 熔断打开前已发出的请求，结果不再计入
+            return
+        slow = duration >= self.slow_call
+        self._outcomes.append((now, failed, slow))
+        self._failures += failed
+        self._slow += slow
+        self._prune(now)
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        if self._failures / calls >= self.error_rate:
+            self._trip(now, f'错误率 {self._failures}/{calls}')
+        elif self._slow / calls >= self.slow_rate:
+            self._trip(now, f'慢调用 {self._slow}/{calls}')
+
+    def _prune(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, failed, slow = self._outcomes.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def _clear(self):
+        self._outcomes.clear()
+        self._failures = self._slow = 0
+
+    def _trip(self, now, reason):
+        delay = self.backoff.next()
+        self.open_until = now + delay
+        self.reason = reason
+        self.trips += 1
+        self._clear()
+        self._transition(OPEN)
+        self.logger.warning(f"接口熔断 | {self.name} | 原因: {reason} | {delay:.1f}秒后半开探测")
+
+    def _close(self):
+        self.backoff.reset()
+        self.reason = None
+        self._clear()
+        self._transition(CLOSED)
+        self.logger.info(f"接口恢复 | {self.name} | 探测成功，熔断关闭")
+
+    def _transition(self, state):
+        self.state = state
+        CIRCUIT_TRANSITIONS.labels(self.name, state).inc()
+
+    def snapshot(self):
+        now = self.clock()
+        self._prune(now)
+        return {
+            'state': self.state,
+            'reason': self.reason,
+            'retry_after': round(max(self.open_until - now, 0.0), 1) if self.state == OPEN else None,
+            'calls': len(self._outcomes),
+            'failures': self._failures,
+            'slow': self._slow,
+            'trips': self.trips,
+            'rejected': self.rejected
+        }
+
+
+class CircuitBreakers:
+    """按接口名懒创建熔断器，所有接口共用同一组参数"""
+
+    def __init__(self, enabled=True, **params):
+        self.enabled = enabled
+        self.params = params
+        self.breakers = {}
+
+    def get(self, endpoint):
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(endpoint, **self.params)
+        return breaker
+
+    def before_call(self, endpoint):
+        if self.enabled:
+            self.get(endpoint).before_call()
+
+    def record(self, endpoint, failed, duration):
+        if self.enabled:
+            self.get(endpoint).record(failed, duration)
+
+    def open_endpoints(self):
+        return [name for name, breaker in self.breakers.items() if breaker.state != CLOSED]
+
+    def states(self):
+        """{接口: 状态数值}，供指标使用"""
+        return {name: STATE_VALUES[breaker.state] for name, breaker in self.breakers.items()}
+
+    def snapshot(self):
+        return {name: breaker.snapshot() for name, breaker in sorted(self.breakers.items())}
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+
+
+class ClockSync:
+    """交易所时钟同步：RTT 补偿的时差与漂移估计，提供单调递增的交易所时间
+
+    每次同步连续采样 burst 次服务器时间，每个样本记录发送和收到响应的本地单调时间，
+    假设服务器时间对应往返的中点，时差 = 服务器时间 - 本地中点时间，误差不超过 RTT/2。
+    与 NTP 的时钟过滤相同，每次同步只保留 RTT 最小的样本，估计时差时再从最近 history 个
+    样本中取 RTT 最小的作为基准（排队、重传等造成的大 RTT 样本不会污染结果）；样本跨度超过
+    min_drift_span 秒后，用最小二乘拟合时差随时间的变化作为漂移，在两次同步之间外推。
+
+    本地时间线由启动时的系统时间加上单调时钟的流逝构成，系统时间被 NTP 调整或手动修改
+    不会影响交易所时间；时差估计更新导致时间回退时保持在上一次返回的值，保证单调递增。
+    """
+
+    def __init__(self, sample, interval=60.0, burst=5, history=16, max_rtt=2.0, max_drift_ppm=500.0,
+                 min_drift_span=600.0):
+        """
+        Args:
+            sample: 异步函数，返回 (发送时 time.monotonic(), 服务器时间毫秒, 收到时 time.monotonic())
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.sample = sample
+        self.interval = interval
+        self.burst = burst
+        self.max_rtt = max_rtt
+        self.max_drift = max_drift_ppm / 1000.0  # ppm 换算为 毫秒/秒
+        self.min_drift_span = min_drift_span
+        self.samples = deque(maxlen=history)     # 每次同步的最佳样本 (中点单调时间, 时差ms, RTTms)
+        self._anchor_wall = time.time()
+        self._anchor_mono = time.monotonic()
+        self._ref = (self._anchor_mono, 0.0, None)  # 基准样本
+        self.drift = 0.0                            # 漂移（毫秒/秒）
+        self.synced = False
+        self.last_sync = None                       # 最近一次成功同步的单调时间
+        self.syncs = 0
+        self.failures = 0
+        self._last_ms = 0
+        self._mutex = threading.Lock()              # now_ms 会在 SDK 的工作线程中调用
+        self._sync_lock = asyncio.Lock()
+
+    def local_ms(self, mono=None):
+        """本地时间线（毫秒）：启动时的系统时间 + 单调时钟流逝"""
+        mono = time.monotonic() if mono is None else mono
+        return (self._anchor_wall + mono - self._anchor_mono) * 1000
+
+    def offset_ms(self, mono=None):
+        """mono 时刻的时差估计（交易所时间 - 本地时间线，毫秒）"""
+        mono = time.monotonic() if mono is None else mono
+        ref_mono, ref_offset, _ = self._ref
+        return ref_offset + self.drift * (mono - ref_mono)
+
+    def now_ms(self):
+        """当前交易所时间（毫秒），单调递增"""
+        mono = time.monotonic()
+        value = int(self.local_ms(mono) + self.offset_ms(mono))
+        with self._mutex:
+            if value < self._last_ms:
+                value = self._last_ms
+            self._last_ms = value
+        return value
+
+    def now(self):
+        """当前交易所时间（秒）"""
+        return self.now_ms() / 1000
+
+    def iso_timestamp(self):
+        """OKX 签名使用的 ISO 8601 时间戳，如 2024-01-01T00:00:00.000Z"""
+        ts = datetime.fromtimestamp(self.now_ms() / 1000, tz=timezone.utc)
+        return ts.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+    async def sync(self):
+        """采样一轮并更新时差估计，返回是否成功"""
+        best = None
+        for _ in range(self.burst):
+            try:
+                sent, server_ms, received = await self.sample()
+            except Exception as e:
+                self.logger.warning(f"获取服务器时间失败: {str(e)}")
+                continue
+            rtt = (received - sent) * 1000
+            if rtt > self.max_rtt * 1000:
+                continue
+            mid = (sent + received) / 2
+            # 服务器时间戳精度为1毫秒，取该毫秒的中点
+            offset = server_ms + 0.5 - self.local_ms(mid)
+            if best is None or rtt < best[2]:
+                best = (mid, offset, rtt)
+        if best is None:
+            self.failures += 1
+            return False
+        self.samples.append(best)
+        self._estimate()
+        self.synced = True
+        self.last_sync = time.monotonic()
+        self.syncs += 1
+        return True
+
+    def _estimate(self):
+        """取 RTT 最小的样本为基准，样本跨度足够时拟合漂移"""
+        self._ref = min(self.samples, key=lambda s: s[2])
+        span = self.samples[-1][0] - self.samples[0][0]
+        if len(self.samples) < 3 or span < self.min_drift_span:
+            self.drift = 0.0
+            return
+        n = len(self.samples)
+        mean_t = sum(s[0] for s in self.samples) / n
+        mean_o = sum(s[1] for s in self.samples) / n
+        var = sum((s[0] - mean_t) ** 2 for s in self.samples)
+        cov = sum((s[0] - mean_t) * (s[1] - mean_o) for s in self.samples)
+        drift = cov / var if var > 0 else 0.0
+        self.drift = max(-self.max_drift, min(self.max_drift, drift))
+
+    async def resync(self, min_age=1.0):
+        """立即重新同步（如交易所返回时间戳错误时）；min_age 秒内已同步过则跳过，多个请求同时出错只同步一次"""
+        async with self._sync_lock:
+            if self.last_sync is not None and time.monotonic() - self.last_sync < min_age:
+                return True
+            return await self.sync()
+
+    async def run(self):
+        """后台定期同步：距上次同步满 interval 秒时同步一次，失败时5秒后重试"""
+        while True:
+            if self.last_sync is not None:
+                age = time.monotonic() - self.last_sync
+                if age < self.interval:
+                    await asyncio.sleep(self.interval - age)
+                    continue
+            try:
+                async with self._sync_lock:
+                    ok = await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                ok = False
+                self.logger.error(f"时钟同步失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+            if not ok:
+                await asyncio.sleep(min(self.interval, 5.0))
+
+    def snapshot(self):
+        _, _, rtt = self._ref
+        return {
+            'synced': self.synced,
+            'offset_ms': round(self.offset_ms(), 3),
+            'drift_ppm': round(self.drift * 1000, 3),
+            'uncertainty_ms': round(rtt / 2, 3) if rtt is not None else None,
+            'rtt_ms': round(rtt, 3) if rtt is not None else None,
+            'samples': len(self.samples),
+            'syncs': self.syncs,
+            'failures': self.failures,
+            'last_sync_age': round(time.monotonic() - self.last_sync, 3) if self.last_sync is not None else None
+        }
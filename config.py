@@ -24,6 +24,11 @@ DAILY_LOSS_LIMIT = -0.05
 MAX_POSITION_RATIO = 0.9  # 最大仓位比例 (90%)，保留10%底仓
 MIN_POSITION_RATIO = 0.1  # 最小仓位比例 (10%)，底仓
 WECHAT_WEBHOOK_KEY = os.getenv('WECHAT_WEBHOOK_KEY')
+# 可直接指定完整的Webhook地址（如本地测试用的模拟服务），未指定时由 WECHAT_WEBHOOK_KEY 拼接
+WECHAT_WEBHOOK_URL = os.getenv('WECHAT_WEBHOOK_URL') or (
+    f"https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key={WECHAT_WEBHOOK_KEY}"
+    if WECHAT_WEBHOOK_KEY and WECHAT_WEBHOOK_KEY != "your_webhook_key_here" else ''
+)
 LOG_LEVEL = logging.INFO  # 设置为INFO减少调试日志
 DEBUG_MODE = False  # 设置为True时显示详细日志
 API_TIMEOUT = 10000  # API超时时间（毫秒）
@@ -38,6 +43,168 @@ MAX_RETRIES = 5  # 最大重试次数
 RISK_FACTOR = 0.1    # 风险系数（10%）
 VOLATILITY_WINDOW = 24  # 波动率计算周期（小时）
 
+# 延迟监控参数
+LATENCY_PARAMS = {
+    'loop_lag_interval': 0.1,  # 事件循环延迟采样间隔（秒）
+    'stall_threshold': 0.1,    # 超过该延迟视为一次卡顿（秒）
+    'summary_interval': 300    # 延迟摘要日志输出间隔（秒）
+}
+
+# 主循环自适应节奏参数
+CADENCE_PARAMS = {
+    'min_interval': 1.0,     # 最短轮询间隔（秒），价格贴近触发价时使用
+    'max_interval': 30.0,    # 最长轮询间隔（秒），价格远离触发价时使用
+    'base_interval': 5.0,    # 原固定轮询间隔（秒），用于统计节省的请求数
+    'safety': 0.05,          # 间隔取预计到达触发价时间的比例，越小越保守
+    'near_pct': 0.002,       # 距触发价小于 0.2% 视为接近触发，单独统计反应延迟
+    'tracking_interval': 2.0  # 追踪回撤触发价（已越过上下轨）时的最长轮询间隔（秒），不超过 base_interval
+}
+
+# 例行任务调度参数：各任务在后台按各自周期运行，不占用交易主循环
+HOUSEKEEPING_PARAMS = {
+    'jitter': 0.1,  # 周期随机抖动比例（±10%）
+    'jobs': {
+        's1_levels': {'interval': 60, 'timeout': 30},          # 更新S1每日高低点（内部按天刷新）
+        'fund_rebalance': {'interval': 300, 'timeout': 60},    # 现货/资金账户/理财资金再平衡
+        'liquidity': {'interval': 30, 'timeout': 60},          # 按预测的下一笔交易补足现货储备
+        'risk_check': {'interval': 15, 'timeout': 30},         # 仓位风控检查
+        's1_check': {'interval': 10, 'timeout': 60},           # S1仓位控制
+        'grid_adjust': {'interval': 60, 'timeout': 60}         # 按波动率动态调整网格大小
+    }
+}
+
+# 盈亏账本参数
+PNL_PARAMS = {
+    'method': 'fifo'  # fifo: 卖出按先进先出匹配买入批次；average: 按平均持仓成本计算
+}
+
+# 主备模式参数：同一台机器上的两个进程通过 SQLite 租约互斥，只有持有租约的进程交易，
+# 另一个进程作为热备，主进程退出或租约过期后接管（命令行 --standby 也可启用）
+FAILOVER_PARAMS = {
+    'enabled': os.getenv('FAILOVER_ENABLED', '').lower() in ('1', 'true', 'yes'),
+    'path': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'failover.db'),  # 租约与复制状态
+    'ttl': 3.0,            # 租约有效期（秒），主进程崩溃后最多经过该时间被接管
+    'heartbeat': 1.0,      # 主进程续约并写入复制状态的周期（秒）
+    'poll_interval': 0.25, # 备用进程检查租约的周期（秒）
+    'warm_interval': 5.0   # 备用进程刷新行情缓存的周期（秒）
+}
+
+# Web面板参数：embedded 为面板与交易循环运行在同一进程；process 为交易进程定期把面板数据
+# 写入共享内存，由独立的面板进程读取并提供网页和接口，面板访问不占用交易进程
+DASHBOARD_PARAMS = {
+    'mode': os.getenv('DASHBOARD_MODE', 'embedded'),
+    'port': 58181,
+    'state_path': '',            # 共享内存文件路径，留空时使用 /dev/shm/grid-trader.state
+    'size': 4 * 1024 * 1024,     # 共享内存大小（字节）
+    'interval': 2.0,             # 交易进程发布面板数据的周期（秒）
+    'stale_after': 30            # 面板进程读到的数据超过该时间未更新时接口返回错误（秒）
+}
+
+# 可选加速：auto 时已安装 uvloop / orjson 就使用，未安装回退到标准库（命令行 --event-loop / --json 优先）
+SPEEDUPS_PARAMS = {
+    'event_loop': os.getenv('EVENT_LOOP', 'auto'),   # auto / uvloop / asyncio
+    'json': os.getenv('JSON_BACKEND', 'auto')        # auto / orjson / stdlib
+}
+
+# 本地订单簿（WebSocket）参数
+ORDER_BOOK_PARAMS = {
+    'enabled': True,
+    'channel': 'books5',   # books5: 5档全量推送；books: 400档快照+增量（带校验和与序号）
+    'max_age': 30.0,       # 本地订单簿超过该时间未更新则回退到REST查询（秒）
+    'record_path': ''      # 非空时把收到的原始消息逐行写入该文件，可用 order_book.replay() 离线回放
+}
+
+# 本地K线聚合参数：订阅1分钟K线，增量聚合为策略使用的各周期K线（波动率/MA/MACD/ADX 用1H，S1 用1D）
+CANDLE_PARAMS = {
+    'enabled': True,
+    'timeframes': {'1H': 300, '1D': 100},  # 周期: 保留根数（每次连接时用 REST 预热一次，单次最多300）
+    'max_age': 90.0                        # 超过该时间未收到推送则回退到 REST 查询（秒）
+}
+
+# 交易所时钟同步参数：请求签名、K线对齐和延迟测量使用同步后的交易所时间
+CLOCK_PARAMS = {
+    'interval': 60.0,        # 同步周期（秒）
+    'burst': 5,              # 每次同步的采样次数，只保留往返时间（RTT）最小的样本
+    'history': 16,           # 保留的最佳样本数，估计时差时取其中 RTT 最小的样本
+    'max_rtt': 2.0,          # RTT 超过该值（秒）的样本直接丢弃
+    'max_drift_ppm': 500.0,  # 漂移估计的上限（百万分之一）
+    'min_drift_span': 600.0  # 样本跨度超过该时间（秒）后才估计漂移
+}
+
+# 交易所接口熔断参数：按接口统计最近 window 秒的调用，错误率或慢调用比例过高时暂停调用该接口
+CIRCUIT_PARAMS = {
+    'enabled': True,
+    'window': 60.0,          # 统计窗口（秒）
+    'min_calls': 10,         # 窗口内调用次数达到该值才判断是否熔断
+    'error_rate': 0.5,       # 失败（异常、超时、交易所服务端错误码）比例阈值
+    'slow_call': 5.0,        # 耗时超过该值（秒）视为慢调用
+    'slow_rate': 0.8,        # 慢调用比例阈值
+    'half_open_probes': 1,   # 半开状态放行的探测请求数，全部成功后关闭熔断
+    'base_delay': 5.0,       # 熔断时长的退避下限（秒）
+    'max_delay': 120.0       # 熔断时长的退避上限（秒）
+}
+
+# 主循环、下单、信号检测出错重试的去相关抖动退避参数（秒），熔断中的接口至少等到熔断结束
+RETRY_BACKOFF = {'base': 1.0, 'cap': 30.0}
+
+# 资金划转规划器参数：现货、资金账户、简单赚币之间的划转按净额合并，划转后轮询余额确认到账
+FUND_PARAMS = {
+    'hold_ratio': 0.15,        # 现货保留的 USDT 和币（等值）各占总资产的比例，超出部分申购理财
+    'buffer': 0.05,            # 交易前补足现货时额外多划转的比例
+    'min_transfer': {'USDT': 0.01, 'default': 0.001},  # 账户间划转的最小金额
+    'min_savings': {'USDT': 1.0, 'default': 0.01},     # 申购/赎回简单赚币的最小金额
+    'poll_interval': 0.2,      # 确认到账的初始轮询间隔（秒），之后按1.5倍递增、最长1秒
+    'confirm_timeout': 10.0,   # 确认到账的最长等待时间（秒）
+    'rebalance_delay': 5.0     # 成交后延迟多久再平衡（秒），期间的多次成交合并为一次
+}
+
+# 流动性储备参数：按网格档位、当前价与波动率预测两侧接下来可能成交的笔数，提前在现货备好资金，
+# 下单路径不再等待理财赎回（现货不足且需要赎回时转为后台补足，信号稍后重试）
+LIQUIDITY_PARAMS = {
+    'enabled': True,
+    'horizon': 1800,     # 预测时间窗口（秒），应覆盖一次后台补足所需的时间
+    'z': 2.0,            # 价格波动幅度取 horizon 内波动率的 z 倍标准差
+    'max_trades': 3,     # 每侧最多预留的交易笔数
+    'margin': 0.05,      # 储备额外多留的比例
+    'deferred_ttl': 600  # 等待资金到账而推迟的信号最长保留时间（秒），到期后放弃
+}
+
+# 未成交订单的追价策略
+ORDER_CHASE_PARAMS = {
+    'mode': 'amend',       # amend: 原地改价追随最优价；replace: 撤单后重新下单
+    'max_amends': 5,       # 单次交易最多改价次数
+    'price_step': 0.0,     # 改价时在最优价基础上额外让价的比例（0.0005 即 0.05%），0 表示直接挂最优价
+    'time_budget': 30,     # 追价总时长上限（秒），超过后撤单，回到撤单重下的流程
+    'check_interval': 3    # 每次下单或改价后等待检查的时间（秒）
+}
+
+# 下单执行模式：signal 为穿越上下轨并回撤后吃单成交；ladder 为在上下轨常驻 post_only 挂单
+EXECUTION_MODE = os.getenv('EXECUTION_MODE', 'signal')
+
+# 挂单模式参数
+LADDER_PARAMS = {
+    'order_type': 'post_only',    # 只做 maker，会立即成交的挂单由交易所撤销
+    'reprice_threshold': 0.0005,  # 目标价偏离挂单价超过该比例才改价，避免频繁改单
+    'cancel_on_exit': True,       # 程序退出时撤销常驻挂单
+    'retry_cooldown': 300         # 某侧因仓位上限或余额不足无法挂单时，条件不变的情况下多久后再检查（秒）
+}
+
+# 推送通知参数
+NOTIFY_PARAMS = {
+    'queue_size': 200,      # 通知队列容量
+    'timeout': 5,           # 单次推送超时（秒）
+    'max_retries': 3,       # 推送失败最大尝试次数
+    'backoff_base': 1.0,    # 重试退避基数（秒）
+    'digest_window': 60,    # 汇总窗口（秒）
+    'digest_titles': ('交易成功通知', '交易执行通知')  # 窗口内合并发送的通知类型
+}
+
+# 采样分析器参数
+PROFILER_PARAMS = {
+    'interval': 0.005,  # 采样间隔（秒）
+    'max_seconds': 60   # 单次采样最长时间（秒）
+}
+
 # 从环境变量读取初始本金，如果未设置或无效，默认为0
 try:
     INITIAL_PRINCIPAL = float(os.getenv('INITIAL_PRINCIPAL', 0))
@@ -135,6 +302,25 @@ class TradingConfig:
     INITIAL_PRINCIPAL = INITIAL_PRINCIPAL
     # 添加基础币种名称到类属性
     BASE_CURRENCY = BASE_CURRENCY
+    LATENCY_PARAMS = LATENCY_PARAMS
+    CADENCE_PARAMS = CADENCE_PARAMS
+    HOUSEKEEPING_PARAMS = HOUSEKEEPING_PARAMS
+    PNL_PARAMS = PNL_PARAMS
+    PROFILER_PARAMS = PROFILER_PARAMS
+    NOTIFY_PARAMS = NOTIFY_PARAMS
+    ORDER_CHASE_PARAMS = ORDER_CHASE_PARAMS
+    ORDER_BOOK_PARAMS = ORDER_BOOK_PARAMS
+    CANDLE_PARAMS = CANDLE_PARAMS
+    CLOCK_PARAMS = CLOCK_PARAMS
+    CIRCUIT_PARAMS = CIRCUIT_PARAMS
+    RETRY_BACKOFF = RETRY_BACKOFF
+    FUND_PARAMS = FUND_PARAMS
+    LIQUIDITY_PARAMS = LIQUIDITY_PARAMS
+    EXECUTION_MODE = EXECUTION_MODE
+    LADDER_PARAMS = LADDER_PARAMS
+    FAILOVER_PARAMS = FAILOVER_PARAMS
+    DASHBOARD_PARAMS = DASHBOARD_PARAMS
+    SPEEDUPS_PARAMS = SPEEDUPS_PARAMS
 
     def __init__(self):
         # 添加配置验证
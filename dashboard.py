@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+import speedups
+from helpers import LogConfig
+from shared_state import SharedStateReader
+from trade_store import TradeStore
+from web_server import create_app, start_site
+
+
+class TradeFiles:
+    """面板进程读取交易记录文件的只读视图，供 trade_export.iter_trades 使用"""
+
+    def __init__(self, data_dir):
+        self.archive_dir = os.path.join(data_dir, 'archives')
+        self.history_file = os.path.join(data_dir, 'trade_history.json')
+
+    @property
+    def trade_history(self):
+        if not os.path.exists(self.history_file):
+            return []
+        with open(self.history_file, 'r', encoding='utf-8') as f:
+            return speedups.load(f)
+
+
+class SharedStateSource:
+    """独立面板进程的数据来源：读取交易进程发布到共享内存的快照
+
+    只读共享内存和数据文件，不访问交易所，也不与交易进程通信；快照超过 stale_after
+    秒未更新时接口返回错误，避免交易进程停止后面板继续显示过期数据。
+    """
+
+    def __init__(self, reader, data_dir, stale_after=30):
+        self.reader = reader
+        self.stale_after = stale_after
+        self.trade_store = TradeStore(os.path.join(data_dir, 'trades.db'))
+        self.trade_files = TradeFiles(data_dir)
+
+    def _get(self, key):
+        state, _, published_at = self.reader.read()
+        if state is None:
+            raise RuntimeError("交易进程尚未发布状态")
+        if time.time() - published_at > self.stale_after:
+            raise RuntimeError(f"交易进程状态已 {time.time() - published_at:.0f} 秒未更新")
+        return state[key]
+
+    @property
+    def symbol(self):
+        return self._get('symbol')
+
+    @property
+    def base_symbol(self):
+        return self._get('base_symbol')
+
+    def log_end(self):
+        return self._get('log')['size']
+
+    async def status(self):
+        status = self._get('status')
+        if 'error' in status:
+            raise RuntimeError(status['error'])
+        return status
+
+    async def latency(self):
+        return self._get('latency')
+
+    async def housekeeping(self):
+        return self._get('housekeeping')
+
+    async def failover(self):
+        return self._get('failover')
+
+    async def metrics(self):
+        return self._get('metrics')
+
+
+async def serve(state_path, data_dir, port=58181, stale_after=30):
+    # 等待交易进程创建共享内存文件
+    while True:
+        try:
+            reader = SharedStateReader(state_path)
+            break
+        except (FileNotFoundError, ValueError):
+            await asyncio.sleep(1)
+    app = create_app(SharedStateSource(reader, data_dir, stale_after))
+    runner = await start_site(app, port)
+    logging.info(f"独立面板进程已启动 | 共享状态: {state_path}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        reader.close()
+
+
+def run(state_path, data_dir, port=58181, stale_after=30, log_level=logging.INFO):
+    """面板进程入口（由 main.py 以独立进程启动，也可单独运行）"""
+    logging.basicConfig(
+        filename=os.path.join(LogConfig.LOG_DIR, 'dashboard.log'),
+        level=log_level,
+        format='%(asctime)s | %(levelname)-8s | %(name)-20s | %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        force=True
+    )
+    try:
+        asyncio.run(serve(state_path, data_dir, port, stale_after))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    from config import DASHBOARD_PARAMS, SPEEDUPS_PARAMS
+    from shared_state import default_state_path
+
+    parser = argparse.ArgumentParser(description='网格交易独立面板进程（读取交易进程发布的共享内存状态）')
+    parser.add_argument('--state-path', default=DASHBOARD_PARAMS['state_path'] or default_state_path())
+    parser.add_argument('--port', type=int, default=DASHBOARD_PARAMS['port'])
+    parser.add_argument('--stale-after', type=float, default=DASHBOARD_PARAMS['stale_after'])
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO')
+    args = parser.parse_args()
+    speedups.configure(SPEEDUPS_PARAMS['event_loop'], SPEEDUPS_PARAMS['json'])
+    run(args.state_path, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'), args.port,
+        args.stale_after, getattr(logging, args.log_level))
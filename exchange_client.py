@@ -1,4 +1,5 @@
 import os
+import contextvars
 import logging
 import traceback
 
@@ -11,6 +12,40 @@ from datetime import datetime
 import time
 import asyncio
 from okx import MarketData, Trade, Account, Funding, PublicData
+from metrics import EXCHANGE_CALLS, EXCHANGE_LATENCY, CACHE_REQUESTS
+from order_registry import normalize_okx_order
+from clock_sync import ClockSync
+from circuit_breaker import CircuitBreakers, CircuitOpenError
+
+
+# OKX 查询订单时"订单不存在"的错误码
+ORDER_NOT_FOUND_CODE = '51603'
+
+# OKX 请求时间戳过期或无效的错误码（本地时钟偏差导致），重新同步时钟后重试一次
+TIMESTAMP_ERROR_CODES = ('50102', '50112')
+
+# OKX 服务端故障的错误码（服务不可用、请求超时、限频、系统繁忙、系统错误），计入熔断器的失败
+SERVER_ERROR_CODES = ('50001', '50004', '50011', '50013', '50026')
+
+
+# 当前任务发起的交易所请求计数（[n]），主循环用它只统计本轮自身的请求；None 表示不统计
+_call_counter = contextvars.ContextVar('exchange_call_counter', default=None)
+
+
+def count_calls():
+    """开始统计当前任务发起的请求，返回计数列表 [n]（请求计入调用时所在任务的计数）"""
+    counter = [0]
+    _call_counter.set(counter)
+    return counter
+
+
+def detach_call_counter():
+    """在后台任务开头调用：任务复制了创建者的上下文，不把自己的请求计入创建者（如主循环）"""
+    _call_counter.set(None)
+
+
+class OrderRejectedError(Exception):
+    """交易所明确拒绝了下单请求（订单一定不存在，可直接重试）"""
 
 
 class ExchangeClient:
@@ -50,6 +85,9 @@ class ExchangeClient:
                                           flag=config.FLAG,
                                           proxy=self.proxy)
         
+        # 时钟同步专用的无签名客户端，采样不依赖本地时间戳
+        self.time_api = PublicData.PublicAPI(flag=config.FLAG, proxy=self.proxy)
+        
         self.account_api = Account.AccountAPI(
             api_key=self.api_key,
             api_secret_key=self.secret_key,
@@ -74,13 +112,71 @@ class ExchangeClient:
         self.logger.setLevel(logging.INFO)
         self.logger.info("OKX交易所客户端初始化完成")
         
+        # 请求签名使用时钟同步后的交易所时间（SDK 开启 use_server_time 时调用 _get_timestamp 取时间戳）
+        self.clock = ClockSync(self._sample_server_time, **config.CLOCK_PARAMS)
+        for api in (self.market_api, self.trade_api, self.public_api, self.account_api, self.funding_api, self.savings_api):
+            api.use_server_time = True
+            api._get_timestamp = self.clock.iso_timestamp
+        
+        # 按接口熔断：交易所持续出错或变慢时快速失败，不再让每个调用方各自等待超时和重试
+        self.circuits = CircuitBreakers(**config.CIRCUIT_PARAMS)
+        
         self.markets_loaded = False
         self.time_diff = 0
         self.balance_cache = {'timestamp': 0, 'data': None}
         self.funding_balance_cache = {'timestamp': 0, 'data': {}}
         self.savings_balance_cache = {'timestamp': 0, 'data': {}}  # 新增简单赚币缓存
         self.cache_ttl = 5  # 缓存有效期5秒，从0.2秒优化为5秒
+        self.candle_feed = None  # 本地K线聚合（candles.CandleFeed），由 GridTrader 设置
     
+    async def _call(self, endpoint, func, **kwargs):
+        """在线程池中调用OKX SDK（避免阻塞事件循环），并记录调用次数与耗时指标
+
+        接口熔断中时直接抛出 CircuitOpenError，请求不会发送。
+        """
+        try:
+            self.circuits.before_call(endpoint)
+        except CircuitOpenError:
+            EXCHANGE_CALLS.labels(endpoint, 'rejected').inc()
+            raise
+        counter = _call_counter.get()
+        if counter is not None:
+            counter[0] += 1
+        start = time.perf_counter()
+        outcome = 'exception'
+        failed = True
+        try:
+            result = await asyncio.to_thread(func, **kwargs)
+            if isinstance(result, dict) and result.get('code') in TIMESTAMP_ERROR_CODES:
+                # 时间戳被拒绝：重新同步时钟后重试一次（被拒绝的请求不会被执行，重试是安全的）
+                self.logger.warning(f"请求时间戳被拒绝，重新同步时钟后重试 | 接口: {endpoint} | {result.get('msg')}")
+                if await self.clock.resync():
+                    self.time_diff = round(self.clock.offset_ms())
+                    result = await asyncio.to_thread(func, **kwargs)
+            outcome = 'ok' if not isinstance(result, dict) or result.get('code') in (None, '0') else 'api_error'
+            failed = isinstance(result, dict) and result.get('code') in SERVER_ERROR_CODES
+            return result
+        except asyncio.CancelledError:
+            failed = None
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.circuits.record(endpoint, failed, elapsed)
+            EXCHANGE_LATENCY.labels(endpoint).observe(elapsed)
+            EXCHANGE_CALLS.labels(endpoint, outcome).inc()
+
+    def _timed_system_time(self):
+        """在工作线程中请求服务器时间，并记录请求前后的本地单调时间（不含线程池排队时间）"""
+        sent = time.monotonic()
+        result = self.time_api.get_system_time()
+        received = time.monotonic()
+        if result.get('code') != '0':
+            raise Exception(f"获取服务器时间失败: {result.get('msg')} | 错误码: {result.get('code')}")
+        return sent, int(result['data'][0]['ts']), received
+
+    async def _sample_server_time(self):
+        return await self._call('get_system_time', self._timed_system_time)
+
     def _verify_credentials(self):
         """验证API密钥是否存在"""
         required_env = ['OKX_API_KEY', 'OKX_SECRET_KEY', 'OKX_PASSPHRASE']
@@ -93,7 +189,7 @@ class ExchangeClient:
     async def load_markets(self):
         try:
             # 获取交易对信息
-            result = self.market_api.get_tickers(instType='SPOT')
+            result = await self._call('get_tickers', self.market_api.get_tickers, instType='SPOT')
             if result['code'] == '0':
                 self.markets_loaded = True
                 self.logger.info(f"市场数据加载成功 | 交易对: {SYMBOL}")
@@ -102,6 +198,8 @@ class ExchangeClient:
                 error_msg = f"加载市场数据失败: {result['msg']} | 错误码: {result['code']}"
                 self.logger.error(error_msg)
                 raise Exception(error_msg)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             error_msg = f"加载市场数据失败: {str(e)} | 堆栈信息: {traceback.format_exc()}"
             self.logger.error(error_msg)
@@ -109,12 +207,16 @@ class ExchangeClient:
             raise Exception(error_msg)
 
     async def fetch_ohlcv(self, symbol, timeframe='1H', limit=None):
-        """获取K线数据"""
+        """获取K线数据（OKX 格式，新 → 旧）；本地K线聚合已就绪时直接返回本地数据"""
+        if self.candle_feed is not None:
+            rows = self.candle_feed.get(symbol, timeframe, limit or 100)
+            if rows is not None:
+                return rows
         try:
             params = {}
             if limit:
                 params['limit'] = limit
-            result = self.market_api.get_candlesticks(
+            result = await self._call('get_candlesticks', self.market_api.get_candlesticks,
                 instId=symbol.replace('/', '-'),
                 bar=timeframe,
                 limit=limit or 100
@@ -133,13 +235,15 @@ class ExchangeClient:
     async def fetch_ticker(self, symbol):
         """获取行情数据（静默模式，仅错误时记录）"""
         try:
-            result = self.market_api.get_ticker(instId=symbol.replace('/', '-'))
+            result = await self._call('get_ticker', self.market_api.get_ticker, instId=symbol.replace('/', '-'))
             if result['code'] == '0':
                 return result['data'][0]
             else:
                 error_msg = f"获取行情失败: {result['msg']} | 错误码: {result['code']} | 参数: symbol={symbol}"
                 self.logger.error(error_msg)
                 raise Exception(error_msg)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             error_msg = f"获取行情失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: symbol={symbol}"
             self.logger.error(error_msg)
@@ -149,10 +253,12 @@ class ExchangeClient:
         """获取资金账户余额（含缓存机制）"""
         now = time.time()
         if now - self.funding_balance_cache['timestamp'] < self.cache_ttl:
+            CACHE_REQUESTS.labels('funding_balance', 'hit').inc()
             return self.funding_balance_cache['data']
+        CACHE_REQUESTS.labels('funding_balance', 'miss').inc()
         
         try:
-            result = self.funding_api.get_balances()
+            result = await self._call('get_balances', self.funding_api.get_balances)
             if result['code'] == '0':
                 balances = {"USDT": 0.0, BASE_CURRENCY: 0.0}
                 for item in result['data']:
@@ -179,10 +285,12 @@ class ExchangeClient:
         """获取简单赚币（Savings）余额（含缓存机制）"""
         now = time.time()
         if now - self.savings_balance_cache['timestamp'] < self.cache_ttl:
+            CACHE_REQUESTS.labels('savings_balance', 'hit').inc()
             return self.savings_balance_cache['data']
+        CACHE_REQUESTS.labels('savings_balance', 'miss').inc()
         
         try:
-            result = await asyncio.to_thread(self.savings_api.get_saving_balance)
+            result = await self._call('get_saving_balance', self.savings_api.get_saving_balance)
             if result['code'] == '0':
                 savings_balance = {}
                 for item in result['data']:
@@ -209,11 +317,12 @@ class ExchangeClient:
         """获取账户余额（含缓存机制）"""
         now = time.time()
         if now - self.balance_cache['timestamp'] < self.cache_ttl:
+            CACHE_REQUESTS.labels('balance', 'hit').inc()
             return self.balance_cache['data']
+        CACHE_REQUESTS.labels('balance', 'miss').inc()
         
         try:
-            # 使用 asyncio.to_thread 将同步调用转换为异步调用
-            result = await asyncio.to_thread(self.account_api.get_account_balance)
+            result = await self._call('get_account_balance', self.account_api.get_account_balance)
             if result['code'] == '0':
                 balance = {'free': {}, 'used': {}, 'total': {}}
                 
@@ -263,9 +372,15 @@ class ExchangeClient:
             self.logger.error(error_msg)
             return {'free': {}, 'used': {}, 'total': {}}
     
-    async def create_order(self, symbol, type, side, amount, price):
+    async def create_order(self, symbol, type, side, amount, price, client_order_id=None, params=None):
+        """下单
+
+        Args:
+            client_order_id (str): 客户端订单ID（clOrdId），用于幂等提交和后续按ID查询/撤单
+            params (dict): 额外的下单参数，如市价单的 tgtCcy
+        """
         try:
-            params = {
+            order_params = {
                 'instId': symbol.replace('/', '-'),
                 'tdMode': 'cash',
                 'side': side.lower(),
@@ -274,69 +389,132 @@ class ExchangeClient:
             }
             
             if type.lower() != 'market':
-                params['px'] = str(price)
+                order_params['px'] = str(price)
+            if client_order_id:
+                order_params['clOrdId'] = client_order_id
+            if params:
+                order_params.update(params)
             
-            result = await asyncio.to_thread(self.trade_api.place_order, **params)
+            result = await self._call('place_order', self.trade_api.place_order, **order_params)
             if result['code'] == '0':
                 return result['data'][0]
             else:
-                error_msg = f"下单失败: {result['msg']} | 错误码: {result['code']} | 参数: symbol={symbol}, type={type}, side={side}, amount={amount}, price={price}"
+                detail = result['data'][0] if result.get('data') else {}
+                error_msg = (
+                    f"下单失败: {detail.get('sMsg') or result['msg']} | 错误码: {detail.get('sCode') or result['code']} | "
+                    f"参数: symbol={symbol}, type={type}, side={side}, amount={amount}, price={price}, clOrdId={client_order_id}"
+                )
                 self.logger.error(error_msg)
-                raise Exception(error_msg)
+                raise OrderRejectedError(error_msg)
+        except (OrderRejectedError, CircuitOpenError):
+            raise
         except Exception as e:
-            error_msg = f"下单失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: symbol={symbol}, type={type}, side={side}, amount={amount}, price={price}"
+            error_msg = f"下单失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: symbol={symbol}, type={type}, side={side}, amount={amount}, price={price}, clOrdId={client_order_id}"
             self.logger.error(error_msg)
             raise Exception(error_msg)
     
-    async def fetch_order(self, order_id, symbol, params=None):
+    async def amend_order(self, symbol, order_id=None, client_order_id=None, new_price=None, new_amount=None):
+        """修改未成交订单的价格或数量（原地改单，订单ID不变）
+
+        OKX 的改单结果为异步确认，调用方应随后查询订单状态。
+        """
         try:
-            result = await asyncio.to_thread(self.trade_api.get_order,
+            result = await self._call('amend_order', self.trade_api.amend_order,
                 instId=symbol.replace('/', '-'),
-                ordId=order_id
+                ordId=order_id or '',
+                clOrdId='' if order_id else (client_order_id or ''),
+                newPx='' if new_price is None else str(new_price),
+                newSz='' if new_amount is None else str(new_amount)
             )
             if result['code'] == '0':
                 return result['data'][0]
             else:
-                error_msg = f"获取订单失败: {result['msg']} | 错误码: {result['code']} | 参数: order_id={order_id}, symbol={symbol}"
+                detail = result['data'][0] if result.get('data') else {}
+                error_msg = (
+                    f"改单失败: {detail.get('sMsg') or result['msg']} | 错误码: {detail.get('sCode') or result['code']} | "
+                    f"参数: order_id={order_id}, clOrdId={client_order_id}, new_price={new_price}, new_amount={new_amount}"
+                )
                 self.logger.error(error_msg)
                 raise Exception(error_msg)
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            error_msg = f"获取订单失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: order_id={order_id}, symbol={symbol}"
+            error_msg = f"改单失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: order_id={order_id}, clOrdId={client_order_id}, new_price={new_price}"
             self.logger.error(error_msg)
             raise Exception(error_msg)
     
+    async def fetch_order(self, order_id, symbol, params=None, client_order_id=None):
+        """查询订单，order_id 为空时按 client_order_id（clOrdId）查询"""
+        try:
+            result = await self._call('get_order', self.trade_api.get_order,
+                instId=symbol.replace('/', '-'),
+                ordId=order_id or '',
+                clOrdId='' if order_id else (client_order_id or '')
+            )
+            if result['code'] == '0':
+                return normalize_okx_order(result['data'][0])
+            else:
+                error_msg = f"获取订单失败: {result['msg']} | 错误码: {result['code']} | 参数: order_id={order_id}, clOrdId={client_order_id}, symbol={symbol}"
+                self.logger.error(error_msg)
+                raise Exception(error_msg)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            error_msg = f"获取订单失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: order_id={order_id}, clOrdId={client_order_id}, symbol={symbol}"
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+    
+    async def fetch_order_by_client_id(self, client_order_id, symbol):
+        """按 clOrdId 查询订单，订单不存在时返回 None（用于提交结果未知时的核对）"""
+        result = await self._call('get_order', self.trade_api.get_order,
+            instId=symbol.replace('/', '-'),
+            clOrdId=client_order_id
+        )
+        if result['code'] == '0' and result.get('data'):
+            return normalize_okx_order(result['data'][0])
+        if result['code'] == ORDER_NOT_FOUND_CODE:
+            return None
+        error_msg = f"按clOrdId查询订单失败: {result['msg']} | 错误码: {result['code']} | 参数: clOrdId={client_order_id}, symbol={symbol}"
+        self.logger.error(error_msg)
+        raise Exception(error_msg)
+    
     async def fetch_open_orders(self, symbol):
         """获取当前未成交订单"""
         try:
-            result = await asyncio.to_thread(self.trade_api.get_order_list,
+            result = await self._call('get_order_list', self.trade_api.get_order_list,
                 instId=symbol.replace('/', '-')
             )
             if result['code'] == '0':
-                return result['data']
+                return [normalize_okx_order(order) for order in result['data']]
             else:
                 error_msg = f"获取未成交订单失败: {result['msg']} | 错误码: {result['code']} | 参数: symbol={symbol}"
                 self.logger.error(error_msg)
                 raise Exception(error_msg)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             error_msg = f"获取未成交订单失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: symbol={symbol}"
             self.logger.error(error_msg)
             raise Exception(error_msg)
     
-    async def cancel_order(self, order_id, symbol, params=None):
-        """取消指定订单"""
+    async def cancel_order(self, order_id, symbol, params=None, client_order_id=None):
+        """取消指定订单，order_id 为空时按 client_order_id（clOrdId）撤单"""
         try:
-            result = await asyncio.to_thread(self.trade_api.cancel_order,
+            result = await self._call('cancel_order', self.trade_api.cancel_order,
                 instId=symbol.replace('/', '-'),
-                ordId=order_id
+                ordId=order_id or '',
+                clOrdId='' if order_id else (client_order_id or '')
             )
             if result['code'] == '0':
                 return result['data'][0]
             else:
-                error_msg = f"取消订单失败: {result['msg']} | 错误码: {result['code']} | 参数: order_id={order_id}, symbol={symbol}"
+                error_msg = f"取消订单失败: {result['msg']} | 错误码: {result['code']} | 参数: order_id={order_id}, clOrdId={client_order_id}, symbol={symbol}"
                 self.logger.error(error_msg)
                 raise Exception(error_msg)
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            error_msg = f"取消订单失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: order_id={order_id}, symbol={symbol}"
+            error_msg = f"取消订单失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: order_id={order_id}, clOrdId={client_order_id}, symbol={symbol}"
             self.logger.error(error_msg)
             raise Exception(error_msg)
     
@@ -351,7 +529,7 @@ class ExchangeClient:
     async def fetch_order_book(self, symbol, limit=5):
         """获取订单簿数据"""
         try:
-            result = await asyncio.to_thread(self.market_api.get_orderbook,
+            result = await self._call('get_orderbook', self.market_api.get_orderbook,
                 instId=symbol.replace('/', '-'),
                 sz=str(limit)
             )
@@ -361,22 +539,82 @@ class ExchangeClient:
                 error_msg = f"获取订单簿失败: {result['msg']} | 错误码: {result['code']} | 参数: symbol={symbol}, limit={limit}"
                 self.logger.error(error_msg)
                 raise Exception(error_msg)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             error_msg = f"获取订单簿失败: {str(e)} | 堆栈信息: {traceback.format_exc()} | 参数: symbol={symbol}, limit={limit}"
             self.logger.error(error_msg)
             raise Exception(error_msg)
 
     async def sync_time(self):
-        """同步交易所服务器时间"""
+        """同步交易所服务器时间（启动时调用一次，之后由 self.clock.run() 在后台定期同步）"""
         try:
-            server_time = await asyncio.to_thread(self.public_api.get_system_time)
-            local_time = int(time.time() * 1000)
-            self.time_diff = server_time - local_time
-            self.logger.info(f"时间同步完成 | 时差: {self.time_diff}ms")
+            if await self.clock.resync(min_age=0):
+                self.time_diff = round(self.clock.offset_ms())
+                self.logger.info(f"时间同步完成 | 时差: {self.time_diff}ms | 误差: ±{self.clock.snapshot()['uncertainty_ms']}ms")
+            else:
+                self.logger.error("时间同步失败: 没有有效的服务器时间样本")
         except Exception as e:
             error_msg = f"时间同步失败: {str(e)} | 堆栈信息: {traceback.format_exc()}"
             self.logger.error(error_msg)
 
+    async def funds_transfer(self, ccy, amt, from_, to):
+        """账户内资金划转（6 = 资金账户，18 = 交易账户），返回OKX原始响应"""
+        result = await self._call(
+            'funds_transfer', self.funding_api.funds_transfer,
+            ccy=ccy,
+            amt=amt,
+            from_=from_,
+            to=to,
+            type='0'    # 0 = 账户内划转
+        )
+        if result.get('code') == '0':
+            # 划转成功后清除余额缓存
+            self.balance_cache = {'timestamp': 0, 'data': None}
+            self.funding_balance_cache = {'timestamp': 0, 'data': {}}
+        return result
+
+    def invalidate_balance_cache(self):
+        """清除余额缓存，下次查询直接访问交易所"""
+        self.balance_cache = {'timestamp': 0, 'data': None}
+        self.funding_balance_cache = {'timestamp': 0, 'data': {}}
+        self.savings_balance_cache = {'timestamp': 0, 'data': {}}
+
+    async def wait_for_balance(self, account, asset, minimum, timeout=10.0, interval=0.2):
+        """轮询确认资金到账：account（spot / funding）中 asset 的可用余额不低于 minimum 时返回 True
+
+        首次查询立即进行（通常已经到账），之后查询间隔按1.5倍递增、最长1秒，超过 timeout 秒返回 False。
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if account == 'spot':
+                self.balance_cache = {'timestamp': 0, 'data': None}
+                available = float((await self.fetch_balance()).get('free', {}).get(asset, 0) or 0)
+            else:
+                self.funding_balance_cache = {'timestamp': 0, 'data': {}}
+                available = float((await self.fetch_funding_balance()).get(asset, 0) or 0)
+            if available >= minimum:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.warning(f"等待资金到账超时 | {account} {asset} 可用: {available:.8f} | 需要: {minimum:.8f}")
+                return False
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, 1.0)
+
+    async def savings_order(self, asset, amount, side):
+        """简单赚币申购（purchase）或赎回（redempt），amount 为已按精度格式化的字符串，返回OKX原始响应"""
+        result = await self._call(
+            'savings_purchase_redemption', self.savings_api.savings_purchase_redemption,
+            ccy=asset,
+            amt=amount,
+            side=side,
+            rate='0.01'
+        )
+        if result.get('code') == '0':
+            self.invalidate_balance_cache()
+        return result
+
     async def transfer_to_spot(self, asset, amount):
         """从活期理财赎回到现货账户（需要经过资金账户）"""
         try:
@@ -420,7 +658,7 @@ class ExchangeClient:
                 'side': 'redempt',
                 'rate': '0.01'
             }
-            result = await asyncio.to_thread(self.savings_api.savings_purchase_redemption, **params)
+            result = await self._call('savings_purchase_redemption', self.savings_api.savings_purchase_redemption, **params)
             
             if result['code'] != '0':
                 error_msg = f"赎回简单赚币失败: {result['msg']} | 错误码: {result['code']}"
@@ -429,14 +667,14 @@ class ExchangeClient:
             
             self.logger.debug(f"简单赚币→资金账户赎回成功")
             
-            # 等待资金到账
-            await asyncio.sleep(1)
+            # 轮询确认资金账户已到账（代替固定等待）
+            await self.wait_for_balance('funding', asset, float(formatted_amount))
             
             # 步骤2: 从资金账户转到现货账户
             self.logger.debug(f"步骤2: 将 {formatted_amount} {asset} 从资金账户转到现货")
             # 注意：OKX SDK使用 from_ 代替 from（避免Python关键字冲突）
-            transfer_result = await asyncio.to_thread(
-                self.funding_api.funds_transfer,
+            transfer_result = await self._call(
+                'funds_transfer', self.funding_api.funds_transfer,
                 ccy=asset,
                 amt=formatted_amount,
                 from_='6',  # 6 = 资金账户
@@ -475,8 +713,8 @@ class ExchangeClient:
             # 步骤1: 从现货账户转到资金账户
             self.logger.debug(f"步骤1: 将 {formatted_amount} {asset} 从现货转到资金账户")
             # 注意：OKX SDK使用 from_ 代替 from（避免Python关键字冲突）
-            transfer_result = await asyncio.to_thread(
-                self.funding_api.funds_transfer,
+            transfer_result = await self._call(
+                'funds_transfer', self.funding_api.funds_transfer,
                 ccy=asset,
                 amt=formatted_amount,
                 from_='18',  # 18 = 现货账户
@@ -491,8 +729,8 @@ class ExchangeClient:
             
             self.logger.debug(f"现货→资金账户转账成功")
             
-            # 等待资金到账
-            await asyncio.sleep(1)
+            # 轮询确认资金账户已到账（代替固定等待）
+            await self.wait_for_balance('funding', asset, float(formatted_amount))
             
             # 步骤2: 从资金账户申购到简单赚币
             self.logger.debug(f"步骤2: 将 {formatted_amount} {asset} 申购到简单赚币")
@@ -514,7 +752,7 @@ class ExchangeClient:
                 'side': 'purchase',
                 'rate': '0.01',  # 年化利率1%（小数格式：0.01 = 1%），根据实际需求调整
             }
-            result = await asyncio.to_thread(self.savings_api.savings_purchase_redemption, **params)
+            result = await self._call('savings_purchase_redemption', self.savings_api.savings_purchase_redemption, **params)
             
             if result['code'] != '0':
                 error_msg = f"申购简单赚币失败: {result['msg']} | 错误码: {result['code']}"
@@ -541,10 +779,10 @@ class ExchangeClient:
         """获取指定交易对的最近成交记录"""
         self.logger.debug(f"获取最近 {limit} 条成交记录 for {symbol}...")
         if not self.markets_loaded:
-            self.load_markets()
+            await self.load_markets()
         try:
             # 确保使用市场ID
-            trades = await asyncio.to_thread(self.trade_api.get_orders_history,
+            trades = await self._call('get_orders_history', self.trade_api.get_orders_history,
                 instType='SPOT',
                 instId=symbol,
                 limit=limit
@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+import speedups
+
+
+class LeaseLostError(RuntimeError):
+    """主节点续约失败（租约已过期或被备用节点接管）"""
+
+
+class LeaseLock:
+    """基于 SQLite 的租约锁，同一台机器上的多个进程共享同一个数据库文件
+
+    租约记录 (持有者, 到期时间, 纪元)：没有持有者或已过期时任何进程都可以获得，
+    持有者在到期前续约；每次易主纪元加一。获取、续约和状态写入都在 BEGIN IMMEDIATE
+    事务中完成，写入状态时会校验租约仍由自己持有，被接管后的旧主节点无法覆盖状态。
+    方法会在 asyncio.to_thread 的不同线程中调用，共用的连接由 _lock 串行化；
+    每次获取或续约时顺带记下租约记录，last_info() 直接返回它，不访问数据库。
+    """
+
+    def __init__(self, path, name='grid-trader', ttl=3.0, holder=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self.epoch = None
+        self.expires_at = 0.0       # 本地单调时钟下的租约到期时间
+        self._seen = None           # 最近一次读到的租约记录 (持有者, 到期时间, 纪元)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=ttl, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS lease (
+                name TEXT PRIMARY KEY,
+                holder TEXT,
+                expires_at REAL,
+                epoch INTEGER
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS state (
+                name TEXT PRIMARY KEY,
+                value TEXT,
+                epoch INTEGER,
+                updated_at REAL
+            )
+        ''')
+
+    def acquire(self):
+        """获取或续约租约，返回是否持有"""
+        with self._lock:
+            return self._acquire()
+
+    def _acquire(self):
+        now = time.time()
+        started = time.monotonic()
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self._conn.execute(
+                'SELECT holder, expires_at, epoch FROM lease WHERE name = ?', (self.name,)
+            ).fetchone()
+            if row is not None and row[0] != self.holder and row[1] > now:
+                self._conn.execute('COMMIT')
+                self.expires_at = 0.0
+                self._seen = row
+                return False
+            if row is not None and row[0] == self.holder:
+                epoch = row[2]
+            else:
+                epoch = (row[2] if row is not None else 0) + 1
+            self._conn.execute(
+                'INSERT OR REPLACE INTO lease (name, holder, expires_at, epoch) VALUES (?, ?, ?, ?)',
+                (self.name, self.holder, now + self.ttl, epoch)
+            )
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        if epoch != self.epoch:
+            self.logger.info(f"获得租约 | 持有者: {self.holder} | 纪元: {epoch}")
+        self.epoch = epoch
+        self.expires_at = started + self.ttl
+        self._seen = (self.holder, now + self.ttl, epoch)
+        return True
+
+    def held(self, margin=0.0):
+        """按本地时钟判断租约是否仍有效（提前 margin 秒视为失效）"""
+        return time.monotonic() < self.expires_at - margin
+
+    def release(self):
+        """主动释放租约，备用节点可立即接管"""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'UPDATE lease SET expires_at = 0 WHERE name = ? AND holder = ?', (self.name, self.holder)
+                )
+            self.expires_at = 0.0
+            self.logger.info(f"已释放租约 | 持有者: {self.holder}")
+        except Exception as e:
+            self.logger.error(f"释放租约失败: {str(e)}")
+
+    def info(self):
+        with self._lock:
+            self._seen = self._conn.execute(
+                'SELECT holder, expires_at, epoch FROM lease WHERE name = ?', (self.name,)
+            ).fetchone()
+        return self.last_info()
+
+    def last_info(self):
+        """最近一次获取、续约或 info() 时读到的租约记录（不访问数据库，可在事件循环中调用）"""
+        row = self._seen
+        if row is None:
+            return None
+        return {'holder': row[0], 'expires_in': round(row[1] - time.time(), 3), 'epoch': row[2]}
+
+    def publish(self, state):
+        """写入复制状态，只有当前租约持有者能写入，返回是否成功"""
+        value = speedups.dumps(state)
+        with self._lock:
+            return self._publish(value)
+
+    def _publish(self, value):
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self._conn.execute(
+                'SELECT holder, expires_at FROM lease WHERE name = ?', (self.name,)
+            ).fetchone()
+            if row is None or row[0] != self.holder or row[1] <= time.time():
+                self._conn.execute('COMMIT')
+                return False
+            self._conn.execute(
+                'INSERT OR REPLACE INTO state (name, value, epoch, updated_at) VALUES (?, ?, ?, ?)',
+                (self.name, value, self.epoch, time.time())
+            )
+            self._conn.execute('COMMIT')
+            return True
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def read_state(self):
+        """返回 (状态, 写入时间)，没有状态时返回 (None, None)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, updated_at FROM state WHERE name = ?', (self.name,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return speedups.loads(row[0]), row[1]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FailoverCoordinator:
+    """主备切换协调器
+
+    备用节点（standby）在 wait_for_lease 中每 poll_interval 秒尝试获取租约，期间预先加载
+    市场数据并定期刷新行情，保持缓存处于热状态；主节点退出时主动释放租约，崩溃时租约在
+    ttl 秒后过期，备用节点随即接管，并从复制状态恢复基准价、网格大小、追踪中的最高/最低价
+    和S1高低点（挂单模式下还有两侧挂单的 clOrdId），不必重新初始化。主节点（active）在 run 中每 heartbeat 秒续约并写入状态，
+    续约失败时抛出 LeaseLostError 使进程退出，避免两个节点同时下单。
+    """
+
+    def __init__(self, trader, path, name='grid-trader', ttl=3.0, heartbeat=1.0, poll_interval=0.25,
+                 warm_interval=5.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.trader = trader
+        self.lease = LeaseLock(path, name=name, ttl=ttl)
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self.warm_interval = warm_interval
+        self.role = 'standby'
+        self.took_over_at = None
+        self.standby_seconds = 0.0
+
+    def is_active(self):
+        """主节点且租约在本地时钟下仍有效（预留一个心跳周期的余量）"""
+        return self.role == 'active' and self.lease.held(margin=min(self.heartbeat, self.lease.ttl / 2))
+
+    async def wait_for_lease(self):
+        """阻塞直到获得租约，返回可恢复的复制状态（没有时为 None）"""
+        started = time.monotonic()
+        last_warm = 0.0
+        logged = False
+        while True:
+            try:
+                if await asyncio.to_thread(self.lease.acquire):
+                    break
+            except Exception as e:
+                self.logger.error(f"获取租约失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+            if not logged:
+                info = await asyncio.to_thread(self.lease.info)
+                self.logger.info(f"进入备用模式，等待主节点租约过期 | 当前主节点: {info['holder'] if info else '--'}")
+                logged = True
+            if time.monotonic() - last_warm >= self.warm_interval:
+                last_warm = time.monotonic()
+                await self._warm_caches()
+            await asyncio.sleep(self.poll_interval)
+        self.role = 'active'
+        self.took_over_at = time.time()
+        self.standby_seconds = time.monotonic() - started
+        state, updated_at = await asyncio.to_thread(self.lease.read_state)
+        if state is not None:
+            self.logger.info(
+                f"接管为主节点 | 纪元: {self.lease.epoch} | 复制状态距今: {time.time() - updated_at:.1f}秒"
+            )
+        else:
+            self.logger.info(f"成为主节点 | 纪元: {self.lease.epoch} | 无复制状态，正常初始化")
+        return state
+
+    async def _warm_caches(self):
+        """备用期间预先加载市场数据并刷新行情"""
+        try:
+            if not self.trader.exchange.markets_loaded:
+                await self.trader.exchange.load_markets()
+            price = await self.trader._get_latest_price()
+            if price:
+                self.trader.current_price = price
+                self.trader.cadence.observe(price)
+        except Exception as e:
+            self.logger.warning(f"备用节点预热缓存失败: {str(e)}")
+
+    async def run(self):
+        """主节点心跳：续约并写入复制状态，续约失败时抛出 LeaseLostError"""
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                renewed = await asyncio.to_thread(self.lease.acquire)
+            except Exception as e:
+                self.logger.error(f"续约失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+                renewed = self.lease.held()
+            if not renewed:
+                self.role = 'standby'
+                raise LeaseLostError("租约已被其他节点接管，停止交易")
+            if not self.trader.initialized:
+                continue
+            try:
+                await asyncio.to_thread(self.lease.publish, self.trader.export_state())
+            except Exception as e:
+                self.logger.error(f"写入复制状态失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+
+    def release(self):
+        if self.role == 'active':
+            self.lease.release()
+            self.role = 'standby'
+        self.lease.close()
+
+    def snapshot(self):
+        return {
+            'role': self.role,
+            'holder': self.lease.holder,
+            'epoch': self.lease.epoch,
+            'lease': self.lease.last_info(),
+            'took_over_at': self.took_over_at,
+            'standby_seconds': round(self.standby_seconds, 3)
+        }
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import math
+import time
+import traceback
+
+from exchange_client import detach_call_counter
+from metrics import FUND_MOVES
+
+# OKX 账户类型
+SPOT_ACCOUNT = '18'     # 交易账户（现货）
+FUNDING_ACCOUNT = '6'   # 资金账户
+
+
+def format_amount(asset, amount):
+    """按币种精度向下取整（USDT 2位，其他8位），避免划转金额超过可用余额"""
+    decimals = 2 if asset == 'USDT' else 8
+    scale = 10 ** decimals
+    return "{:.{}f}".format(math.floor(amount * scale + 1e-9) / scale, decimals)
+
+
+class FundPlanner:
+    """资金划转规划器
+
+    资金分布在现货（交易账户）、资金账户和简单赚币三处。以前交易前补足余额、成交后把多余
+    资金转入理财、定期把资金账户转入现货各自独立划转并固定等待1~5秒，常出现先把资金账户
+    转入现货、成交后又从现货转回资金账户申购理财这样方向相反的划转。
+
+    规划器对每个币种只计算一个现货目标，再由当前三处余额得出净划转：
+    - 现货不足：先用资金账户余额，不够的部分从理财赎回，合并为一次 资金账户→现货 划转；
+    - 现货超出目标：超出部分转入资金账户，与资金账户中原有的余额合并为一次申购；
+    - 资金账户余额在目标以内转入现货，超出部分直接申购，不再经过现货。
+    每一步划转后轮询余额确认下一步所需的资金已到账，通常首次查询即可继续，不再固定等待。
+    同一币种的划转由锁串行执行；成交后的再平衡在后台延迟执行，多次成交合并为一次，
+    不计入交易延迟。
+    """
+
+    def __init__(self, exchange, assets, targets=None, hold_ratio=0.15, buffer=0.05, min_transfer=None,
+                 min_savings=None, poll_interval=0.2, confirm_timeout=10.0, rebalance_delay=5.0):
+        """
+        Args:
+            exchange: ExchangeClient
+            assets: 参与规划的币种，如 ['USDT', 'OKB']
+            targets: 异步函数，返回 {币种: (现货下限, 现货上限)}，无法计算时返回 None
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.exchange = exchange
+        self.assets = list(assets)
+        self.targets = targets
+        self.hold_ratio = hold_ratio
+        self.buffer = buffer
+        self.min_transfer = min_transfer or {'USDT': 0.01, 'default': 0.001}
+        self.min_savings = min_savings or {'USDT': 1.0, 'default': 0.01}
+        self.poll_interval = poll_interval
+        self.confirm_timeout = confirm_timeout
+        self.rebalance_delay = rebalance_delay
+        self._locks = {asset: asyncio.Lock() for asset in self.assets}
+        self._pending = None
+        self.stats = {'ensures': 0, 'busy': 0, 'rebalances': 0, 'coalesced': 0, 'legs': 0, 'confirm_seconds': 0.0}
+        self.generation = 0  # 成功执行的划转次数，余额可能因此变化（供调用方判断是否需要重新检查余额）
+
+    @staticmethod
+    def _minimum(table, asset):
+        return table.get(asset, table.get('default', 0))
+
+    def plan(self, asset, spot, funding, savings, floor=0.0, ceiling=None, sweep=False):
+        """由当前余额计算净划转（不访问交易所）
+
+        现货目标 = max(floor, min(现货 + 资金账户, ceiling))，且不超过三处余额之和；
+        ceiling 为 None 时不把现货转出。sweep 为 True 时资金账户中剩余的余额申购理财。
+
+        Returns:
+            list: [(划转类型, 金额), ...]，按执行顺序排列；类型为 redeem（理财→资金账户）、
+            to_spot（资金账户→现货）、to_funding（现货→资金账户）、purchase（资金账户→理财）
+        """
+        min_transfer = self._minimum(self.min_transfer, asset)
+        min_savings = self._minimum(self.min_savings, asset)
+        ceiling = spot if ceiling is None else ceiling
+        target = min(max(floor, min(spot + funding, ceiling)), spot + funding + savings)
+        delta = target - spot
+        legs = []
+        leftover = funding
+        if delta >= min_transfer:
+            if delta > funding:
+                # 缺口不足最小赎回金额时按最小金额赎回；理财余额低于最小金额时无法赎回
+                redeem = min(max(delta - funding, min_savings), savings)
+                if redeem < min_savings:
+                    redeem = 0.0
+                if redeem > 0:
+                    legs.append(('redeem', redeem))
+                    # 赎回多出的部分留在资金账户，不再申购回去
+                    sweep = False
+                leftover += redeem
+            amount = min(delta, leftover)
+            if amount >= min_transfer:
+                legs.append(('to_spot', amount))
+                leftover -= amount
+        elif sweep and -delta >= min_savings:
+            legs.append(('to_funding', -delta))
+            leftover -= delta
+        if sweep and leftover >= min_savings:
+            legs.append(('purchase', leftover))
+        return legs
+
+    async def _balances(self, asset, fresh=False):
+        if fresh:
+            self.exchange.invalidate_balance_cache()
+        balance = await self.exchange.fetch_balance()
+        funding = await self.exchange.fetch_funding_balance()
+        savings = await self.exchange.fetch_savings_balance()
+        return (
+            float(balance.get('free', {}).get(asset, 0) or 0),
+            float(funding.get(asset, 0) or 0),
+            float(savings.get(asset, 0) or 0)
+        )
+
+    async def _confirm(self, account, asset, minimum):
+        started = time.monotonic()
+        try:
+            return await self.exchange.wait_for_balance(
+                account, asset, minimum, timeout=self.confirm_timeout, interval=self.poll_interval
+            )
+        finally:
+            self.stats['confirm_seconds'] += time.monotonic() - started
+
+    async def _run_leg(self, asset, leg, amount):
+        amt = format_amount(asset, amount)
+        if leg in ('redeem', 'purchase'):
+            result = await self.exchange.savings_order(asset, amt, 'redempt' if leg == 'redeem' else 'purchase')
+        else:
+            from_, to = (FUNDING_ACCOUNT, SPOT_ACCOUNT) if leg == 'to_spot' else (SPOT_ACCOUNT, FUNDING_ACCOUNT)
+            result = await self.exchange.funds_transfer(ccy=asset, amt=amt, from_=from_, to=to)
+        self.stats['legs'] += 1
+        if result.get('code') != '0':
+            FUND_MOVES.labels(leg, 'failed').inc()
+            raise RuntimeError(f"{leg} {amt} {asset} 失败: {result.get('msg')} | 错误码: {result.get('code')}")
+        FUND_MOVES.labels(leg, 'ok').inc()
+        self.generation += 1
+        self.logger.info(f"资金划转 | {leg}: {amt} {asset}")
+
+    async def _execute(self, asset, legs):
+        """按顺序执行划转；下一步需要资金账户余额时先轮询确认到账"""
+        for i, (leg, amount) in enumerate(legs):
+            if leg in ('to_spot', 'purchase') and i > 0:
+                if not await self._confirm('funding', asset, float(format_amount(asset, amount))):
+                    raise RuntimeError(f"{asset} 未能在 {self.confirm_timeout} 秒内到账资金账户")
+            await self._run_leg(asset, leg, amount)
+
+    async def ensure(self, asset, required, redeem=True, wait=True):
+        """确保现货可用余额不低于 required，不足时从资金账户和理财一次性补足（多补 buffer 比例）
+
+        redeem 为 False 时只用资金账户余额（一次账户内划转），不等待理财赎回。
+        wait 为 False 时（下单路径）该币种正在划转（后台补足或再平衡持有锁，可能在等待赎回
+        到账）则不排队等待，直接返回 None，由调用方稍后重试。
+
+        Returns:
+            bool: 现货余额是否足够；wait 为 False 且该币种正在划转时返回 None
+        """
+        lock = self._locks[asset]
+        if not wait and lock.locked():
+            self.stats['busy'] += 1
+            self.logger.info(f"{asset}资金划转进行中，不等待补足 | 所需: {required:.8f}")
+            return None
+        async with lock:
+            self.stats['ensures'] += 1
+            try:
+                spot, funding, savings = await self._balances(asset)
+                if spot >= required:
+                    return True
+                legs = self.plan(asset, spot, funding, savings if redeem else 0.0, floor=required * (1 + self.buffer))
+                if sum(amount for leg, amount in legs if leg == 'to_spot') + spot < required:
+                    self.logger.warning(
+                        f"{asset}余额不足 | 所需: {required:.8f} | 现货: {spot:.8f} | "
+                        f"资金账户: {funding:.8f} | 简单赚币: {savings:.8f}"
+                    )
+                    return False
+                self.logger.info(f"补足现货{asset} | 所需: {required:.8f} | 现货: {spot:.8f} | 划转: {legs}")
+                await self._execute(asset, legs)
+                return await self._confirm('spot', asset, required)
+            except Exception as e:
+                self.logger.error(f"补足现货{asset}失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+                return False
+
+    async def rebalance(self):
+        """按目标再平衡各币种：现货补足到下限（必要时赎回），资金账户余额补入现货至上限，超出部分与现货多余资金合并申购理财"""
+        targets = await self.targets() if self.targets is not None else None
+        if not targets:
+            return
+        self.stats['rebalances'] += 1
+        for asset in self.assets:
+            if asset not in targets:
+                continue
+            async with self._locks[asset]:
+                try:
+                    floor, ceiling = targets[asset]
+                    spot, funding, savings = await self._balances(asset, fresh=True)
+                    legs = self.plan(asset, spot, funding, savings, floor=floor, ceiling=max(floor, ceiling), sweep=True)
+                    self.logger.info(
+                        f"资金再平衡 | {asset} 现货: {spot:.8f} | 资金账户: {funding:.8f} | "
+                        f"目标: {floor:.8f} ~ {ceiling:.8f} | 划转: {legs or '无需调整'}"
+                    )
+                    await self._execute(asset, legs)
+                except Exception as e:
+                    self.logger.error(f"{asset}资金再平衡失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+
+    def schedule_rebalance(self):
+        """成交后调用：rebalance_delay 秒后在后台再平衡一次，期间的多次调用合并，不阻塞调用方"""
+        if self._pending is not None and not self._pending.done():
+            self.stats['coalesced'] += 1
+            return
+        self._pending = asyncio.create_task(self._delayed_rebalance())
+
+    async def _delayed_rebalance(self):
+        detach_call_counter()
+        await asyncio.sleep(self.rebalance_delay)
+        await self.rebalance()
+
+    def snapshot(self):
+        return dict(self.stats, confirm_seconds=round(self.stats['confirm_seconds'], 3))
@@ -1,13 +1,14 @@
 import logging
 import requests
 from tenacity import retry, stop_after_attempt, wait_exponential
-from config import WECHAT_WEBHOOK_KEY
+from config import WECHAT_WEBHOOK_URL, NOTIFY_PARAMS
 import time
+import functools
 import psutil
 import os
-from logging.handlers import TimedRotatingFileHandler
 import sys
 from datetime import datetime
+from log_pipeline import AsyncLogHandler, BatchRotatingFileHandler, BatchStreamHandler, EmitTimer
 
 def format_trade_message(side, symbol, price, amount, total, grid_size, retry_count=None):
     """格式化交易消息为美观的文本格式
@@ -48,18 +49,30 @@ def format_trade_message(side, symbol, price, amount, total, grid_size, retry_co
     
     return message
 
+# 由 main.py 安装的异步通知分发器，未安装时回退为同步发送
+_notification_dispatcher = None
+
+def set_notification_dispatcher(dispatcher):
+    """安装（或传入None卸载）异步通知分发器"""
+    global _notification_dispatcher
+    _notification_dispatcher = dispatcher
+
 def send_wechat_message(content, title="交易信号通知"):
     """发送企业微信机器人消息
     
+    已安装并运行异步通知分发器时只入队，不等待网络；否则同步发送（带超时）。
+    
     Args:
         content (str): 消息内容
         title (str): 消息标题
     """
-    if not WECHAT_WEBHOOK_KEY or WECHAT_WEBHOOK_KEY == "your_webhook_key_here":
+    if not WECHAT_WEBHOOK_URL:
         logging.debug("未配置有效的WECHAT_WEBHOOK_KEY，跳过推送通知")
         return
     
-    url = f"https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key={WECHAT_WEBHOOK_KEY}"
+    if _notification_dispatcher is not None and _notification_dispatcher.running:
+        _notification_dispatcher.notify(content, title)
+        return
     
     # 构建markdown格式的消息
     markdown_content = f"### {title}\n{content}"
@@ -73,7 +86,7 @@ def send_wechat_message(content, title="交易信号通知"):
     
     try:
         logging.debug(f"发送推送通知: {title}")
-        response = requests.post(url, json=data)
+        response = requests.post(WECHAT_WEBHOOK_URL, json=data, timeout=NOTIFY_PARAMS['timeout'])
         response_json = response.json()
         
         if response.status_code == 200 and response_json.get('errcode') == 0:
@@ -95,20 +108,28 @@ async def safe_fetch(method, *args, **kwargs):
         raise 
 
 def debug_watcher():
-    """资源监控装饰器"""
+    """资源监控装饰器：记录本进程的耗时、CPU时间和常驻内存（RSS）变化"""
     def decorator(func):
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            start = time.time()
-            mem_before = psutil.virtual_memory().used
+            process = psutil.Process()
+            start = time.perf_counter()
+            cpu_before = process.cpu_times()
+            rss_before = process.memory_info().rss
             logging.debug(f"[DEBUG] 开始执行 {func.__name__}")
             
             try:
                 result = await func(*args, **kwargs)
                 return result
             finally:
-                cost = time.time() - start
-                mem_used = psutil.virtual_memory().used - mem_before
-                logging.debug(f"[DEBUG] {func.__name__} 执行完成 | 耗时: {cost:.3f}s | 内存变化: {mem_used/1024/1024:.2f}MB")
+                cost = time.perf_counter() - start
+                cpu_after = process.cpu_times()
+                cpu_used = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+                rss_delta = process.memory_info().rss - rss_before
+                logging.debug(
+                    f"[DEBUG] {func.__name__} 执行完成 | 耗时: {cost:.3f}s | "
+                    f"进程CPU: {cpu_used:.3f}s | RSS变化: {rss_delta/1024/1024:+.2f}MB"
+                )
         return wrapper
     return decorator 
 
@@ -143,26 +164,41 @@ class LogConfig:
     BACKUP_DAYS = 7    # 保留7天日志
     LOG_DIR = os.path.dirname(__file__)  # 与main.py相同目录
     LOG_LEVEL = logging.INFO
+    ASYNC_LOGGING = True     # 通过队列在后台线程写日志，避免阻塞事件循环
+    COMPRESS_ROTATED = True  # 轮转出的旧日志压缩为 .gz
+    QUEUE_SIZE = 10000       # 日志队列容量
+    HIGH_WATERMARK = 0.8     # 队列积压超过该比例后低优先级日志开始抽样
+    SAMPLE_RATE = 10         # 抽样时每 N 条低优先级日志保留 1 条
+    BATCH_SIZE = 256         # 写线程每批最多写入的记录数
 
     @staticmethod
-    def setup_logger(console_output=True):
+    def setup_logger(console_output=True, async_mode=None):
         """
         设置日志系统
         
         Args:
             console_output (bool): 是否输出到控制台，默认True。
                                    守护进程模式下应设为False
+            async_mode (bool): 是否使用队列异步写日志，默认取 LogConfig.ASYNC_LOGGING。
+                               同步模式保留用于排查问题和性能对比
         """
+        if async_mode is None:
+            async_mode = LogConfig.ASYNC_LOGGING
+        
         logger = logging.getLogger()
         logger.setLevel(LogConfig.LOG_LEVEL)
         
         # 清理所有现有处理器
         for handler in logger.handlers[:]:
             logger.removeHandler(handler)
+            handler.close()
+        
+        handlers = []
         
         # 文件处理器 - 详细格式
-        file_handler = TimedRotatingFileHandler(
+        file_handler = BatchRotatingFileHandler(
             os.path.join(LogConfig.LOG_DIR, 'trading_system.log'),
+            compress=LogConfig.COMPRESS_ROTATED,
             when='midnight',
             interval=1,
             backupCount=LogConfig.BACKUP_DAYS,
@@ -174,17 +210,28 @@ class LogConfig:
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
         
         # 控制台处理器 - 彩色简洁格式（仅在非守护进程模式下）
         if console_output:
-            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler = BatchStreamHandler(sys.stdout)
             console_formatter = ColoredFormatter(
                 '%(asctime)s | %(levelname)s | %(name)s | %(message)s',
                 datefmt='%H:%M:%S'
             )
             console_handler.setFormatter(console_formatter)
-            logger.addHandler(console_handler)
+            handlers.append(console_handler)
+        
+        if async_mode:
+            logger.addHandler(AsyncLogHandler(
+                handlers,
+                queue_size=LogConfig.QUEUE_SIZE,
+                high_watermark=LogConfig.HIGH_WATERMARK,
+                sample_rate=LogConfig.SAMPLE_RATE,
+                batch_size=LogConfig.BATCH_SIZE
+            ))
+        else:
+            logger.addHandler(EmitTimer(handlers))
 
     @staticmethod
     def clean_old_logs():
@@ -0,0 +1,238 @@
+import logging
+import time
+import traceback
+
+from order_registry import OrderState, make_client_order_id
+from metrics import ORDERS
+
+
+class GridLadder:
+    """挂单模式（ladder）：在网格上下轨预先挂好被动的 post_only 限价单
+
+    信号模式要等价格穿过上下轨并回撤 FLIP_THRESHOLD 后才吃单成交；挂单模式让买单
+    常驻在下轨、卖单常驻在上轨，价格一到即以 maker 身份成交，没有信号到成交的延迟，
+    也只付 maker 手续费。
+
+    reconcile() 在每个主循环周期调用，只做增量调整：
+    - 一次 fetch_open_orders 确认两侧挂单是否仍在，消失的挂单再单独查询确认成交或撤销；
+    - 基准价或网格大小变化导致目标价偏离超过 reprice_threshold 时原地改价，订单不撤；
+    - 挂单成交后走与信号模式相同的 _handle_filled_order（更新基准价、记账、通知），
+      下一轮两侧按新基准价重新定位。
+    目标价会越过盘口时（价格已经在轨道外），改为挂在己方最优价，保证 post_only 不被拒。
+    某侧因仓位上限、余额不足或等待后台补足而无法挂单时，记住当时的条件（基准价、网格大小、
+    资金划转次数），条件不变时 retry_cooldown 秒内不再检查余额，同一条件只通知一次。
+
+    两侧挂单的 clOrdId 随主备复制状态写入（export_rungs/restore）；启动或接管后第一次
+    reconcile 之前调用 adopt_open_orders()，收养交易所上仍挂着的本策略挂单，每侧多余的撤销，
+    避免旧挂单成为无人管理的孤儿单。
+    """
+
+    SIDES = ('buy', 'sell')
+    CLIENT_ID_PREFIX = 'lad'  # 挂单 clOrdId 前缀，用于识别本策略的挂单
+
+    def __init__(self, trader, order_type='post_only', reprice_threshold=0.0005, cancel_on_exit=True,
+                 retry_cooldown=300):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.trader = trader
+        self.order_type = order_type
+        self.reprice_threshold = reprice_threshold
+        self.cancel_on_exit = cancel_on_exit
+        self.rungs = {side: None for side in self.SIDES}  # 每侧当前挂单的 OrderRecord
+        self.retry_cooldown = retry_cooldown
+        self._blocked = {side: None for side in self.SIDES}  # 每侧无法挂单时的 (条件, 下次检查的单调时间)
+        self._seq = 0
+
+    @property
+    def symbol(self):
+        return self.trader.config.SYMBOL
+
+    def target_price(self, side, order_book):
+        """某一侧挂单的目标价：买单在下轨、卖单在上轨，越过盘口时退到己方最优价，精度与盘口价格一致"""
+        raw_bid, raw_ask = order_book['bids'][0][0], order_book['asks'][0][0]
+        best_bid, best_ask = float(raw_bid), float(raw_ask)
+        decimals = max(len(raw.split('.')[1]) if '.' in raw else 0 for raw in (raw_bid, raw_ask))
+        if side == 'buy':
+            price = self.trader._get_lower_band()
+            if price >= best_ask:
+                price = best_bid
+        else:
+            price = self.trader._get_upper_band()
+            if price <= best_bid:
+                price = best_ask
+        return round(price, decimals)
+
+    async def reconcile(self):
+        """检查两侧挂单的成交情况，并把挂单移动到当前的目标价"""
+        try:
+            await self._sync_rungs()
+            order_book = await self.trader._get_order_book()
+            if not order_book or not order_book.get('asks') or not order_book.get('bids'):
+                self.logger.warning("获取订单簿数据失败，本轮不调整挂单")
+                return
+            for side in self.SIDES:
+                await self._place_or_amend(side, self.target_price(side, order_book))
+        except Exception as e:
+            self.logger.error(f"挂单调整失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+
+    async def _sync_rungs(self):
+        live = [record for record in self.rungs.values() if record is not None and not record.state.terminal]
+        if not live:
+            return
+        open_ids = {order['ordId'] for order in await self.trader.exchange.fetch_open_orders(self.symbol)}
+        for record in live:
+            if record.ord_id in open_ids:
+                continue
+            # 不在未成交列表中：已成交或已被撤销（post_only 会穿过盘口时交易所会直接撤单）
+            order = await self.trader.exchange.fetch_order(None, self.symbol, client_order_id=record.cl_ord_id)
+            self.trader.order_tracker.orders.update_from_exchange(order)
+            if order['status'] == 'closed':
+                self.rungs[record.side] = None
+                await self.trader._handle_filled_order(record.side, order)
+            elif order['status'] == 'canceled':
+                self.rungs[record.side] = None
+                self.logger.info(f"挂单已被撤销，将重新挂单 | ID: {record.ord_id} | 已成交数量: {order['filled']}")
+                if order['filled'] > 0:
+                    # 部分成交后被撤销，已成交部分按成交处理
+                    await self.trader._handle_filled_order(record.side, order)
+
+    async def _place_or_amend(self, side, price):
+        record = self.rungs[side]
+        if record is None or record.state.terminal:
+            await self._place(side, price)
+            return
+        if record.state is OrderState.PARTIALLY_FILLED:
+            # 部分成交的挂单不改价，等待成交完成
+            return
+        if abs(price - record.price) / record.price <= self.reprice_threshold:
+            return
+        try:
+            await self.trader.exchange.amend_order(self.symbol, client_order_id=record.cl_ord_id, new_price=price)
+        except Exception as e:
+            # 改单失败多半是挂单刚好成交或已撤销，下一轮由 _sync_rungs 确认
+            self.logger.warning(f"挂单改价失败，下一轮核对状态 | ID: {record.ord_id} | 错误: {str(e)}")
+            return
+        ORDERS.labels(side, 'amended').inc()
+        self.logger.info(f"挂单改价 | 方向: {side} | ID: {record.ord_id} | {record.price} → {price}")
+        record.price = price
+
+    def _condition(self):
+        """决定能否挂单的条件：基准价和网格大小（目标档位）、资金划转次数（余额）"""
+        return (self.trader.base_price, self.trader.grid_size, self.trader.fund_planner.generation)
+
+    async def _place(self, side, price):
+        trader = self.trader
+        condition = self._condition()
+        blocked = self._blocked[side]
+        if blocked is not None and blocked[0] == condition and time.monotonic() < blocked[1]:
+            return
+        amount_usdt = await trader._calculate_order_amount(side)
+        amount = trader._adjust_amount_precision(amount_usdt / price)
+        if amount <= 0:
+            return
+        # 冷却到期但条件未变时只重新检查，不再重复发送资金不足通知
+        notify = blocked is None or blocked[0] != condition
+        if side == 'buy':
+            ok = await trader.check_buy_balance(price, notify=notify)
+        else:
+            ok = await trader.check_sell_balance(notify=notify)
+        if ok is None:
+            # 资金正在到账（后台补足或划转进行中），下一轮再检查，不进入冷却
+            return
+        if not ok:
+            if notify:
+                self.logger.warning(f"暂停挂单 | 方向: {side} | 条件变化或 {self.retry_cooldown} 秒后再检查")
+            self._blocked[side] = (condition, time.monotonic() + self.retry_cooldown)
+            return
+        self._blocked[side] = None
+        await trader.throttler.acquire()
+        self._seq += 1
+        client_order_id = make_client_order_id(self.CLIENT_ID_PREFIX, side, int(time.time() * 1000), self._seq)
+        try:
+            record, _ = await trader._submit_order(side, self.order_type, amount, price, client_order_id, timeout=0)
+        except Exception as e:
+            self.logger.error(f"挂单失败: {str(e)} | 方向: {side} | 价格: {price} | 数量: {amount}")
+            return
+        self.rungs[side] = record
+        ORDERS.labels(side, 'placed').inc()
+        self.logger.info(f"挂单已提交 | 方向: {side} | 价格: {price} | 数量: {amount} | ID: {record.ord_id}")
+
+    async def shutdown(self):
+        """进程退出时调用：cancel_on_exit 且本进程仍是主节点时撤销挂单
+
+        因失去租约退出时挂单已由接管的新主节点按 clOrdId 收养，撤销会撤掉对方的挂单。
+        """
+        failover = self.trader.failover
+        if not self.cancel_on_exit:
+            return
+        if failover is not None and failover.role != 'active':
+            self.logger.info("已失去租约，挂单交由新主节点管理，退出时不撤销")
+            return
+        await self.cancel_all()
+
+    async def cancel_all(self):
+        """撤销两侧挂单（退出或切换回信号模式时调用）"""
+        for side, record in self.rungs.items():
+            if record is None or record.state.terminal:
+                continue
+            try:
+                await self.trader.exchange.cancel_order(None, self.symbol, client_order_id=record.cl_ord_id)
+                self.trader.order_tracker.orders.transition(record, OrderState.CANCELLED)
+                ORDERS.labels(side, 'cancelled').inc()
+                self.logger.info(f"挂单已撤销 | 方向: {side} | ID: {record.ord_id}")
+            except Exception as e:
+                self.logger.error(f"撤销挂单失败: {str(e)} | ID: {record.ord_id} | 堆栈信息: {traceback.format_exc()}")
+            self.rungs[side] = None
+
+    def export_rungs(self):
+        """复制状态中的挂单信息：{方向: {cl_ord_id, price, amount}}"""
+        return {
+            side: {'cl_ord_id': record.cl_ord_id, 'price': record.price, 'amount': record.amount}
+            for side, record in self.rungs.items() if record is not None and not record.state.terminal
+        }
+
+    def restore(self, rungs):
+        """从复制状态登记原主节点的挂单，成交或撤销由 adopt_open_orders/_sync_rungs 按 clOrdId 确认"""
+        for side, info in rungs.items():
+            if side not in self.rungs or not info or not info.get('cl_ord_id'):
+                continue
+            self.rungs[side] = self.trader.order_tracker.orders.add(
+                side, info['price'], info['amount'], cl_ord_id=info['cl_ord_id']
+            )
+            self.logger.info(f"从复制状态恢复挂单 | 方向: {side} | clOrdId: {info['cl_ord_id']} | 价格: {info['price']}")
+
+    async def adopt_open_orders(self):
+        """收养交易所上本策略的未成交挂单（启动或接管后、第一次 reconcile 之前调用）
+
+        已登记的挂单绑定交易所订单；某侧还没有挂单时收养该订单作为这一侧的挂单；
+        同一侧多出来的挂单撤销。已登记但不在未成交列表中的挂单留给 _sync_rungs 查询确认。
+        """
+        try:
+            open_orders = await self.trader.exchange.fetch_open_orders(self.symbol)
+        except Exception as e:
+            self.logger.error(f"查询未成交挂单失败，跳过收养: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+            return
+        orders = self.trader.order_tracker.orders
+        for order in open_orders:
+            cl_ord_id = order.get('clOrdId') or ''
+            side = order.get('side')
+            if not cl_ord_id.startswith(self.CLIENT_ID_PREFIX) or side not in self.rungs:
+                continue
+            record = self.rungs[side]
+            if record is not None and record.cl_ord_id == cl_ord_id:
+                orders.update_from_exchange(order)
+                continue
+            if record is None or record.state.terminal:
+                record = orders.add(side, order['price'], order['amount'], cl_ord_id=cl_ord_id)
+                orders.update_from_exchange(order)
+                self.rungs[side] = record
+                self.logger.info(f"收养未成交挂单 | 方向: {side} | ID: {record.ord_id} | 价格: {record.price}")
+                continue
+            try:
+                await self.trader.exchange.cancel_order(None, self.symbol, client_order_id=cl_ord_id)
+                ORDERS.labels(side, 'cancelled').inc()
+                self.logger.info(f"撤销多余挂单 | 方向: {side} | ID: {order.get('ordId')} | 价格: {order['price']}")
+            except Exception as e:
+                self.logger.error(f"撤销多余挂单失败: {str(e)} | ID: {order.get('ordId')} | 堆栈信息: {traceback.format_exc()}")
+
+    def snapshot(self):
+        return {side: (record.to_dict() if record is not None else None) for side, record in self.rungs.items()}
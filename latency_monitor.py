@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+
+# 单笔交易的阶段顺序：行情到达 → 信号 → 余额检查 → 提交订单 → 交易所确认 → 成交
+TRADE_STAGES = ('tick', 'signal', 'balance', 'submit', 'ack', 'fill')
+
+
+class LatencyHistogram:
+    """HDR风格的对数-线性分桶直方图（单位：微秒）
+
+    小于 2^sub_bucket_bits 的值精确计数，更大的值在每个2的幂区间内
+    再细分为 2^(sub_bucket_bits-1) 个子桶，相对误差约 1/2^(sub_bucket_bits-1)。
+    桶数组在初始化时一次性分配，记录时只做整数运算和列表自增。
+    """
+
+    def __init__(self, max_value_us=60_000_000, sub_bucket_bits=5):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.sub_bucket_half = self.sub_bucket_count >> 1
+        self.max_value_us = int(max_value_us)
+        self.counts = [0] * (self._index_of(self.max_value_us) + 1)
+        self.total_count = 0
+        self.total_sum = 0
+        self.min_value = None
+        self.max_value = 0
+
+    def _index_of(self, value):
+        """计算数值所在的桶下标"""
+        if value < self.sub_bucket_count:
+            return value
+        exp = value.bit_length() - self.sub_bucket_bits
+        sub = value >> exp
+        return self.sub_bucket_count + (exp - 1) * self.sub_bucket_half + (sub - self.sub_bucket_half)
+
+    def _upper_bound(self, index):
+        """桶下标对应的最大等价值"""
+        if index < self.sub_bucket_count:
+            return index
+        offset = index - self.sub_bucket_count
+        exp = offset // self.sub_bucket_half + 1
+        sub = offset % self.sub_bucket_half + self.sub_bucket_half
+        return ((sub + 1) << exp) - 1
+
+    def record(self, value_us):
+        """记录一个以微秒为单位的数值，超出上限的值按上限计入"""
+        value = int(value_us)
+        if value < 0:
+            value = 0
+        elif value > self.max_value_us:
+            value = self.max_value_us
+        self.counts[self._index_of(value)] += 1
+        self.total_count += 1
+        self.total_sum += value
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+
+    def record_seconds(self, seconds):
+        """记录一个以秒为单位的耗时"""
+        self.record(seconds * 1_000_000)
+
+    def percentile(self, pct):
+        """返回指定百分位（0-100）的数值（微秒）"""
+        if self.total_count == 0:
+            return 0
+        target = max(1, int(round(self.total_count * pct / 100.0)))
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return min(self._upper_bound(index), self.max_value)
+        return self.max_value
+
+    def cumulative_counts(self, bounds_us):
+        """返回小于等于各上界（微秒，升序）的累计计数，用于导出为固定分桶的直方图"""
+        result = []
+        running = 0
+        index = 0
+        for bound in bounds_us:
+            while index < len(self.counts) and self._upper_bound(index) <= bound:
+                running += self.counts[index]
+                index += 1
+            result.append(running)
+        return result
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.total_count = 0
+        self.total_sum = 0
+        self.min_value = None
+        self.max_value = 0
+
+    def snapshot(self):
+        """汇总为毫秒单位的字典，便于日志和JSON输出"""
+        if self.total_count == 0:
+            return {'count': 0}
+        return {
+            'count': self.total_count,
+            'min_ms': round(self.min_value / 1000, 3),
+            'mean_ms': round(self.total_sum / self.total_count / 1000, 3),
+            'p50_ms': round(self.percentile(50) / 1000, 3),
+            'p90_ms': round(self.percentile(90) / 1000, 3),
+            'p99_ms': round(self.percentile(99) / 1000, 3),
+            'p999_ms': round(self.percentile(99.9) / 1000, 3),
+            'max_ms': round(self.max_value / 1000, 3)
+        }
+
+
+class LoopLagMonitor:
+    """事件循环延迟监控：周期性休眠并测量实际唤醒时间比预期晚了多少"""
+
+    def __init__(self, interval=0.1, stall_threshold=0.1):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.histogram = LatencyHistogram()
+        self.stall_count = 0
+        self.last_lag = 0.0
+        self.last_stall_time = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self.last_lag = lag
+            self.histogram.record_seconds(lag)
+            if lag >= self.stall_threshold:
+                self.stall_count += 1
+                self.last_stall_time = time.time()
+
+    def snapshot(self):
+        return {
+            'interval_ms': self.interval * 1000,
+            'stall_threshold_ms': self.stall_threshold * 1000,
+            'stall_count': self.stall_count,
+            'last_lag_ms': round(self.last_lag * 1000, 3),
+            'last_stall_time': self.last_stall_time,
+            'lag': self.histogram.snapshot()
+        }
+
+
+class TradeLatencyTracker:
+    """记录单笔交易各阶段之间的耗时
+
+    每次行情到达调用 mark('tick') 开启新的追踪，之后各阶段只记录第一次到达的时间，
+    相邻阶段的耗时在到达时立即计入对应直方图，因此未成交的流程也会留下部分数据。
+    """
+
+    def __init__(self):
+        self.histograms = {
+            f'{prev}_to_{stage}': LatencyHistogram()
+            for prev, stage in zip(TRADE_STAGES, TRADE_STAGES[1:])
+        }
+        self.histograms['tick_to_fill'] = LatencyHistogram()
+        self._trace = {}
+        self.completed_trades = 0
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        if stage == 'tick':
+            self._trace = {'tick': now}
+            return
+        if stage in self._trace or 'tick' not in self._trace:
+            return
+        self._trace[stage] = now
+        prev = TRADE_STAGES[TRADE_STAGES.index(stage) - 1]
+        if prev in self._trace:
+            self.histograms[f'{prev}_to_{stage}'].record_seconds(now - self._trace[prev])
+        if stage == 'fill':
+            self.histograms['tick_to_fill'].record_seconds(now - self._trace['tick'])
+            self.completed_trades += 1
+
+    def snapshot(self):
+        return {
+            'completed_trades': self.completed_trades,
+            'stages': {name: hist.snapshot() for name, hist in self.histograms.items()}
+        }
+
+
+class LatencyMonitor:
+    """延迟监控汇总：事件循环延迟 + 交易链路耗时，并定期输出摘要日志"""
+
+    def __init__(self, loop_lag_interval=0.1, stall_threshold=0.1, summary_interval=300):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.loop_lag = LoopLagMonitor(loop_lag_interval, stall_threshold)
+        self.trade = TradeLatencyTracker()
+        self.summary_interval = summary_interval
+
+    async def run(self):
+        """启动事件循环延迟采样和定期摘要日志"""
+        await asyncio.gather(self.loop_lag.run(), self._summary_loop())
+
+    async def _summary_loop(self):
+        while True:
+            await asyncio.sleep(self.summary_interval)
+            try:
+                self.log_summary()
+            except Exception as e:
+                self.logger.error(f"输出延迟摘要失败: {str(e)}")
+
+    def log_summary(self):
+        lag = self.loop_lag.histogram.snapshot()
+        if lag.get('count'):
+            self.logger.info(
+                f"事件循环延迟 | "
+                f"p50: {lag['p50_ms']:.2f}ms | "
+                f"p99: {lag['p99_ms']:.2f}ms | "
+                f"最大: {lag['max_ms']:.2f}ms | "
+                f"卡顿次数: {self.loop_lag.stall_count}"
+            )
+        for name, hist in self.trade.histograms.items():
+            stats = hist.snapshot()
+            if stats.get('count'):
+                self.logger.info(
+                    f"交易链路耗时 | {name} | "
+                    f"次数: {stats['count']} | "
+                    f"p50: {stats['p50_ms']:.1f}ms | "
+                    f"p99: {stats['p99_ms']:.1f}ms | "
+                    f"最大: {stats['max_ms']:.1f}ms"
+                )
+
+    def snapshot(self):
+        return {
+            'loop': self.loop_lag.snapshot(),
+            'trade': self.trade.snapshot()
+        }
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import math
+import time
+import traceback
+
+from exchange_client import detach_call_counter
+
+_YEAR_SECONDS = 365 * 24 * 3600
+
+
+class LiquidityManager:
+    """预测下一笔交易所需资金，提前在现货账户备好，下单路径不再等待理财赎回
+
+    每一侧的储备 = 预计成交笔数 × 单笔金额（_calculate_order_amount）×（1 + margin）：
+    按年化波动率估算 horizon 秒内价格的 z 倍标准差波动幅度，统计当前价在该幅度内能到达的
+    网格档位数（基准价 × (1 ∓ k × grid_size%)），作为该侧预计成交笔数，至少1笔、至多
+    max_trades 笔。价格靠近下轨或波动加大时买入储备增加，远离时回落。
+
+    top_up 作为后台例行任务在信号之间运行，现货低于储备时通过资金规划器补足（可能需要赎回，
+    但不在下单路径上）；资金再平衡也以储备作为现货保留的下限，不会把储备申购回理财。
+    """
+
+    def __init__(self, trader, horizon=1800, z=2.0, max_trades=3, margin=0.05, enabled=True, deferred_ttl=600):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.trader = trader
+        self.horizon = horizon
+        self.z = z
+        self.max_trades = max_trades
+        self.margin = margin
+        self.enabled = enabled
+        self.deferred_ttl = deferred_ttl  # 等待资金到账而推迟的信号最长保留时间（秒）
+        self.reserves = {}        # {币种: 现货储备}
+        self.prediction = None    # 最近一次预测
+        self.top_ups = 0
+        self.shortfalls = 0       # 下单时现货低于所需、改为后台补足的次数
+        self._pending = None
+
+    def expected_trades(self, price, base_price, grid_size, volatility):
+        """返回 (预计买入笔数, 预计卖出笔数)"""
+        step = grid_size / 100
+        reach = self.z * volatility * math.sqrt(self.horizon / _YEAR_SECONDS)  # 相对价格波动幅度
+        low, high = price * (1 - reach), price * (1 + reach)
+        buys = sells = 0
+        for k in range(1, self.max_trades + 1):
+            if base_price * (1 - k * step) >= low:
+                buys += 1
+            if base_price * (1 + k * step) <= high:
+                sells += 1
+        return max(buys, 1), max(sells, 1)
+
+    async def predict(self):
+        """计算两侧储备：{'USDT': 买入储备, 币种: 卖出储备}，无法计算时返回 None"""
+        trader = self.trader
+        price = trader.current_price or await trader._get_latest_price()
+        if not price or not trader.base_price:
+            return None
+        order_usdt = await trader._calculate_order_amount('buy')
+        if order_usdt <= 0:
+            return None
+        volatility = await trader._calculate_volatility() or 0.0
+        buys, sells = self.expected_trades(price, trader.base_price, trader.grid_size, volatility)
+        base = trader.symbol_info['base']
+        self.reserves = {
+            'USDT': buys * order_usdt * (1 + self.margin),
+            base: sells * order_usdt / price * (1 + self.margin)
+        }
+        self.prediction = {
+            'price': price,
+            'volatility': volatility,
+            'order_usdt': order_usdt,
+            'buy_trades': buys,
+            'sell_trades': sells,
+            'reserves': dict(self.reserves),
+            'updated_at': time.time()
+        }
+        return self.reserves
+
+    async def top_up(self):
+        """后台补足：现货低于预测储备时从资金账户和理财补足"""
+        if not self.enabled:
+            return
+        try:
+            reserves = await self.predict()
+            if not reserves:
+                return
+            balance = await self.trader.exchange.fetch_balance()
+            for asset, reserve in reserves.items():
+                spot = float(balance.get('free', {}).get(asset, 0) or 0)
+                if spot >= reserve:
+                    continue
+                self.logger.info(f"现货{asset}低于预测储备，后台补足 | 现货: {spot:.8f} | 储备: {reserve:.8f}")
+                if await self.trader.fund_planner.ensure(asset, reserve):
+                    self.top_ups += 1
+        except Exception as e:
+            self.logger.error(f"补足交易储备失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+
+    def request_top_up(self):
+        """下单路径发现现货不足时调用：立即在后台补足一次，不阻塞调用方"""
+        self.shortfalls += 1
+        if self._pending is not None and not self._pending.done():
+            return
+        self._pending = asyncio.create_task(self._background_top_up())
+
+    async def _background_top_up(self):
+        detach_call_counter()
+        await self.top_up()
+
+    def snapshot(self):
+        return {
+            'enabled': self.enabled,
+            'prediction': self.prediction,
+            'top_ups': self.top_ups,
+            'shortfalls': self.shortfalls
+        }
@@ -0,0 +1,222 @@
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from logging.handlers import TimedRotatingFileHandler
+
+from metrics import REGISTRY
+
+
+class _BatchFlushMixin:
+    """批量写入：一批记录写完后只 flush 一次，而不是每条记录都 flush"""
+    _defer_flush = False
+
+    def flush(self):
+        if not self._defer_flush:
+            super().flush()
+
+    def handle_batch(self, records):
+        self._defer_flush = True
+        try:
+            for record in records:
+                self.handle(record)
+        finally:
+            self._defer_flush = False
+            self.flush()
+
+
+class BatchStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class BatchRotatingFileHandler(_BatchFlushMixin, TimedRotatingFileHandler):
+    """按天轮转的文件处理器，可选将轮转出的旧日志压缩为 .gz"""
+
+    def __init__(self, filename, compress=True, **kwargs):
+        super().__init__(filename, **kwargs)
+        if compress:
+            self.namer = _gzip_namer
+            self.rotator = _gzip_rotator
+
+
+class AsyncLogHandler(logging.Handler):
+    """基于有界队列的日志处理器
+
+    调用方（事件循环）只负责把记录追加到队列，格式化、写文件、轮转和压缩都在
+    后台写线程中批量完成。写线程每 flush_interval 秒醒来一次把队列写空，
+    调用方不需要唤醒它，入队只是一次 deque.append。
+    队列积压超过高水位时，低优先级记录（低于 WARNING）按 sample_rate 抽样保留，
+    队列满时直接丢弃；WARNING 及以上记录最多等待 block_timeout 秒，仍然没有
+    空位才丢弃。被丢弃的数量会由写线程补记一条警告。
+    """
+
+    def __init__(self, handlers, queue_size=10000, high_watermark=0.8, sample_rate=10,
+                 batch_size=256, block_timeout=0.05, flush_interval=0.05):
+        super().__init__()
+        self.handlers = list(handlers)
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.high_watermark = int(queue_size * high_watermark)
+        self.sample_rate = max(int(sample_rate), 1)
+        self.batch_size = batch_size
+        self.block_timeout = block_timeout
+        self.flush_interval = flush_interval
+        self.stats = {'queued': 0, 'sampled_out': 0, 'dropped': 0}
+        self.emit_seconds = 0.0
+        self._sample_counter = 0
+        self._reported_lost = 0
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._writer.start()
+
+    def prepare(self, record):
+        # 在调用方线程合并消息参数，避免写线程格式化时参数已被修改；
+        # 异常堆栈的格式化留给写线程
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record):
+        start = time.perf_counter()
+        try:
+            pending = len(self.queue)
+            if record.levelno < logging.WARNING:
+                if pending >= self.queue_size:
+                    self.stats['dropped'] += 1
+                    return
+                if pending >= self.high_watermark:
+                    self._sample_counter += 1
+                    if self._sample_counter % self.sample_rate:
+                        self.stats['sampled_out'] += 1
+                        return
+            elif pending >= self.queue_size:
+                deadline = start + self.block_timeout
+                while len(self.queue) >= self.queue_size and time.perf_counter() < deadline:
+                    time.sleep(0.001)
+                if len(self.queue) >= self.queue_size:
+                    self.stats['dropped'] += 1
+                    return
+            self.queue.append(self.prepare(record))
+            self.stats['queued'] += 1
+        except Exception:
+            self.handleError(record)
+        finally:
+            self.emit_seconds += time.perf_counter() - start
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        while self.queue:
+            batch = []
+            while self.queue and len(batch) < self.batch_size:
+                batch.append(self.queue.popleft())
+            self._write(batch)
+        lost = self.stats['dropped'] + self.stats['sampled_out'] - self._reported_lost
+        if lost > 0:
+            self._reported_lost += lost
+            self._write([logging.makeLogRecord({
+                'name': 'LogPipeline',
+                'levelno': logging.WARNING,
+                'levelname': 'WARNING',
+                'msg': f"日志队列拥塞，已丢弃或抽样省略 {lost} 条低优先级日志"
+            })])
+
+    def _write(self, batch):
+        for handler in self.handlers:
+            try:
+                records = [r for r in batch if r.levelno >= handler.level]
+                if hasattr(handler, 'handle_batch'):
+                    handler.handle_batch(records)
+                else:
+                    for record in records:
+                        handler.handle(record)
+            except Exception:
+                pass
+
+    def flush(self):
+        """等待当前队列被写线程写完"""
+        deadline = time.monotonic() + 5
+        while self.queue and self._writer.is_alive() and time.monotonic() < deadline:
+            time.sleep(self.flush_interval / 5)
+
+    def close(self):
+        """写入队列中剩余的日志并关闭下游处理器"""
+        self._stop.set()
+        if self._writer.is_alive():
+            self._writer.join(timeout=5)
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            'queue_size': len(self.queue),
+            'emit_seconds': round(self.emit_seconds, 6)
+        }
+
+
+class EmitTimer(logging.Handler):
+    """同步模式下统计日志调用在调用方线程上的耗时，用于与异步模式对比"""
+
+    def __init__(self, handlers):
+        super().__init__()
+        self.handlers = list(handlers)
+        self.stats = {'queued': 0, 'sampled_out': 0, 'dropped': 0}
+        self.emit_seconds = 0.0
+
+    def handle(self, record):
+        start = time.perf_counter()
+        try:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            self.stats['queued'] += 1
+        finally:
+            self.emit_seconds += time.perf_counter() - start
+        return True
+
+    def emit(self, record):
+        self.handle(record)
+
+    def close(self):
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+    def snapshot(self):
+        return {**self.stats, 'queue_size': 0, 'emit_seconds': round(self.emit_seconds, 6)}
+
+
+def _collect_log_metrics():
+    """抓取时读取根日志器上的日志管道统计"""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, (AsyncLogHandler, EmitTimer)):
+            stats = handler.snapshot()
+            return [
+                ('grid_log_records_total', 'counter', '日志记录处理结果',
+                 [('', {'result': key}, stats[key]) for key in ('queued', 'sampled_out', 'dropped')]),
+                ('grid_log_queue_size', 'gauge', '日志队列当前积压', [('', {}, stats['queue_size'])]),
+                ('grid_log_emit_seconds_total', 'counter', '日志调用在调用方线程上的累计耗时（秒）',
+                 [('', {}, stats['emit_seconds'])])
+            ]
+    return []
+
+
+REGISTRY.register_collector(_collect_log_metrics)
@@ -5,11 +5,16 @@ import platform
 import sys
 import argparse
 import os
+import subprocess
 from trader import GridTrader
-from helpers import LogConfig, send_pushplus_message
-from web_server import start_web_server
+from helpers import LogConfig, send_pushplus_message, set_notification_dispatcher
+from notifier import NotificationDispatcher
+from web_server import start_web_server, publish_state
+from shared_state import SharedStateWriter, default_state_path
 from exchange_client import ExchangeClient
-from config import TradingConfig
+from failover import FailoverCoordinator
+from config import TradingConfig, WECHAT_WEBHOOK_URL, SPEEDUPS_PARAMS
+import speedups
 
 # 在Windows平台上设置SelectorEventLoop
 if platform.system() == 'Windows':
@@ -30,25 +35,70 @@ async def main(args):
         logging.info("="*50)
         logging.info("网格交易系统启动")
         logging.info("="*50)
+        logging.info(f"事件循环: {speedups.EVENT_LOOP} | JSON: {speedups.JSON_BACKEND}")
         
         # 创建交易所客户端和配置实例
         exchange = ExchangeClient()
         config = TradingConfig()
         
+        # 启动异步通知分发器，交易代码推送通知时只入队，不等待网络
+        notifier = NotificationDispatcher(WECHAT_WEBHOOK_URL, **config.NOTIFY_PARAMS)
+        notifier_task = asyncio.create_task(notifier.run())
+        set_notification_dispatcher(notifier)
+        await asyncio.sleep(0)
+        
         # 使用正确的参数初始化交易器
         trader = GridTrader(exchange, config)
         
+        # 同步交易所时钟（请求签名使用交易所时间），之后在后台定期同步
+        await exchange.sync_time()
+        clock_task = asyncio.create_task(exchange.clock.run())
+        
+        # 启动延迟监控
+        latency_task = asyncio.create_task(trader.latency_monitor.run())
+        
+        # 启动本地订单簿订阅（备用进程也提前订阅，接管时订单簿已是热的）
+        order_book_task = asyncio.create_task(trader.order_book_feed.run())
+        
+        # 启动1分钟K线订阅与多周期聚合
+        candle_task = asyncio.create_task(trader.candle_feed.run())
+        
+        # 主备模式：等待获得租约，接管时从复制状态恢复
+        resume_state = None
+        tasks = []
+        if args.standby or config.FAILOVER_PARAMS['enabled']:
+            params = {k: v for k, v in config.FAILOVER_PARAMS.items() if k != 'enabled'}
+            failover = FailoverCoordinator(trader, **params)
+            resume_state = await failover.wait_for_lease()
+            trader.failover = failover
+            tasks.append(asyncio.create_task(failover.run()))
+        
         # 初始化交易器
-        await trader.initialize()
+        await trader.initialize(resume_state)
         
-        # 启动Web服务器
-        web_server_task = asyncio.create_task(start_web_server(trader))
+        # 启动Web服务器：独立面板模式下交易进程只定期发布共享内存状态，网页由面板进程提供
+        dashboard = config.DASHBOARD_PARAMS
+        if dashboard['mode'] == 'process':
+            state_path = dashboard['state_path'] or default_state_path()
+            state_writer = SharedStateWriter(state_path, dashboard['size'])
+            web_server_task = asyncio.create_task(publish_state(trader, state_writer, dashboard['interval']))
+            dashboard_process = subprocess.Popen([
+                sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard.py'),
+                '--state-path', state_path, '--port', str(dashboard['port']),
+                '--stale-after', str(dashboard['stale_after']), '--log-level', logging.getLevelName(LogConfig.LOG_LEVEL)
+            ])
+            logging.info(f"独立面板进程已启动 | PID: {dashboard_process.pid} | 共享状态: {state_path}")
+        else:
+            web_server_task = asyncio.create_task(start_web_server(trader))
         
         # 启动交易循环
         trading_task = asyncio.create_task(trader.main_loop())
         
-        # 等待所有任务完成
-        await asyncio.gather(web_server_task, trading_task)
+        # 启动例行任务调度（资金划转、风控、S1、网格调整）
+        housekeeping_task = asyncio.create_task(trader.housekeeping.run())
+        
+        # 等待所有任务完成（主备模式下失去租约时 failover.run 抛出异常，进程退出）
+        await asyncio.gather(web_server_task, trading_task, latency_task, order_book_task, candle_task, clock_task, housekeeping_task, *tasks)
         
     except Exception as e:
         error_msg = f"启动失败: {str(e)}\n{traceback.format_exc()}"
@@ -56,12 +106,30 @@ async def main(args):
         send_pushplus_message(error_msg, "致命错误")
         
     finally:
+        if 'notifier' in locals():
+            notifier_task.cancel()
+            await notifier.close()
+            set_notification_dispatcher(None)
         if 'trader' in locals():
+            await trader.housekeeping.close()
+            trader.order_tracker.close()
+            if trader.ladder is not None:
+                await trader.ladder.shutdown()
             try:
                 await trader.exchange.close()
                 logging.info("交易所连接已关闭")
             except Exception as e:
                 logging.error(f"关闭连接时发生错误: {str(e)}")
+        if 'dashboard_process' in locals():
+            dashboard_process.terminate()
+            try:
+                dashboard_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                dashboard_process.kill()
+            state_writer.close()
+        if 'failover' in locals():
+            # 最后释放租约，备用进程立即接管
+            failover.release()
 
 def daemonize():
     """将进程转为守护进程（仅Linux/Unix）"""
@@ -123,6 +191,10 @@ if __name__ == "__main__":
   # 后台运行并指定PID文件
   python main.py --daemon --pid-file /var/run/grid-trader.pid
   
+  # 主备模式（两个进程使用不同的PID文件，先启动的交易，另一个热备）
+  python main.py --daemon --standby --pid-file grid-trader.pid
+  python main.py --daemon --standby --pid-file grid-trader-standby.pid
+  
   # 设置日志级别
   python main.py --log-level DEBUG
   
@@ -153,10 +225,38 @@ if __name__ == "__main__":
         help='日志级别 (默认: INFO)'
     )
     
+    parser.add_argument(
+        '--standby',
+        action='store_true',
+        help='主备模式运行：持有租约时交易，否则作为热备等待接管（也可设置 FAILOVER_ENABLED=true）'
+    )
+    
+    parser.add_argument(
+        '--event-loop',
+        choices=['auto', 'uvloop', 'asyncio'],
+        default=SPEEDUPS_PARAMS['event_loop'],
+        help='事件循环实现，auto 时已安装 uvloop 即使用 (默认: auto)'
+    )
+    
+    parser.add_argument(
+        '--json',
+        choices=['auto', 'orjson', 'stdlib'],
+        default=SPEEDUPS_PARAMS['json'],
+        help='JSON 编解码实现，auto 时已安装 orjson 即使用 (默认: auto)'
+    )
+    
+    parser.add_argument(
+        '--sync-logging',
+        action='store_true',
+        help='在事件循环线程上同步写日志（默认通过队列在后台线程写入）'
+    )
+    
     args = parser.parse_args()
     
     # 设置日志级别
     LogConfig.LOG_LEVEL = getattr(logging, args.log_level)
+    if args.sync_logging:
+        LogConfig.ASYNC_LOGGING = False
     
     # 如果是守护进程模式
     if args.daemon:
@@ -176,5 +276,8 @@ if __name__ == "__main__":
         # 写入PID文件
         write_pid_file(args.pid_file)
     
+    # 选择事件循环和 JSON 实现（需在创建事件循环之前）
+    speedups.configure(args.event_loop, args.json)
+    
     # 运行主程序
     asyncio.run(main(args))
\ No newline at end of file
@@ -0,0 +1,285 @@
+import bisect
+import math
+
+# 默认的耗时分桶（秒），覆盖 1ms ~ 30s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape_label(extra[1])}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """指标基类：按标签组合预分配槽位，记录时只做列表下标运算
+
+    标签组合可在构造时通过 preset 预先声明；未声明的组合第一次出现时分配槽位，
+    之后同样走下标路径。热路径上建议缓存 labels() 返回的子对象。
+    """
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=(), preset=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._slots = {}
+        self._keys = []
+        self._children = {}
+        self._init_storage()
+        if not self.labelnames:
+            self._slot(())
+        for labelvalues in preset:
+            self._slot(tuple(labelvalues))
+
+    def _init_storage(self):
+        self._values = []
+
+    def _grow(self):
+        self._values.append(0.0)
+
+    def _slot(self, key):
+        index = self._slots.get(key)
+        if index is None:
+            index = len(self._keys)
+            self._keys.append(key)
+            self._grow()
+            self._slots[key] = index
+        return index
+
+    def labels(self, *labelvalues):
+        child = self._children.get(labelvalues)
+        if child is None:
+            child = self._child_class(self, self._slot(tuple(str(v) for v in labelvalues)))
+            self._children[labelvalues] = child
+        return child
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.TYPE}']
+
+
+class _CounterChild:
+    __slots__ = ('_values', '_index')
+
+    def __init__(self, metric, index):
+        self._values = metric._values
+        self._index = index
+
+    def inc(self, amount=1):
+        self._values[self._index] += amount
+
+
+class Counter(_Metric):
+    TYPE = 'counter'
+    _child_class = _CounterChild
+
+    def inc(self, amount=1):
+        self._values[0] += amount
+
+    def total(self):
+        """所有标签组合的合计值"""
+        return sum(self._values)
+
+    def collect(self):
+        lines = self.header()
+        for key, value in zip(self._keys, self._values):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self._values[self._index] = value
+
+
+class Gauge(Counter):
+    TYPE = 'gauge'
+    _child_class = _GaugeChild
+
+    def set(self, value):
+        self._values[0] = value
+
+
+class _HistogramChild:
+    __slots__ = ('_buckets', '_counts', '_sums', '_index')
+
+    def __init__(self, metric, index):
+        self._buckets = metric.buckets
+        self._counts = metric._counts
+        self._sums = metric._sums
+        self._index = index
+
+    def observe(self, value):
+        # counts 按桶独立计数，导出时再做累加，避免每次记录遍历所有桶
+        self._counts[self._index][bisect.bisect_left(self._buckets, value)] += 1
+        self._sums[self._index] += value
+
+
+class Histogram(_Metric):
+    TYPE = 'histogram'
+    _child_class = _HistogramChild
+
+    def __init__(self, name, documentation, labelnames=(), preset=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, preset)
+
+    def _init_storage(self):
+        self._counts = []
+        self._sums = []
+
+    def _grow(self):
+        # 最后一个槽位对应 +Inf
+        self._counts.append([0] * (len(self.buckets) + 1))
+        self._sums.append(0.0)
+
+    def observe(self, value):
+        self._counts[0][bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[0] += value
+
+    def collect(self):
+        lines = self.header()
+        bounds = self.buckets + (math.inf,)
+        for key, counts, total in zip(self._keys, self._counts, self._sums):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(self.labelnames, key, ("le", _format_value(float(bound))))} {cumulative}'
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，负责按 Prometheus 文本格式导出
+
+    除静态指标外，还可注册 collector 回调：在抓取时才读取状态（如网格大小、基准价），
+    对交易主循环没有任何额外开销。collector 返回 [(名称, 类型, 说明, 样本列表), ...]，
+    样本为 (后缀, 标签字典, 值)，普通指标后缀为空字符串，直方图使用 _bucket/_sum/_count。
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=(), preset=()):
+        return self.register(Counter(name, documentation, labelnames, preset))
+
+    def gauge(self, name, documentation, labelnames=(), preset=()):
+        return self.register(Gauge(name, documentation, labelnames, preset))
+
+    def histogram(self, name, documentation, labelnames=(), preset=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, preset, buckets))
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def unregister_collector(self, collector):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for suffix, labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f'{name}{suffix}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+EXCHANGE_CALLS = REGISTRY.counter(
+    'grid_exchange_calls_total', '交易所API调用次数', ('endpoint', 'result')
+)
+EXCHANGE_LATENCY = REGISTRY.histogram(
+    'grid_exchange_request_seconds', '交易所REST请求耗时（秒）', ('endpoint',)
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'grid_cache_requests_total', '本地缓存命中情况', ('cache', 'result'),
+    preset=[(cache, result)
+            for cache in ('balance', 'funding_balance', 'savings_balance', 'total_assets', 'order_amount')
+            for result in ('hit', 'miss')]
+)
+ORDERS = REGISTRY.counter(
+    'grid_orders_total', '订单事件次数', ('side', 'event'),
+    preset=[(side, event) for side in ('buy', 'sell') for event in ('placed', 'amended', 'filled', 'cancelled')]
+)
+RETRIES = REGISTRY.counter(
+    'grid_retries_total', '重试次数', ('operation',)
+)
+RATE_LIMIT_WAITS = REGISTRY.counter(
+    'grid_rate_limiter_waits_total', '因下单频率限制而等待的次数'
+)
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.counter(
+    'grid_rate_limiter_wait_seconds_total', '因下单频率限制而等待的累计时间（秒）'
+)
+ORDER_BOOK_EVENTS = REGISTRY.counter(
+    'grid_order_book_events_total', '本地订单簿事件', ('event',),
+    preset=[(event,) for event in ('snapshot', 'update', 'resync', 'reconnect', 'rest_fallback')]
+)
+CANDLE_EVENTS = REGISTRY.counter(
+    'grid_candle_events_total', '本地K线聚合事件（hit/miss 为 fetch_ohlcv 是否由本地K线满足）', ('event',),
+    preset=[(event,) for event in ('hit', 'miss', 'warm_up', 'reconnect')]
+)
+FUND_MOVES = REGISTRY.counter(
+    'grid_fund_moves_total', '资金划转规划器执行的划转（redeem/to_spot/to_funding/purchase）与到账确认结果', ('leg', 'result'),
+    preset=[(leg, result) for leg in ('redeem', 'to_spot', 'to_funding', 'purchase') for result in ('ok', 'failed')]
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    'grid_circuit_transitions_total', '交易所接口熔断器状态切换次数（open/half_open/closed）', ('endpoint', 'state')
+)
+TRIGGER_CROSSINGS = REGISTRY.counter(
+    'grid_trigger_crossings_total', '价格跨越网格上下轨次数', ('side',), preset=[('buy',), ('sell',)]
+)
+NOTIFICATIONS = REGISTRY.counter(
+    'grid_notifications_total', '推送通知处理结果', ('result',),
+    preset=[(result,) for result in ('sent', 'failed', 'dropped', 'coalesced')]
+)
+HOUSEKEEPING_RUNS = REGISTRY.counter(
+    'grid_housekeeping_runs_total', '例行任务运行结果', ('job', 'result')
+)
+HOUSEKEEPING_SECONDS = REGISTRY.histogram(
+    'grid_housekeeping_seconds', '例行任务单次运行耗时（秒）', ('job',)
+)
+POSITION_RATIO = REGISTRY.gauge('grid_position_ratio', '当前仓位占总资产比例')
+TOTAL_ASSETS = REGISTRY.gauge('grid_total_assets_usdt', '总资产（USDT）')
+
+
+def histogram_collector(name, documentation, source, bounds_seconds=DEFAULT_BUCKETS):
+    """把 LatencyHistogram 在抓取时转换为 Prometheus 直方图样本"""
+    def collect():
+        cumulative = source.cumulative_counts([b * 1_000_000 for b in bounds_seconds])
+        samples = [('_bucket', {'le': _format_value(float(b))}, c) for b, c in zip(bounds_seconds, cumulative)]
+        samples.append(('_bucket', {'le': '+Inf'}, source.total_count))
+        samples.append(('_sum', {}, source.total_sum / 1_000_000))
+        samples.append(('_count', {}, source.total_count))
+        return [(name, 'histogram', documentation, samples)]
+    return collect
@@ -61,8 +61,8 @@ class TradingMonitor:
             "position_ratio": position_ratio,
             # 可以添加更多状态信息
             "initialized": getattr(self.trader, 'initialized', False),
-            "active_buy_order": getattr(self.trader.active_orders, 'buy', None),
-            "active_sell_order": getattr(self.trader.active_orders, 'sell', None),
+            "active_buy_order": next((r.ord_id for r in self.trader.order_tracker.orders.active('buy')), None),
+            "active_sell_order": next((r.ord_id for r in self.trader.order_tracker.orders.active('sell')), None),
             "highest_price_monitor": getattr(self.trader, 'highest', None),
             "lowest_price_monitor": getattr(self.trader, 'lowest', None),
         }
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import traceback
+
+import aiohttp
+
+from metrics import NOTIFICATIONS
+
+
+class NotificationDispatcher:
+    """异步通知分发器
+
+    交易代码调用 notify() 只是把消息放入有界队列（O(1)，不等待网络），
+    后台任务 run() 通过复用的 aiohttp 会话发送到企业微信 Webhook，失败按指数退避重试。
+    digest_titles 中的消息（如成交通知）在 digest_window 秒内只立即发送第一条，
+    窗口内的后续消息合并为一条汇总消息在窗口结束时发送。
+    """
+
+    def __init__(self, webhook_url, queue_size=200, timeout=5, max_retries=3,
+                 backoff_base=1.0, digest_window=60, digest_titles=()):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.webhook_url = webhook_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.digest_window = digest_window
+        self.digest_titles = set(digest_titles)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.session = None
+        self.running = False
+        self._loop = None
+        self._loop_thread = None
+        self._digest = []
+        self._digest_sent_at = 0.0
+
+    def notify(self, content, title="交易信号通知"):
+        """放入发送队列，不阻塞调用方；队列已满时丢弃并记录"""
+        if self._loop is not None and threading.get_ident() != self._loop_thread:
+            # 从执行器线程调用时转交给事件循环线程入队
+            self._loop.call_soon_threadsafe(self._enqueue, content, title)
+        else:
+            self._enqueue(content, title)
+
+    def _enqueue(self, content, title):
+        try:
+            self.queue.put_nowait((time.time(), title, content))
+        except asyncio.QueueFull:
+            NOTIFICATIONS.labels('dropped').inc()
+            self.logger.warning(f"通知队列已满，丢弃消息: {title}")
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60)
+        )
+        self.running = True
+        try:
+            while True:
+                timeout = None
+                if self._digest:
+                    timeout = max(self._digest_sent_at + self.digest_window - time.time(), 0)
+                try:
+                    queued_at, title, content = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    await self._flush_digest()
+                    continue
+                await self._dispatch(queued_at, title, content)
+        finally:
+            self.running = False
+
+    async def _dispatch(self, queued_at, title, content):
+        if title in self.digest_titles:
+            if self._digest or time.time() - self._digest_sent_at < self.digest_window:
+                self._digest.append((queued_at, title, content))
+                NOTIFICATIONS.labels('coalesced').inc()
+                return
+            self._digest_sent_at = time.time()
+        await self._send(title, content)
+
+    async def _flush_digest(self):
+        if not self._digest:
+            return
+        items, self._digest = self._digest, []
+        self._digest_sent_at = time.time()
+        if len(items) == 1:
+            _, title, content = items[0]
+            await self._send(title, content)
+            return
+        body = "\n\n".join(
+            f"**{time.strftime('%H:%M:%S', time.localtime(queued_at))} {title}**\n{content.strip()}"
+            for queued_at, title, content in items
+        )
+        await self._send(f"{len(items)} 条通知汇总", body)
+
+    async def _send(self, title, content):
+        if not self.webhook_url:
+            self.logger.debug("未配置有效的通知Webhook，跳过推送通知")
+            return
+        data = {
+            "msgtype": "markdown",
+            "markdown": {
+                "content": f"### {title}\n{content}"
+            }
+        }
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with self.session.post(self.webhook_url, json=data) as response:
+                    response_json = await response.json(content_type=None)
+                    if response.status == 200 and response_json.get('errcode') == 0:
+                        NOTIFICATIONS.labels('sent').inc()
+                        self.logger.debug(f"推送成功: {title}")
+                        return
+                    error = f"状态码={response.status}, 响应={response_json}"
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            if attempt < self.max_retries:
+                delay = self.backoff_base * (2 ** (attempt - 1)) * (1 + random.random() * 0.5)
+                self.logger.warning(f"推送失败，{delay:.1f}秒后重试 ({attempt}/{self.max_retries}): {error}, 标题={title}")
+                await asyncio.sleep(delay)
+        NOTIFICATIONS.labels('failed').inc()
+        self.logger.error(f"推送失败: {error}, 标题={title}")
+
+    async def close(self, timeout=10):
+        """发送队列中剩余的消息和未发出的汇总，然后关闭会话"""
+        try:
+            deadline = time.time() + timeout
+            while not self.queue.empty() and time.time() < deadline and self.session is not None:
+                queued_at, title, content = self.queue.get_nowait()
+                if title in self.digest_titles:
+                    self._digest.append((queued_at, title, content))
+                else:
+                    await self._send(title, content)
+            if self.session is not None:
+                await self._flush_digest()
+        except Exception as e:
+            self.logger.error(f"关闭通知分发器失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+        finally:
+            if self.session is not None:
+                await self.session.close()
+                self.session = None
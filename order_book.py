@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import time
+import traceback
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+import websockets
+
+import speedups
+from latency_monitor import LatencyHistogram
+from metrics import ORDER_BOOK_EVENTS
+
+OKX_PUBLIC_WS = {
+    '0': 'wss://ws.okx.com:8443/ws/v5/public',     # 实盘
+    '1': 'wss://wspap.okx.com:8443/ws/v5/public',  # 模拟盘
+}
+
+# 参与校验和计算的档位数
+CHECKSUM_LEVELS = 25
+
+
+class OrderBookError(Exception):
+    """本地订单簿与交易所不一致（校验和不符或序号不连续），需要重新订阅"""
+
+
+class _BookSide:
+    """订单簿单边：按排序键升序存放的紧凑数组
+
+    keys/sizes 使用 array('d')，便于二分查找和批量计算；raw 保留交易所推送的原始
+    价格、数量字符串，用于校验和计算和还原 REST 格式。买盘的排序键为负价格，
+    因此两边下标 0 都是最优价。
+    """
+    __slots__ = ('sign', 'keys', 'sizes', 'raw')
+
+    def __init__(self, sign):
+        self.sign = sign
+        self.keys = array('d')
+        self.sizes = array('d')
+        self.raw = []
+
+    def clear(self):
+        self.keys = array('d')
+        self.sizes = array('d')
+        self.raw = []
+
+    def apply(self, price, size):
+        key = self.sign * float(price)
+        amount = float(size)
+        index = bisect_left(self.keys, key)
+        exists = index < len(self.keys) and self.keys[index] == key
+        if amount == 0:
+            if exists:
+                del self.keys[index]
+                del self.sizes[index]
+                del self.raw[index]
+        elif exists:
+            self.sizes[index] = amount
+            self.raw[index] = (price, size)
+        else:
+            self.keys.insert(index, key)
+            self.sizes.insert(index, amount)
+            self.raw.insert(index, (price, size))
+
+    def price(self, index):
+        return self.sign * self.keys[index]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class LocalOrderBook:
+    """单个交易对的本地 L2 订单簿
+
+    由 OKX books5（每次全量推送5档）或 books（400档，快照 + 增量，带校验和与序号）
+    频道维护。最优价查询为 O(1)，深度与滑点估算只遍历需要的档位。
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = _BookSide(-1)
+        self.asks = _BookSide(1)
+        self.seq_id = None
+        self.ts = 0          # 交易所时间戳（毫秒）
+        self.updated_at = 0  # 本地收到更新的时间（time.monotonic）
+        self.synced = False  # 是否已收到快照（增量只能在快照之上应用）
+
+    def reset(self):
+        """清空订单簿，丢弃之后的增量直到收到下一次快照"""
+        self.bids.clear()
+        self.asks.clear()
+        self.seq_id = None
+        self.ts = 0
+        self.updated_at = 0
+        self.synced = False
+
+    def apply_snapshot(self, bids, asks, checksum=None, seq_id=None, ts=None):
+        self.bids.clear()
+        self.asks.clear()
+        self._apply_levels(bids, asks)
+        self._finish(checksum, seq_id, ts)
+        self.synced = True
+
+    def apply_update(self, bids, asks, checksum=None, seq_id=None, prev_seq_id=None, ts=None):
+        if prev_seq_id is not None and self.seq_id is not None and int(prev_seq_id) != self.seq_id:
+            raise OrderBookError(f"{self.symbol} 订单簿序号不连续: 期望 {self.seq_id}，收到 prevSeqId={prev_seq_id}")
+        self._apply_levels(bids, asks)
+        self._finish(checksum, seq_id, ts)
+
+    def _apply_levels(self, bids, asks):
+        for level in bids:
+            self.bids.apply(level[0], level[1])
+        for level in asks:
+            self.asks.apply(level[0], level[1])
+
+    def _finish(self, checksum, seq_id, ts):
+        if checksum is not None and int(checksum) != self.checksum():
+            raise OrderBookError(f"{self.symbol} 订单簿校验和不符: 期望 {checksum}，本地 {self.checksum()}")
+        if seq_id is not None:
+            self.seq_id = int(seq_id)
+        if ts is not None:
+            self.ts = int(ts)
+        self.updated_at = time.monotonic()
+
+    def checksum(self):
+        """按 OKX 规则计算前25档的 CRC32 校验和（有符号32位整数）"""
+        parts = []
+        bids, asks = self.bids.raw, self.asks.raw
+        for i in range(CHECKSUM_LEVELS):
+            if i < len(bids):
+                parts.append(f"{bids[i][0]}:{bids[i][1]}")
+            if i < len(asks):
+                parts.append(f"{asks[i][0]}:{asks[i][1]}")
+        value = zlib.crc32(':'.join(parts).encode()) & 0xffffffff
+        return value - (1 << 32) if value >= (1 << 31) else value
+
+    def age(self):
+        """距离上次更新的秒数"""
+        return time.monotonic() - self.updated_at if self.updated_at else float('inf')
+
+    def best_bid(self):
+        return (self.bids.price(0), self.bids.sizes[0]) if len(self.bids) else None
+
+    def best_ask(self):
+        return (self.asks.price(0), self.asks.sizes[0]) if len(self.asks) else None
+
+    def mid(self):
+        if not len(self.bids) or not len(self.asks):
+            return None
+        return (self.bids.price(0) + self.asks.price(0)) / 2
+
+    def microprice(self):
+        """按买一卖一挂单量加权的中间价，挂单量越大的一侧价格越难穿过"""
+        if not len(self.bids) or not len(self.asks):
+            return None
+        bid, bid_size = self.bids.price(0), self.bids.sizes[0]
+        ask, ask_size = self.asks.price(0), self.asks.sizes[0]
+        return (bid * ask_size + ask * bid_size) / (bid_size + ask_size)
+
+    def depth(self, side, levels=None, within_pct=None):
+        """某一侧的挂单总量：可限定档位数，或限定距最优价的百分比范围（0.01 即 1%）"""
+        book_side = self.bids if side == 'bid' else self.asks
+        count = len(book_side) if levels is None else min(levels, len(book_side))
+        if within_pct is not None and count:
+            limit = book_side.keys[0] + abs(book_side.keys[0]) * within_pct
+            count = min(count, bisect_right(book_side.keys, limit))
+        return sum(book_side.sizes[:count])
+
+    def slippage(self, side, amount):
+        """按当前盘口估算吃单成交 amount（基础币数量）的均价与滑点
+
+        Args:
+            side: 'buy' 吃卖盘，'sell' 吃买盘
+
+        Returns:
+            dict: avg_price 成交均价、filled 可成交数量、slippage 相对最优价的滑点比例；盘口为空时返回 None
+        """
+        book_side = self.asks if side == 'buy' else self.bids
+        if not len(book_side):
+            return None
+        remaining = amount
+        cost = 0.0
+        for index in range(len(book_side)):
+            take = min(remaining, book_side.sizes[index])
+            cost += take * book_side.price(index)
+            remaining -= take
+            if remaining <= 0:
+                break
+        filled = amount - max(remaining, 0)
+        if filled <= 0:
+            return None
+        avg_price = cost / filled
+        best = book_side.price(0)
+        return {
+            'avg_price': avg_price,
+            'filled': filled,
+            'slippage': abs(avg_price - best) / best
+        }
+
+    def to_rest(self, limit=5):
+        """转换为与 REST fetch_order_book 相同的格式（价格、数量为原始字符串）"""
+        return {
+            'asks': [[price, size] for price, size in self.asks.raw[:limit]],
+            'bids': [[price, size] for price, size in self.bids.raw[:limit]],
+            'ts': str(self.ts)
+        }
+
+
+class OrderBookFeed:
+    """OKX 公共频道订单簿订阅
+
+    handle_message() 只依赖消息内容，既用于实时 WebSocket，也用于离线回放录制的
+    消息（record_path 开启后每条原始消息按行写入文件，replay() 读取回放）。
+    校验和不符或序号不连续时清空对应订单簿并重新连接订阅。
+    """
+
+    def __init__(self, symbols, channel='books5', max_age=2.0, record_path='', flag='0', enabled=True):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.symbols = list(symbols)
+        self.channel = channel
+        self.max_age = max_age
+        self.record_path = record_path
+        self.url = OKX_PUBLIC_WS.get(str(flag), OKX_PUBLIC_WS['0'])
+        self.enabled = enabled
+        self.books = {symbol: LocalOrderBook(symbol) for symbol in self.symbols}
+        self.connected = False
+        self.clock = None                        # 交易所时钟（clock_sync.ClockSync），设置后测量推送延迟
+        self.resyncs = 0                         # 校验和不符或序号不连续的次数
+        self.last_error = None
+        self.push_latency = LatencyHistogram()   # 交易所生成推送到本地处理的延迟
+
+    def get(self, symbol):
+        """返回未过期的本地订单簿，未订阅、未就绪或已过期时返回 None"""
+        book = self.books.get(symbol)
+        if book is None or not self.connected or book.age() > self.max_age:
+            return None
+        return book
+
+    def handle_message(self, message):
+        """处理一条频道消息（已解析的字典）
+
+        校验和不符或序号不连续时清空该订单簿并抛出 OrderBookError，之后的增量在收到新快照前丢弃。
+        """
+        arg = message.get('arg', {})
+        if arg.get('channel') != self.channel or 'data' not in message:
+            return
+        book = self.books.get(arg.get('instId'))
+        if book is None:
+            return
+        action = message.get('action', 'snapshot')
+        try:
+            for data in message['data']:
+                if action == 'snapshot':
+                    book.apply_snapshot(
+                        data.get('bids', []), data.get('asks', []),
+                        checksum=data.get('checksum'), seq_id=data.get('seqId'), ts=data.get('ts')
+                    )
+                    ORDER_BOOK_EVENTS.labels('snapshot').inc()
+                elif book.synced:
+                    book.apply_update(
+                        data.get('bids', []), data.get('asks', []),
+                        checksum=data.get('checksum'), seq_id=data.get('seqId'),
+                        prev_seq_id=data.get('prevSeqId'), ts=data.get('ts')
+                    )
+                    ORDER_BOOK_EVENTS.labels('update').inc()
+        except OrderBookError as e:
+            book.reset()
+            self.resyncs += 1
+            self.last_error = str(e)
+            raise
+
+    async def run(self):
+        """保持 WebSocket 订阅，断线或数据不一致时退避重连"""
+        if not self.enabled:
+            return
+        backoff = 1
+        record_file = open(self.record_path, 'a', encoding='utf-8') if self.record_path else None
+        try:
+            while True:
+                try:
+                    async with websockets.connect(self.url, ping_interval=20, ping_timeout=10) as ws:
+                        await ws.send(speedups.dumps({
+                            'op': 'subscribe',
+                            'args': [{'channel': self.channel, 'instId': symbol} for symbol in self.symbols]
+                        }))
+                        self.logger.info(f"订单簿订阅已建立 | 频道: {self.channel} | 交易对: {', '.join(self.symbols)}")
+                        self.connected = True
+                        backoff = 1
+                        async for raw in ws:
+                            if record_file is not None:
+                                record_file.write(raw if raw.endswith('\n') else raw + '\n')
+                            message = speedups.loads(raw)
+                            if message.get('event') == 'error':
+                                self.logger.error(f"订单簿订阅失败: {message}")
+                                continue
+                            self.handle_message(message)
+                            self._record_latency(message)
+                except asyncio.CancelledError:
+                    raise
+                except OrderBookError as e:
+                    ORDER_BOOK_EVENTS.labels('resync').inc()
+                    self.logger.warning(f"本地订单簿不一致，重新订阅: {str(e)}")
+                except Exception as e:
+                    ORDER_BOOK_EVENTS.labels('reconnect').inc()
+                    self.logger.error(f"订单簿连接中断: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+                finally:
+                    self.connected = False
+                    for book in self.books.values():
+                        book.updated_at = 0
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+        finally:
+            if record_file is not None:
+                record_file.close()
+
+
+    def _record_latency(self, message):
+        """用交易所时间测量推送延迟（消息中的 ts 为交易所生成该推送的时间）"""
+        if self.clock is None or not self.clock.synced:
+            return
+        for data in message.get('data', ()):
+            if data.get('ts'):
+                self.push_latency.record((self.clock.now_ms() - int(data['ts'])) * 1000)
+
+
+def replay(path, symbols=None, channel=None, strict=False):
+    """离线回放录制的订单簿消息文件（每行一条原始 JSON），返回回放后的 OrderBookFeed
+
+    校验和或序号异常时与实时订阅一样清空该订单簿，丢弃后续增量直到下一次快照，
+    次数记录在 feed.resyncs 中；strict 为 True 时直接抛出 OrderBookError。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        messages = [speedups.loads(line) for line in f if line.strip()]
+    data_messages = [m for m in messages if 'data' in m and 'arg' in m]
+    if symbols is None:
+        symbols = sorted({m['arg']['instId'] for m in data_messages})
+    if channel is None:
+        channel = data_messages[0]['arg']['channel'] if data_messages else 'books5'
+    feed = OrderBookFeed(symbols, channel=channel, enabled=False)
+    for message in data_messages:
+        try:
+            feed.handle_message(message)
+        except OrderBookError:
+            if strict:
+                raise
+    feed.connected = True
+    return feed
@@ -0,0 +1,265 @@
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from enum import Enum
+
+
+class OrderState(Enum):
+    NEW = 'new'                            # 已创建，尚未得到交易所确认
+    LIVE = 'live'                          # 交易所已接受，等待成交
+    PARTIALLY_FILLED = 'partially_filled'  # 部分成交
+    FILLED = 'filled'                      # 完全成交
+    CANCELLED = 'cancelled'                # 已撤销（可能带部分成交）
+    REJECTED = 'rejected'                  # 提交失败或被交易所拒绝
+
+    @property
+    def terminal(self):
+        return self in TERMINAL_STATES
+
+
+TERMINAL_STATES = frozenset({OrderState.FILLED, OrderState.CANCELLED, OrderState.REJECTED})
+
+# 允许的状态转换，终态不能再转换
+TRANSITIONS = {
+    OrderState.NEW: frozenset({OrderState.LIVE, OrderState.PARTIALLY_FILLED, OrderState.FILLED,
+                               OrderState.CANCELLED, OrderState.REJECTED}),
+    OrderState.LIVE: frozenset({OrderState.LIVE, OrderState.PARTIALLY_FILLED, OrderState.FILLED,
+                                OrderState.CANCELLED}),
+    OrderState.PARTIALLY_FILLED: frozenset({OrderState.PARTIALLY_FILLED, OrderState.FILLED,
+                                            OrderState.CANCELLED}),
+}
+
+# OKX 订单 state 字段到内部状态的映射
+OKX_STATES = {
+    'live': OrderState.LIVE,
+    'partially_filled': OrderState.PARTIALLY_FILLED,
+    'filled': OrderState.FILLED,
+    'canceled': OrderState.CANCELLED,
+    'mmp_canceled': OrderState.CANCELLED,
+}
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def normalize_okx_order(order):
+    """在 OKX 原始订单字段上补充通用字段：id/status/price/amount/filled
+
+    status 取值与原有代码一致：open（未完成）、closed（完全成交）、canceled（已撤销）。
+    price 优先使用成交均价 avgPx，未成交时使用委托价 px。原始字段保持不变。
+    """
+    state = OKX_STATES.get(order.get('state'))
+    if state is OrderState.FILLED:
+        status = 'closed'
+    elif state is OrderState.CANCELLED:
+        status = 'canceled'
+    else:
+        status = 'open'
+    order['id'] = order.get('ordId')
+    order['status'] = status
+    order['price'] = _to_float(order.get('avgPx')) or _to_float(order.get('px'))
+    order['amount'] = _to_float(order.get('sz'))
+    order['filled'] = _to_float(order.get('accFillSz'))
+    return order
+
+
+def make_client_order_id(strategy, side, intent_id, attempt=0):
+    """生成确定性的客户端订单ID（clOrdId）
+
+    同一交易意图（intent_id，如信号触发时的毫秒时间戳）的第 attempt 次提交总是得到
+    同一个ID，重发同一请求不会产生重复订单。OKX 要求 clOrdId 为字母开头、
+    只含字母数字、不超过32位。
+    """
+    return f"{strategy}{side[0].lower()}{int(intent_id):x}a{attempt}"[:32]
+
+
+class OrderRecord:
+    """单个订单的本地状态"""
+    __slots__ = ('ord_id', 'cl_ord_id', 'side', 'price', 'amount', 'state', 'filled',
+                 'avg_price', 'created_at', 'updated_at', 'deadline')
+
+    def __init__(self, side, price, amount, ord_id=None, cl_ord_id=None, deadline=None):
+        now = time.time()
+        self.ord_id = ord_id
+        self.cl_ord_id = cl_ord_id
+        self.side = side
+        self.price = price
+        self.amount = amount
+        self.state = OrderState.NEW
+        self.filled = 0.0
+        self.avg_price = 0.0
+        self.created_at = now
+        self.updated_at = now
+        self.deadline = deadline
+
+    def to_dict(self):
+        return {
+            'ord_id': self.ord_id,
+            'cl_ord_id': self.cl_ord_id,
+            'side': self.side,
+            'price': self.price,
+            'amount': self.amount,
+            'state': self.state.value,
+            'filled': self.filled,
+            'avg_price': self.avg_price,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'deadline': self.deadline
+        }
+
+
+class OrderRegistry:
+    """统一的订单注册表
+
+    按 ordId、clOrdId、方向和状态建立索引，查找和状态转换都是 O(1)。
+    超时检查使用按截止时间排序的小顶堆，只弹出已到期的订单，代价 O(k log n)；
+    订单离开活跃状态或截止时间变更后，堆中的旧条目在弹出时惰性丢弃。
+    终态订单只保留最近 max_terminal 个，内存不会随运行时间增长。
+    """
+
+    def __init__(self, max_terminal=200):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_terminal = max_terminal
+        self._by_ord_id = {}
+        self._by_cl_ord_id = {}
+        self._by_side = {}
+        self._by_state = {state: set() for state in OrderState}
+        self._terminal = OrderedDict()
+        self._deadlines = []
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return sum(len(records) for records in self._by_state.values())
+
+    def add(self, side, price, amount, ord_id=None, cl_ord_id=None, timeout=None):
+        """登记一个新订单（状态 NEW），timeout 秒后进入超时检查"""
+        deadline = time.time() + timeout if timeout else None
+        record = OrderRecord(side, price, amount, ord_id, cl_ord_id, deadline)
+        if ord_id:
+            self._by_ord_id[ord_id] = record
+        if cl_ord_id:
+            self._by_cl_ord_id[cl_ord_id] = record
+        self._by_side.setdefault(side, set()).add(record)
+        self._by_state[OrderState.NEW].add(record)
+        if deadline is not None:
+            heapq.heappush(self._deadlines, (deadline, next(self._seq), record))
+        return record
+
+    def bind(self, record, ord_id):
+        """交易所确认后绑定 ordId 并转为 LIVE"""
+        record.ord_id = ord_id
+        self._by_ord_id[ord_id] = record
+        if record.state is OrderState.NEW:
+            self.transition(record, OrderState.LIVE)
+        return record
+
+    def get(self, ord_id):
+        return self._by_ord_id.get(ord_id)
+
+    def get_by_cl_ord_id(self, cl_ord_id):
+        return self._by_cl_ord_id.get(cl_ord_id)
+
+    def active(self, side=None):
+        """未进入终态的订单列表，可按方向过滤"""
+        records = self._by_side.get(side, ()) if side else itertools.chain.from_iterable(self._by_side.values())
+        return [r for r in records if not r.state.terminal]
+
+    def by_state(self, state):
+        return list(self._by_state[state])
+
+    def transition(self, record, state, filled=None, avg_price=None):
+        """执行状态转换，非法转换（如终态再变化、乱序的旧状态）记录警告后忽略"""
+        if state not in TRANSITIONS.get(record.state, ()):
+            if state is not record.state:
+                self.logger.warning(
+                    f"忽略非法订单状态转换 | ID: {record.ord_id} | {record.state.value} → {state.value}"
+                )
+            return False
+        if filled is not None:
+            record.filled = filled
+        if avg_price:
+            record.avg_price = avg_price
+        record.updated_at = time.time()
+        if state is record.state:
+            return True
+        self._by_state[record.state].discard(record)
+        record.state = state
+        self._by_state[state].add(record)
+        if state.terminal:
+            self._retire(record)
+        return True
+
+    def update_from_exchange(self, order):
+        """根据交易所返回的订单（OKX 原始字段）更新本地状态，返回对应记录"""
+        record = self._by_ord_id.get(order.get('ordId'))
+        if record is None and order.get('clOrdId'):
+            record = self._by_cl_ord_id.get(order['clOrdId'])
+            if record is not None and order.get('ordId'):
+                self.bind(record, order['ordId'])
+        if record is None:
+            return None
+        state = OKX_STATES.get(order.get('state'))
+        if state is not None:
+            self.transition(
+                record, state,
+                filled=_to_float(order.get('accFillSz')),
+                avg_price=_to_float(order.get('avgPx'))
+            )
+        return record
+
+    def extend_deadline(self, record, timeout):
+        record.deadline = time.time() + timeout
+        heapq.heappush(self._deadlines, (record.deadline, next(self._seq), record))
+
+    def expired(self, now=None):
+        """弹出已到截止时间且仍未完成的订单"""
+        now = now or time.time()
+        result = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, _, record = heapq.heappop(self._deadlines)
+            if record.state.terminal or record.deadline != deadline:
+                continue
+            result.append(record)
+        return result
+
+    def _retire(self, record):
+        key = id(record)
+        self._terminal[key] = record
+        while len(self._terminal) > self.max_terminal:
+            _, old = self._terminal.popitem(last=False)
+            self._forget(old)
+        # 堆中失效条目过多时重建，避免截止时间较长时堆持续膨胀
+        if len(self._deadlines) > 64 and len(self._deadlines) > 2 * (len(self) - len(self._terminal)):
+            self._deadlines = [entry for entry in self._deadlines
+                               if not entry[2].state.terminal and entry[2].deadline == entry[0]]
+            heapq.heapify(self._deadlines)
+
+    def _forget(self, record):
+        if record.ord_id and self._by_ord_id.get(record.ord_id) is record:
+            del self._by_ord_id[record.ord_id]
+        if record.cl_ord_id and self._by_cl_ord_id.get(record.cl_ord_id) is record:
+            del self._by_cl_ord_id[record.cl_ord_id]
+        self._by_side.get(record.side, set()).discard(record)
+        self._by_state[record.state].discard(record)
+
+    def clear(self):
+        self._by_ord_id.clear()
+        self._by_cl_ord_id.clear()
+        self._by_side.clear()
+        for records in self._by_state.values():
+            records.clear()
+        self._terminal.clear()
+        self._deadlines.clear()
+
+    def snapshot(self):
+        return {
+            'states': {state.value: len(records) for state, records in self._by_state.items()},
+            'active': [r.to_dict() for r in self.active()],
+            'pending_deadlines': len(self._deadlines)
+        }
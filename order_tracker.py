@@ -2,7 +2,16 @@ import time
 from datetime import datetime
 import logging
 import os
-import json
+import asyncio
+import threading
+import traceback
+from metrics import RATE_LIMIT_WAITS, RATE_LIMIT_WAIT_SECONDS
+from order_registry import OrderRegistry
+from pnl_ledger import PnLLedger
+import speedups
+import trade_export
+from trade_store import TradeStore
+from config import PNL_PARAMS, QUOTE_SYMBOL
 
 class OrderThrottler:
     def __init__(self, limit=10, interval=60):
@@ -18,10 +27,27 @@ class OrderThrottler:
         self.order_timestamps.append(current_time)
         return True
 
+    def wait_time(self):
+        """距离下一个可用下单配额还需等待的秒数，0表示可立即下单"""
+        current_time = time.time()
+        self.order_timestamps = [t for t in self.order_timestamps if current_time - t < self.interval]
+        if len(self.order_timestamps) < self.limit:
+            return 0
+        return self.order_timestamps[0] + self.interval - current_time
+
+    async def acquire(self):
+        """等待直到获得下单配额"""
+        while not self.check_rate():
+            delay = max(self.wait_time(), 0.05)
+            RATE_LIMIT_WAITS.inc()
+            RATE_LIMIT_WAIT_SECONDS.inc(delay)
+            await asyncio.sleep(delay)
+
 class OrderTracker:
-    def __init__(self):
+    def __init__(self, data_dir=None):
+        """data_dir 默认为程序目录下的 data/（基准测试等场景可指定临时目录）"""
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.data_dir = os.path.join(os.path.dirname(__file__), 'data')
+        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), 'data')
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
         self.history_file = os.path.join(self.data_dir, 'trade_history.json')
@@ -30,34 +56,31 @@ class OrderTracker:
         if not os.path.exists(self.archive_dir):
             os.makedirs(self.archive_dir)
         self.max_archive_months = 12
-        self.order_states = {}
         self.trade_count = 0
-        self.orders = {}
+        self.orders = OrderRegistry()  # 所有订单的状态机与索引
+        self.pnl_ledger = PnLLedger(  # 批次匹配的盈亏账本，新成交的 profit 由它计算
+            os.path.join(self.data_dir, 'pnl_ledger.json'), method=PNL_PARAMS['method'], quote=QUOTE_SYMBOL
+        )
         self.trade_history = []
+        self._recent_cache = (None, [])
         self.load_trade_history()
         self.clean_old_archives()
+        self.trade_store = TradeStore(os.path.join(self.data_dir, 'trades.db'))  # 分页查询与按日汇总用的索引
+        if not self.trade_store.backfilled:
+            self.trade_store.backfill(trade_export.iter_trades(self))
+        # 落盘（归档追加、SQLite 索引、盈亏账本、交易历史文件）由写线程完成，事件循环只更新内存并入队；
+        # 账本和交易历史只保留最新快照，成交密集时多次写入合并为一次
+        self._persist = threading.Condition()
+        self._pending = self._empty_pending()
+        self._persisting = False
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name='trade-writer', daemon=True)
+        self._writer.start()
     
-    def log_order(self, order):
-        self.order_states[order['id']] = {
-            'created': datetime.now(),
-            'status': 'open'
-        } 
-
-    def add_order(self, order):
-        """添加新订单到跟踪器"""
-        try:
-            order_id = order['id']
-            self.orders[order_id] = {
-                'order': order,
-                'created_at': datetime.now(),
-                'status': order['status'],
-                'profit': 0
-            }
-            self.trade_count += 1
-            self.logger.info(f"订单已添加到跟踪器 | ID: {order_id} | 状态: {order['status']}")
-        except Exception as e:
-            self.logger.error(f"添加订单失败: {str(e)}")
-            raise
+    def add_order(self, record):
+        """统计新提交的订单（订单状态由 self.orders 维护）"""
+        self.trade_count += 1
+        self.logger.info(f"订单已添加到跟踪器 | ID: {record.ord_id} | 状态: {record.state.value}")
 
     def reset(self):
         self.trade_count = 0
@@ -68,28 +91,110 @@ class OrderTracker:
         """获取交易历史"""
         return self.trade_history
 
+    def recent_trades(self, limit=10):
+        """最近 limit 条交易（状态面板用的格式），交易历史不变时直接返回缓存"""
+        key = (limit, len(self.trade_history), id(self.trade_history[-1]) if self.trade_history else None)
+        if self._recent_cache[0] != key:
+            self._recent_cache = (key, [{
+                'timestamp': datetime.fromtimestamp(trade['timestamp']).strftime('%Y-%m-%d %H:%M:%S'),
+                'side': trade.get('side', '--'),
+                'price': trade.get('price', 0),
+                'amount': trade.get('amount', 0),
+                'profit': trade.get('profit', 0)
+            } for trade in self.trade_history[-limit:]])
+        return self._recent_cache[1]
+
+    def reload(self):
+        """重新加载交易历史和盈亏账本（备用节点接管时使用原主节点写入的文件）"""
+        self.flush()
+        self.load_trade_history()
+        self.pnl_ledger.load()
+
     def load_trade_history(self):
         """从文件加载历史交易记录"""
         try:
             if os.path.exists(self.history_file):
                 with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.trade_history = json.load(f)
+                    self.trade_history = speedups.load(f)
                 self.logger.info(f"加载了 {len(self.trade_history)} 条历史交易记录")
         except Exception as e:
             self.logger.error(f"加载历史交易记录失败: {str(e)}")
 
     def save_trade_history(self):
-        """将当前交易历史保存到文件"""
+        """将当前交易历史保存到文件（由写线程写入）"""
+        self._enqueue(history=list(self.trade_history))
+
+    def _write_history(self, trades):
         try:
             # 先备份当前文件
             self.backup_history()
             # 保存当前记录
             with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.trade_history, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"已将 {len(self.trade_history)} 条交易记录保存到 {self.history_file}")
+                speedups.dump(trades, f, indent=True)
+            self.logger.debug(f"已将 {len(trades)} 条交易记录保存到 {self.history_file}")
         except Exception as e:
             self.logger.error(f"保存交易记录失败: {str(e)}")
 
+    @staticmethod
+    def _empty_pending():
+        return {'archive': [], 'trades': [], 'ledger': None, 'history': None}
+
+    def _has_pending(self):
+        pending = self._pending
+        return bool(pending['archive'] or pending['trades']) or pending['ledger'] is not None or pending['history'] is not None
+
+    def _enqueue(self, archive=(), trades=(), ledger=None, history=None):
+        """提交落盘任务；archive/trades 按顺序累积，ledger/history 只保留最新快照"""
+        with self._persist:
+            self._pending['archive'].extend(archive)
+            self._pending['trades'].extend(trades)
+            if ledger is not None:
+                self._pending['ledger'] = ledger
+            if history is not None:
+                self._pending['history'] = history
+            self._persist.notify_all()
+
+    def _write_loop(self):
+        while True:
+            with self._persist:
+                while not self._has_pending() and not self._closed:
+                    self._persist.wait()
+                if not self._has_pending():
+                    return
+                pending, self._pending = self._pending, self._empty_pending()
+                self._persisting = True
+            try:
+                self._write_pending(pending)
+            except Exception as e:
+                self.logger.error(f"交易记录落盘失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+            finally:
+                with self._persist:
+                    self._persisting = False
+                    self._persist.notify_all()
+
+    def _write_pending(self, pending):
+        # 与原同步写入顺序一致：先归档溢出的记录，再写索引、账本和当前交易历史
+        if pending['archive']:
+            self._append_to_archive(pending['archive'])
+        if pending['trades']:
+            self.trade_store.add_many(pending['trades'])
+        if pending['ledger'] is not None:
+            self.pnl_ledger.write(pending['ledger'])
+        if pending['history'] is not None:
+            self._write_history(pending['history'])
+
+    def flush(self, timeout=5):
+        """等待已提交的落盘任务写完，返回是否在 timeout 秒内写完"""
+        with self._persist:
+            return self._persist.wait_for(lambda: not self._has_pending() and not self._persisting, timeout)
+
+    def close(self):
+        """写完剩余的落盘任务并停止写线程"""
+        with self._persist:
+            self._closed = True
+            self._persist.notify_all()
+        self._writer.join(timeout=5)
+
     def backup_history(self):
         """备份交易历史"""
         try:
@@ -118,25 +223,24 @@ class OrderTracker:
             self.logger.error(f"交易记录数据类型错误: {str(e)}")
             return
         
+        # 按批次匹配计算已实现盈亏（含手续费），买入为0；账本只更新内存，由写线程落盘
+        # 传入的 fee 为 OKX 原始值（负数为扣费，正数为返佣），记录中保存为手续费成本（返佣为负数）
+        raw_fee = float(trade.get('fee') or 0)
+        trade['fee'] = -raw_fee
+        trade['profit'] = self.pnl_ledger.record_fill(
+            trade['side'], trade['price'], trade['amount'],
+            fee=raw_fee, fee_ccy=trade.get('fee_ccy'), order_id=trade['order_id'], save=False
+        )
+        
         self.logger.info(f"添加交易记录: {trade}")
         self.trade_history.append(trade)
+        archived = []
         if len(self.trade_history) > 500:  # 从100增加到500，保留更多历史数据
+            # 超出部分追加到月度归档，而不是直接丢弃
+            archived = self.trade_history[:-500]
             self.trade_history = self.trade_history[-500:]
-        try:
-            # 先备份当前文件
-            self.backup_history()
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.trade_history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            self.logger.error(f"保存交易记录失败: {str(e)}")
-
-    def update_order(self, order_id, status, profit=0):
-        if order_id in self.orders:
-            self.orders[order_id]['status'] = status
-            self.orders[order_id]['profit'] = profit
-            if status == 'closed':
-                # 更新订单状态为已关闭
-                self.logger.info(f"订单已关闭 | ID: {order_id} | 利润: {profit}")
+        self._enqueue(archive=archived, trades=[trade], ledger=self.pnl_ledger.state(),
+                      history=list(self.trade_history))
 
     def get_statistics(self):
         """获取交易统计信息"""
@@ -155,9 +259,10 @@ class OrderTracker:
                 }
             
             total_trades = len(self.trade_history)
-            winning_trades = len([t for t in self.trade_history if t['profit'] > 0])
-            total_profit = sum(t['profit'] for t in self.trade_history)
-            profits = [t['profit'] for t in self.trade_history]
+            # 只有卖出（平仓）才有已实现盈亏，胜率等指标只按卖出计算
+            profits = [t.get('profit', 0) for t in self.trade_history if t.get('side', '').lower() == 'sell']
+            winning_trades = len([p for p in profits if p > 0])
+            total_profit = sum(profits)
             
             # 计算最大连续盈利和亏损
             current_streak = 1
@@ -176,9 +281,9 @@ class OrderTracker:
             
             return {
                 'total_trades': total_trades,
-                'win_rate': winning_trades / total_trades if total_trades > 0 else 0,
+                'win_rate': winning_trades / len(profits) if profits else 0,
                 'total_profit': total_profit,
-                'avg_profit': total_profit / total_trades if total_trades > 0 else 0,
+                'avg_profit': total_profit / len(profits) if profits else 0,
                 'max_profit': max(profits) if profits else 0,
                 'max_loss': min(profits) if profits else 0,
                 'profit_factor': sum(p for p in profits if p > 0) / abs(sum(p for p in profits if p < 0)) if sum(p for p in profits if p < 0) != 0 else 0,
@@ -189,32 +294,33 @@ class OrderTracker:
             self.logger.error(f"计算统计信息失败: {str(e)}")
             return None
 
+    def _append_to_archive(self, trades):
+        """按成交月份追加到 archives/trades_YYYYMM.ndjson（每行一条，追加写入无需读取旧内容）"""
+        by_month = {}
+        for trade in trades:
+            month = datetime.fromtimestamp(trade['timestamp']).strftime('%Y%m')
+            by_month.setdefault(month, []).append(trade)
+        for month, month_trades in by_month.items():
+            archive_file = os.path.join(self.archive_dir, f'trades_{month}.ndjson')
+            with open(archive_file, 'a', encoding='utf-8') as f:
+                for trade in month_trades:
+                    f.write(speedups.dumps(trade) + '\n')
+        return len(trades)
+
     def archive_old_trades(self):
         """归档旧的交易记录"""
         try:
             if len(self.trade_history) <= 100:
                 return
             
-            # 获取当前月份作为归档文件名
-            current_month = datetime.now().strftime('%Y%m')
-            archive_file = os.path.join(self.archive_dir, f'trades_{current_month}.json')
-            
-            # 将旧记录移动到归档
-            old_trades = self.trade_history[:-100]
-            
-            # 如果归档文件存在，先读取并合并
-            if os.path.exists(archive_file):
-                with open(archive_file, 'r', encoding='utf-8') as f:
-                    archived_trades = json.load(f)
-                    old_trades = archived_trades + old_trades
-            
-            # 保存归档
-            with open(archive_file, 'w', encoding='utf-8') as f:
-                json.dump(old_trades, f, ensure_ascii=False, indent=2)
+            # 将旧记录追加到对应月份的归档（由写线程写入）
+            archived = self.trade_history[:-100]
+            count = len(archived)
             
             # 更新当前交易历史
             self.trade_history = self.trade_history[-100:]
-            self.logger.info(f"已归档 {len(old_trades)} 条交易记录到 {archive_file}")
+            self._enqueue(archive=archived, history=list(self.trade_history))
+            self.logger.info(f"已归档 {count} 条交易记录到 {self.archive_dir}")
         except Exception as e:
             self.logger.error(f"归档交易记录失败: {str(e)}")
 
@@ -222,11 +328,13 @@ class OrderTracker:
         """清理过期的归档文件"""
         try:
             archive_files = [f for f in os.listdir(self.archive_dir) if f.startswith('trades_')]
-            archive_files.sort(reverse=True)  # 按时间倒序排列
+            # 按月份保留（同一月份可能同时有旧格式 .json 和 .ndjson 两个文件）
+            months = sorted({f.split('.')[0] for f in archive_files}, reverse=True)
             
             # 保留最近12个月的归档
-            if len(archive_files) > self.max_archive_months:
-                for old_file in archive_files[self.max_archive_months:]:
+            if len(months) > self.max_archive_months:
+                expired = set(months[self.max_archive_months:])
+                for old_file in [f for f in archive_files if f.split('.')[0] in expired]:
                     file_path = os.path.join(self.archive_dir, old_file)
                     os.remove(file_path)
                     self.logger.info(f"已删除过期归档: {old_file}")
@@ -260,7 +368,7 @@ class OrderTracker:
                         'volume': 0
                     }
                 daily_stats[trade_date]['trades'] += 1
-                daily_stats[trade_date]['profit'] += trade['profit']
+                daily_stats[trade_date]['profit'] += trade.get('profit', 0)
                 daily_stats[trade_date]['volume'] += trade['price'] * trade['amount']
             
             return {
@@ -277,32 +385,25 @@ class OrderTracker:
             self.logger.error(f"分析交易失败: {str(e)}")
             return None
 
-    def export_trades(self, format='csv'):
-        """导出交易记录"""
+    def export_trades(self, format='csv', start=None, end=None):
+        """导出交易记录（含全部月度归档），逐条流式写入，内存占用与记录总数无关
+
+        Args:
+            format: csv / ndjson / columnar（gzip 压缩的列式行组）/ parquet（需要 pyarrow）
+            start/end: 时间范围（Unix 秒），None 表示不限
+        """
         try:
-            if not self.trade_history:
-                return False
-            
+            self.flush()  # 归档文件由写线程追加，导出前等待写完
             export_dir = os.path.join(self.data_dir, 'exports')
             if not os.path.exists(export_dir):
                 os.makedirs(export_dir)
             
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            if format == 'csv':
-                export_file = os.path.join(export_dir, f'trades_export_{timestamp}.csv')
-                import csv
-                with open(export_file, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=['timestamp', 'side', 'price', 'amount', 'profit', 'order_id'])
-                    writer.writeheader()
-                    for trade in self.trade_history:
-                        writer.writerow(trade)
-            else:
-                export_file = os.path.join(export_dir, f'trades_export_{timestamp}.json')
-                with open(export_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.trade_history, f, ensure_ascii=False, indent=2)
+            export_file = os.path.join(export_dir, f'trades_export_{timestamp}.{trade_export.FORMATS[format][1]}')
+            size = trade_export.export_to_file(trade_export.iter_trades(self, start, end), export_file, format)
             
-            self.logger.info(f"交易记录已导出到: {export_file}")
-            return True
+            self.logger.info(f"交易记录已导出到: {export_file} | 大小: {size} 字节")
+            return export_file
         except Exception as e:
             self.logger.error(f"导出交易记录失败: {str(e)}")
-            return False
\ No newline at end of file
+            return False
@@ -0,0 +1,211 @@
+import logging
+import os
+import time
+import traceback
+from collections import OrderedDict, deque
+
+import speedups
+
+
+class PnLLedger:
+    """按批次匹配的盈亏账本
+
+    每笔买入成交形成一个持仓批次（数量、含手续费的单位成本），卖出时按 FIFO 从最早的
+    批次开始匹配（method='average' 时所有批次合并为一个平均成本批次），已实现盈亏 =
+    卖出净收入 − 匹配批次的成本。持仓数量、持仓成本、已实现盈亏、累计手续费都随成交
+    增量维护，每个批次只进出队列各一次，单笔成交的均摊代价为 O(1)。
+
+    手续费沿用 OKX 的符号（负数为扣费，正数为返佣，如 post_only 挂单的 maker 返佣），
+    返佣减少成本。手续费以计价币（USDT）计入：买入手续费为基础币时从到手数量中扣除
+    （返佣则增加），卖出手续费为基础币时按成交价折算。状态在每次成交后原子写入 path，重启时直接加载，不需要回放历史。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, method='fifo', quote='USDT', max_order_records=1000):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.method = method
+        self.quote = quote
+        self.max_order_records = max_order_records
+        self.lots = deque()            # [数量, 单位成本]
+        self.position = 0.0            # 持仓数量
+        self.cost_basis = 0.0          # 持仓总成本（USDT）
+        self.realized_pnl = 0.0
+        self.fees = 0.0                # 累计手续费（USDT）
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.unmatched = 0.0           # 卖出时没有可匹配批次的数量（账本建立前的持仓）
+        self.order_pnl = OrderedDict()  # 最近订单的已实现盈亏，用于去重和重启后补全交易记录
+        self.updated_at = None
+        self.load()
+
+    @property
+    def empty(self):
+        return not self.lots and not self.order_pnl and self.realized_pnl == 0
+
+    @property
+    def avg_cost(self):
+        return self.cost_basis / self.position if self.position > 0 else 0.0
+
+    def seed(self, amount, price):
+        """以当前价格登记账本建立前已有的持仓，作为期初批次"""
+        if amount <= 0:
+            return
+        self._add_lot(amount, price)
+        self.logger.info(f"盈亏账本登记期初持仓 | 数量: {amount:.6f} | 成本价: {price:.4f}")
+        self.save()
+
+    def _add_lot(self, amount, unit_cost):
+        if self.method == 'average' and self.lots:
+            lot = self.lots[0]
+            total = lot[0] + amount
+            lot[1] = (lot[0] * lot[1] + amount * unit_cost) / total
+            lot[0] = total
+        else:
+            self.lots.append([amount, unit_cost])
+        self.position += amount
+        self.cost_basis += amount * unit_cost
+
+    def _fee_in_quote(self, fee, fee_ccy, price):
+        """返回 (折算为USDT的手续费成本, 基础币手续费成本)，返佣为负成本"""
+        if not fee:
+            return 0.0, 0.0
+        cost = -float(fee)
+        if fee_ccy and fee_ccy != self.quote:
+            return cost * price, cost
+        return cost, 0.0
+
+    def record_fill(self, side, price, amount, fee=0.0, fee_ccy=None, order_id=None, save=True):
+        """登记一笔成交，返回该笔成交的已实现盈亏（买入为 0）
+
+        fee 为 OKX 原始手续费（负数为扣费，正数为返佣）。
+        同一 order_id 重复登记时直接返回第一次的结果，不重复计算。
+        save=False 时只更新内存状态，由调用方用 state()/write() 自行落盘。
+        """
+        if order_id and order_id in self.order_pnl:
+            return self.order_pnl[order_id]
+        price, amount = float(price), float(amount)
+        fee_quote, fee_base = self._fee_in_quote(fee, fee_ccy, price)
+        self.fees += fee_quote
+        pnl = 0.0
+        if side.lower() == 'buy':
+            received = amount - fee_base
+            if received > 0:
+                cost = price * amount + (fee_quote if not fee_base else 0.0)
+                self._add_lot(received, cost / received)
+        else:
+            proceeds = price * amount - fee_quote
+            remaining = amount
+            matched_cost = 0.0
+            while remaining > 1e-12 and self.lots:
+                lot = self.lots[0]
+                take = min(remaining, lot[0])
+                matched_cost += take * lot[1]
+                lot[0] -= take
+                remaining -= take
+                if lot[0] <= 1e-12:
+                    self.lots.popleft()
+            matched = amount - remaining
+            self.position = max(self.position - matched, 0.0)
+            self.cost_basis = max(self.cost_basis - matched_cost, 0.0) if self.lots else 0.0
+            if remaining > 1e-12:
+                self.unmatched += remaining
+                self.logger.warning(f"卖出数量超过账本持仓，{remaining:.6f} 无成本记录，按零盈亏处理")
+            # 无成本记录的部分按卖出价计成本，只计入其分摊的手续费
+            pnl = proceeds * matched / amount - matched_cost - fee_quote * remaining / amount if amount else 0.0
+            self.realized_pnl += pnl
+            if pnl > 0:
+                self.wins += 1
+                self.gross_profit += pnl
+            elif pnl < 0:
+                self.losses += 1
+                self.gross_loss += -pnl
+        if order_id:
+            self.order_pnl[order_id] = pnl
+            while len(self.order_pnl) > self.max_order_records:
+                self.order_pnl.popitem(last=False)
+        self.updated_at = time.time()
+        if save:
+            self.save()
+        return pnl
+
+    def unrealized_pnl(self, price):
+        return self.position * price - self.cost_basis if price else 0.0
+
+    def snapshot(self, price=None):
+        closed = self.wins + self.losses
+        return {
+            'method': self.method,
+            'position': self.position,
+            'cost_basis': self.cost_basis,
+            'avg_cost': self.avg_cost,
+            'realized_pnl': self.realized_pnl,
+            'unrealized_pnl': self.unrealized_pnl(price) if price else None,
+            'fees': self.fees,
+            'open_lots': len(self.lots),
+            'closed_trades': closed,
+            'win_rate': self.wins / closed if closed else 0,
+            'profit_factor': self.gross_profit / self.gross_loss if self.gross_loss else 0,
+            'unmatched': self.unmatched,
+            'updated_at': self.updated_at
+        }
+
+    def state(self):
+        """当前状态的独立副本（批次逐个复制），可以交给其他线程写入"""
+        return {
+            'version': self.VERSION,
+            'method': self.method,
+            'lots': [list(lot) for lot in self.lots],
+            'position': self.position,
+            'cost_basis': self.cost_basis,
+            'realized_pnl': self.realized_pnl,
+            'fees': self.fees,
+            'wins': self.wins,
+            'losses': self.losses,
+            'gross_profit': self.gross_profit,
+            'gross_loss': self.gross_loss,
+            'unmatched': self.unmatched,
+            'order_pnl': list(self.order_pnl.items()),
+            'updated_at': self.updated_at
+        }
+
+    def save(self):
+        self.write(self.state())
+
+    def write(self, state):
+        """原子写入：先写临时文件再替换，避免写到一半时崩溃损坏账本"""
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                speedups.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.logger.error(f"保存盈亏账本失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = speedups.load(f)
+            if state.get('method', self.method) != self.method:
+                self.logger.warning(f"盈亏账本计价方式由 {state.get('method')} 改为 {self.method}，已有批次按新方式继续匹配")
+            self.lots = deque([float(qty), float(cost)] for qty, cost in state.get('lots', []))
+            if self.method == 'average' and len(self.lots) > 1:
+                total = sum(qty for qty, _ in self.lots)
+                self.lots = deque([[total, sum(qty * cost for qty, cost in self.lots) / total]])
+            for key in ('position', 'cost_basis', 'realized_pnl', 'fees', 'gross_profit', 'gross_loss', 'unmatched'):
+                setattr(self, key, float(state.get(key, 0.0)))
+            self.wins = int(state.get('wins', 0))
+            self.losses = int(state.get('losses', 0))
+            self.order_pnl = OrderedDict((order_id, pnl) for order_id, pnl in state.get('order_pnl', []))
+            self.updated_at = state.get('updated_at')
+            self.logger.info(
+                f"加载盈亏账本 | 持仓: {self.position:.6f} | 持仓成本: {self.cost_basis:.2f} | "
+                f"已实现盈亏: {self.realized_pnl:.2f} | 批次: {len(self.lots)}"
+            )
+        except Exception as e:
+            self.logger.error(f"加载盈亏账本失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
@@ -3,6 +3,7 @@ import time
 import asyncio
 import logging
 import math # 需要 math 来处理精度
+from order_registry import make_client_order_id
 
 class PositionControllerS1:
     """
@@ -159,13 +160,24 @@ class PositionControllerS1:
 
             # 5. 使用 trader 的 exchange 客户端直接下单 (使用市价单确保执行调整)
             # 注意：市价单可能有滑点风险，对于大额调整需谨慎
-            order = await self.trader.exchange.create_market_order(
-                symbol=self.trader.symbol,
-                side=side.lower(), # ccxt 通常需要小写
-                amount=adjusted_amount
+            # clOrdId 由本次调整确定，提交结果未知时只需按它核对一次，不会重复下单
+            # tgtCcy=base_ccy 使市价买单的数量以基础币种计（OKX 默认按计价币种）
+            client_order_id = make_client_order_id('s1', side, int(time.time() * 1000))
+            record, order = await self.trader._submit_order(
+                side.lower(), 'market', adjusted_amount, None, client_order_id,
+                params={'tgtCcy': 'base_ccy'}
             )
 
-            self.logger.info(f"S1: Adjustment order placed successfully. Order ID: {order.get('id', 'N/A')}")
+            self.logger.info(f"S1: Adjustment order placed successfully. Order ID: {record.ord_id} | clOrdId: {client_order_id}")
+            
+            # 市价单通常立即成交，按 clOrdId 查询一次获取成交均价和成交量
+            try:
+                order = await self.trader.exchange.fetch_order(
+                    None, self.trader.symbol, client_order_id=client_order_id
+                )
+                self.trader.order_tracker.orders.update_from_exchange(order)
+            except Exception as e:
+                self.logger.warning(f"S1: 查询成交信息失败，使用下单时的价格和数量记录: {e}")
             
             # 6. （可选）更新交易记录器 (如果希望S1交易也记录在案)
             if hasattr(self.trader, 'order_tracker'):
@@ -173,21 +185,19 @@ class PositionControllerS1:
                      'timestamp': time.time(),
                      'strategy': 'S1', # 标记来源
                      'side': side,
-                     'price': float(order.get('average', current_price)), # 使用成交均价或市价
-                     'amount': float(order.get('filled', adjusted_amount)), # 使用实际成交量
-                     'order_id': order.get('id')
-                     # 可以添加更多信息，如 cost, fee (如果API返回)
+                     'price': float(order.get('price') or current_price), # 使用成交均价或市价
+                     'amount': float(order.get('filled') or adjusted_amount), # 使用实际成交量
+                     'order_id': record.ord_id,
+                     'fee': order.get('fee') or 0,     # 手续费（负数为支出，正数为返佣），盈亏账本按符号计入成本
+                     'fee_ccy': order.get('feeCcy')
                  }
                  self.trader.order_tracker.add_trade(trade_info)
                  self.logger.info("S1: Trade logged in OrderTracker.")
                  
-            # 7. 买入后如有多余资金，转入理财
-            if side == 'BUY' and hasattr(self.trader, '_transfer_excess_funds'):
-                try:
-                    await self.trader._transfer_excess_funds()
-                    self.logger.info("S1: 交易完成后尝试将多余资金转入理财")
-                except Exception as e:
-                    self.logger.warning(f"S1: 转移多余资金到理财失败: {e}")
+            # 7. 买入后如有多余资金，在后台转入理财（与网格成交后的再平衡合并执行）
+            if side == 'BUY' and hasattr(self.trader, 'fund_planner'):
+                self.trader.fund_planner.schedule_rebalance()
+                self.logger.info("S1: 交易完成后安排资金再平衡，多余资金转入理财")
 
             return True # 表示成功执行
 
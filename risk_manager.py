@@ -1,11 +1,13 @@
 import logging
 import traceback
 from config import MAX_POSITION_RATIO
+from metrics import POSITION_RATIO
 
 class AdvancedRiskManager:
     def __init__(self, trader):
         self.trader = trader
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.position_ratio = None  # 最近一次计算的仓位比例，供不访问交易所的状态发布使用
     
     async def multi_layer_check(self):
         try:
@@ -76,6 +78,8 @@ class AdvancedRiskManager:
                 return 0
                 
             ratio = position_value / total_assets
+            POSITION_RATIO.set(ratio)
+            self.position_ratio = ratio
             self.logger.debug(
                 f"仓位计算 | "
                 f"{self.trader.symbol_info['base']}价值: {position_value:.2f} USDT | "
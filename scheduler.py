@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import random
+import time
+import traceback
+
+from metrics import HOUSEKEEPING_RUNS, HOUSEKEEPING_SECONDS
+
+
+class _Job:
+    __slots__ = ('name', 'func', 'interval', 'timeout', 'jitter', 'condition',
+                 'task', 'runs', 'last_started', 'last_duration', 'last_result', 'last_error')
+
+    def __init__(self, name, func, interval, timeout, jitter, condition):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.timeout = timeout
+        self.jitter = jitter
+        self.condition = condition
+        self.task = None
+        self.runs = 0
+        self.last_started = None
+        self.last_duration = None
+        self.last_result = None
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            'interval': self.interval,
+            'timeout': self.timeout,
+            'running': self.task is not None and not self.task.done(),
+            'runs': self.runs,
+            'last_started': self.last_started,
+            'last_duration': round(self.last_duration, 3) if self.last_duration is not None else None,
+            'last_result': self.last_result,
+            'last_error': self.last_error
+        }
+
+
+class HousekeepingScheduler:
+    """例行任务调度器
+
+    每个任务在独立的协程中按自己的周期运行，与交易主循环互不阻塞：
+    - 周期加入 ±jitter 比例的随机抖动，避免多个任务同时发起请求；
+    - 单次运行超过 timeout 秒即取消并记为 timeout；
+    - 上一次运行尚未结束时本轮跳过（skipped），同一任务不会重叠执行；
+    - condition 返回 False 时本轮跳过（如追踪触发价期间、风控触发时）。
+    每个任务的运行结果和耗时记录到 grid_housekeeping_* 指标。
+    """
+
+    def __init__(self, jitter=0.1):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.jitter = jitter
+        self.jobs = {}
+
+    def add(self, name, func, interval, timeout=60, jitter=None, condition=None):
+        self.jobs[name] = _Job(name, func, interval, timeout, self.jitter if jitter is None else jitter, condition)
+
+    async def run(self):
+        """启动所有任务的调度协程"""
+        await asyncio.gather(*(self._schedule(job) for job in self.jobs.values()))
+
+    async def _schedule(self, job):
+        while True:
+            await asyncio.sleep(job.interval * (1 + random.uniform(-job.jitter, job.jitter)))
+            self.trigger(job.name)
+
+    def trigger(self, name):
+        """立即运行一次指定任务（遵守重叠保护和运行条件），返回是否已启动"""
+        job = self.jobs[name]
+        if job.task is not None and not job.task.done():
+            HOUSEKEEPING_RUNS.labels(job.name, 'skipped').inc()
+            self.logger.debug(f"例行任务仍在运行，跳过本轮 | 任务: {job.name}")
+            return False
+        try:
+            if job.condition is not None and not job.condition():
+                return False
+        except Exception as e:
+            self.logger.error(f"例行任务条件检查失败: {str(e)} | 任务: {job.name}")
+            return False
+        job.task = asyncio.create_task(self._run_job(job))
+        return True
+
+    async def _run_job(self, job):
+        job.last_started = time.time()
+        job.last_result = None
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(job.func(), job.timeout)
+            job.last_result, job.last_error = 'ok', None
+        except asyncio.CancelledError:
+            job.last_result, job.last_error = 'cancelled', None
+            raise
+        except asyncio.TimeoutError:
+            job.last_result, job.last_error = 'timeout', f"超过 {job.timeout} 秒"
+            self.logger.warning(f"例行任务超时已取消 | 任务: {job.name} | 超时: {job.timeout}秒")
+        except Exception as e:
+            job.last_result, job.last_error = 'error', str(e)
+            self.logger.error(f"例行任务失败: {str(e)} | 任务: {job.name} | 堆栈信息: {traceback.format_exc()}")
+        finally:
+            job.last_duration = time.perf_counter() - start
+            job.runs += 1
+            HOUSEKEEPING_RUNS.labels(job.name, job.last_result).inc()
+            HOUSEKEEPING_SECONDS.labels(job.name).observe(job.last_duration)
+
+    async def close(self):
+        """取消正在运行的任务"""
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def snapshot(self):
+        return {name: job.to_dict() for name, job in self.jobs.items()}
@@ -0,0 +1,103 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+import speedups
+
+# 头部：魔数、序号、负载长度、CRC32、写入时间；负载为 UTF-8 JSON
+_HEADER = struct.Struct('<8sQIId')
+_SEQ = struct.Struct('<Q')
+_SEQ_OFFSET = 8
+_MAGIC = b'GRIDSTA1'
+
+
+def default_state_path(name='grid-trader'):
+    """优先放在 /dev/shm（内存文件系统），没有时放在系统临时目录"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, f'{name}.state')
+
+
+class SharedStateWriter:
+    """共享内存状态的写端（单写者），以 seqlock 方式无锁发布 JSON 快照
+
+    写入前把序号加一变为奇数，写完负载、长度和校验和后再加一变回偶数；读端在序号为
+    奇数或前后两次读到的序号不同时重试，因此写端从不等待读端，读端多少都不影响写端。
+    """
+
+    def __init__(self, path, size=4 * 1024 * 1024):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.size = size
+        self.capacity = size - _HEADER.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._seq = 0
+        _HEADER.pack_into(self._mm, 0, _MAGIC, 0, 0, 0, 0.0)
+
+    def publish(self, state):
+        """写入一份快照，负载超过容量时放弃本次写入并返回 False"""
+        payload = speedups.dumps_bytes(state)
+        if len(payload) > self.capacity:
+            self.logger.warning(f"共享状态超过容量，本次未发布 | 大小: {len(payload)} | 容量: {self.capacity}")
+            return False
+        self._seq += 1
+        _SEQ.pack_into(self._mm, _SEQ_OFFSET, self._seq)  # 奇数：写入中
+        self._mm[_HEADER.size:_HEADER.size + len(payload)] = payload
+        self._seq += 1
+        _HEADER.pack_into(self._mm, 0, _MAGIC, self._seq - 1, len(payload), zlib.crc32(payload), time.time())
+        _SEQ.pack_into(self._mm, _SEQ_OFFSET, self._seq)  # 偶数：写入完成
+        return True
+
+    def close(self):
+        self._mm.close()
+
+
+class SharedStateReader:
+    """共享内存状态的读端，可以有任意多个，只读映射，不会阻塞写端"""
+
+    def __init__(self, path):
+        self.path = path
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            self._mm = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        magic = _HEADER.unpack_from(self._mm, 0)[0]
+        if magic != _MAGIC:
+            self._mm.close()
+            raise ValueError(f"不是共享状态文件: {path}")
+        self.capacity = len(self._mm) - _HEADER.size
+        self._cached = (None, None, None)
+        self.retries = 0
+
+    def read(self, max_retries=1000):
+        """返回 (快照, 序号, 写入时间)；序号未变时直接返回缓存的快照，尚未发布时快照为 None"""
+        for _ in range(max_retries):
+            seq = _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+            if seq & 1:
+                self.retries += 1
+                time.sleep(0)
+                continue
+            if seq == 0:
+                return None, 0, None
+            if seq == self._cached[1]:
+                return self._cached
+            _, _, length, crc, published_at = _HEADER.unpack_from(self._mm, 0)
+            payload = self._mm[_HEADER.size:_HEADER.size + min(length, self.capacity)]
+            if _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0] != seq or zlib.crc32(payload) != crc:
+                self.retries += 1
+                continue
+            self._cached = (speedups.loads(payload), seq, published_at)
+            return self._cached
+        raise TimeoutError("读取共享状态重试次数过多")
+
+    def close(self):
+        self._mm.close()
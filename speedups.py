@@ -0,0 +1,114 @@
+"""可选加速：uvloop 事件循环与 orjson 序列化
+
+两者都是可选依赖，未安装或被禁用时自动回退到标准库。项目内的 JSON 读写统一通过本模块的
+dumps / loads / dump / load，启动时由 configure() 选择实现；orjson 无法编码的对象（如超过
+64 位的整数）会自动改用标准库编码；orjson 无法解析的内容（如标准库写入的 NaN / Infinity）
+会自动改用标准库解析。注意 orjson 会把 NaN / Infinity 编码为 null，与标准库不同。
+"""
+import asyncio
+import json
+import logging
+import platform
+
+from aiohttp import web
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# 'orjson' 或 'stdlib'，由 configure() 设置
+JSON_BACKEND = 'orjson' if orjson is not None else 'stdlib'
+EVENT_LOOP = 'asyncio'
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+
+def _enabled(requested, name, available):
+    """auto 时按是否可用决定；显式要求但不可用时告警并回退"""
+    if requested == 'auto':
+        return available
+    if requested == name and not available:
+        logging.warning(f"{name} 不可用，回退到标准库实现")
+    return requested == name and available
+
+
+def configure(event_loop='auto', json_backend='auto'):
+    """选择事件循环和 JSON 实现，需在 asyncio.run 之前调用
+
+    Args:
+        event_loop: auto（已安装 uvloop 且非 Windows 时使用）/ uvloop / asyncio
+        json_backend: auto（已安装 orjson 时使用）/ orjson / stdlib
+    """
+    global JSON_BACKEND, EVENT_LOOP
+    if _enabled(event_loop, 'uvloop', uvloop is not None and platform.system() != 'Windows'):
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        EVENT_LOOP = 'uvloop'
+    else:
+        EVENT_LOOP = 'asyncio'
+    JSON_BACKEND = 'orjson' if _enabled(json_backend, 'orjson', orjson is not None) else 'stdlib'
+    if JSON_BACKEND == 'orjson':
+        _patch_httpx()
+    return {'event_loop': EVENT_LOOP, 'json': JSON_BACKEND}
+
+
+class _OrjsonLib:
+    """供 httpx 解析响应体使用（python-okx SDK 的 response.json()）"""
+
+    @staticmethod
+    def loads(data, **kwargs):
+        return loads(data) if not kwargs else json.loads(data, **kwargs)
+
+    dumps = staticmethod(json.dumps)
+
+
+def _patch_httpx():
+    try:
+        import httpx._models as httpx_models
+    except ImportError:
+        return
+    if hasattr(httpx_models, 'jsonlib'):
+        httpx_models.jsonlib = _OrjsonLib
+
+
+def dumps_bytes(obj, indent=False):
+    """编码为 UTF-8 字节（非 ASCII 字符不转义）"""
+    if JSON_BACKEND == 'orjson':
+        try:
+            return orjson.dumps(obj, default=str, option=_ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, default=str, indent=2 if indent else None).encode('utf-8')
+
+
+def dumps(obj, indent=False):
+    return dumps_bytes(obj, indent).decode('utf-8')
+
+
+def loads(data):
+    if JSON_BACKEND == 'orjson':
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # 标准库写入的 NaN / Infinity 不是严格 JSON，orjson 拒绝解析
+            pass
+    return json.loads(data)
+
+
+def dump(obj, f, indent=False):
+    """写入文本模式打开的文件"""
+    f.write(dumps(obj, indent))
+
+
+def load(f):
+    return loads(f.read())
+
+
+def json_response(data, **kwargs):
+    """web.json_response 的替代，使用当前 JSON 实现编码"""
+    return web.json_response(data, dumps=dumps, **kwargs)
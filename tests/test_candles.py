@@ -0,0 +1,77 @@
+import pytest
+
+from candles import CandleSeries, timeframe_spec
+
+MINUTE = 60_000
+HOUR = 60 * MINUTE
+# 2024-01-01 00:00 UTC，周一
+MONDAY_UTC = 1704067200000
+
+
+def minute(ts, open_, high, low, close, volume):
+    return [ts, open_, high, low, close, volume, volume, volume * close]
+
+
+@pytest.mark.parametrize('timeframe, ts, expected', [
+    # 小于6小时的周期两种对齐方式相同
+    ('1H', MONDAY_UTC + 90 * MINUTE, MONDAY_UTC + HOUR),
+    ('4H', MONDAY_UTC + 90 * MINUTE, MONDAY_UTC),
+    # 6小时及以上按香港时间对齐：HKT 06:00 = UTC 22:00
+    ('6H', MONDAY_UTC + 30 * MINUTE, MONDAY_UTC - 2 * HOUR),
+    ('6Hutc', MONDAY_UTC + 30 * MINUTE, MONDAY_UTC),
+    ('1D', MONDAY_UTC + 30 * MINUTE, MONDAY_UTC - 8 * HOUR),
+    ('1Dutc', MONDAY_UTC + 30 * MINUTE, MONDAY_UTC),
+    # 周线从周一开始：香港时间周一 00:00 = UTC 周日 16:00
+    ('1W', MONDAY_UTC + 50 * HOUR, MONDAY_UTC - 8 * HOUR),
+    ('1Wutc', MONDAY_UTC + 50 * HOUR, MONDAY_UTC),
+    ('1Wutc', MONDAY_UTC - MINUTE, MONDAY_UTC - 7 * 24 * HOUR),
+])
+def test_bar_start_alignment(timeframe, ts, expected):
+    assert CandleSeries(timeframe).bar_start(ts) == expected
+
+
+def test_unsupported_timeframe():
+    with pytest.raises(ValueError):
+        timeframe_spec('1M')
+
+
+def test_same_minute_pushes_replace_instead_of_accumulate():
+    series = CandleSeries('1H')
+    series.update(minute(MONDAY_UTC, 10, 11, 9, 10.5, 5))
+    series.update(minute(MONDAY_UTC, 10, 12, 9, 11, 8))
+    assert series.current() == [MONDAY_UTC, 10, 12, 9, 11, 8, 8, 88]
+    series.update(minute(MONDAY_UTC + MINUTE, 11, 11.5, 8, 9, 2))
+    assert series.current() == [MONDAY_UTC, 10, 12, 8, 9, 10, 10, 106]
+    # 迟到的上一分钟推送被忽略
+    series.update(minute(MONDAY_UTC, 10, 20, 1, 15, 100))
+    assert series.current()[5] == 10
+    # 进入下一小时，当前K线归档
+    series.update(minute(MONDAY_UTC + HOUR, 9, 9, 9, 9, 1))
+    assert list(series.bars) == [[MONDAY_UTC, 10, 12, 8, 9, 10, 10, 106]]
+    assert series.current() == [MONDAY_UTC + HOUR, 9, 9, 9, 9, 1, 1, 9]
+    assert len(series) == 2
+
+
+def test_seed_then_update_does_not_double_count_seed_minute():
+    series = CandleSeries('1H')
+    seed_minute = MONDAY_UTC + 5 * MINUTE
+    rows = [
+        [str(MONDAY_UTC), '10', '12', '9', '11', '100', '100', '1000', '0'],
+        [str(MONDAY_UTC - HOUR), '8', '10', '7', '10', '50', '50', '450', '1'],
+    ]
+    series.seed(rows, now_ms=seed_minute + 30_000)
+    assert list(series.bars) == [[MONDAY_UTC - HOUR, 8, 10, 7, 10, 50, 50, 450]]
+    # 预热数据已包含当前分钟：只更新价格，成交量不变
+    series.update(minute(seed_minute, 11, 13, 9, 12.5, 7))
+    assert series.current() == [MONDAY_UTC, 10, 13, 9, 12.5, 100, 100, 1000]
+    series.update(minute(seed_minute, 11, 13, 8.5, 12, 9))
+    assert series.current()[3:6] == [8.5, 12, 100]
+    # 下一分钟起正常累加
+    series.update(minute(seed_minute + MINUTE, 12, 12, 11, 11.5, 3))
+    series.update(minute(seed_minute + MINUTE, 12, 12, 11, 11, 4))
+    assert series.current()[4:6] == [11, 104]
+    series.update(minute(seed_minute + 2 * MINUTE, 11, 11, 11, 11, 1))
+    assert series.current()[5] == 105
+    rows = series.rows(2)
+    assert rows[0][0] == str(MONDAY_UTC) and rows[0][5] == '105.0' and rows[0][8] == '0'
+    assert rows[1][8] == '1'
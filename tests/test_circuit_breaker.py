@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, Backoff, CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **params):
+    params = {'window': 60, 'min_calls': 4, 'error_rate': 0.5, 'slow_call': 5.0, 'slow_rate': 0.75,
+              'half_open_probes': 2, 'base_delay': 5.0, 'max_delay': 120.0, **params}
+    return CircuitBreaker('test', clock=clock, **params)
+
+
+def call(breaker, failed=False, duration=0.1):
+    breaker.before_call()
+    breaker.record(failed, duration)
+
+
+def trip(breaker):
+    for _ in range(breaker.min_calls):
+        call(breaker, failed=True)
+    assert breaker.state == OPEN
+
+
+def test_opens_on_error_rate_only_after_min_calls():
+    breaker = make_breaker(FakeClock())
+    for _ in range(3):
+        call(breaker, failed=True)
+    # 调用次数不足 min_calls，即使全部失败也不熔断
+    assert breaker.state == CLOSED
+    call(breaker, failed=False)
+    assert breaker.state == OPEN
+    assert breaker.reason == '错误率 3/4'
+    with pytest.raises(CircuitOpenError) as exc:
+        breaker.before_call()
+    assert 0 < exc.value.retry_after <= 120.0
+    assert breaker.rejected == 1
+
+
+def test_opens_on_slow_rate():
+    breaker = make_breaker(FakeClock())
+    for duration in (6.0, 6.0, 0.1):
+        call(breaker, duration=duration)
+    assert breaker.state == CLOSED
+    call(breaker, duration=5.0)
+    assert breaker.state == OPEN
+    assert breaker.reason == '慢调用 3/4'
+
+
+def test_outcomes_outside_window_do_not_count():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        call(breaker, failed=True)
+    clock.now += 61
+    call(breaker, failed=True)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['calls'] == 1
+
+
+def test_half_open_limits_probes_and_closes_after_successes():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.now = breaker.open_until
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    # 名额用完后，第三个请求被拒绝
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(False, 0.1)
+    assert breaker.state == HALF_OPEN
+    breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.backoff.current == breaker.backoff.base
+    assert breaker.snapshot()['calls'] == 0
+
+
+def test_half_open_failed_or_slow_probe_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock, half_open_probes=1)
+    trip(breaker)
+    clock.now = breaker.open_until
+    breaker.before_call()
+    breaker.record(False, 6.0)
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+    clock.now = breaker.open_until
+    breaker.before_call()
+    # 取消的探测只释放名额，不影响状态
+    breaker.record(None, 0.0)
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+
+
+def test_backoff_decorrelated_jitter_bounds():
+    random.seed(7)
+    backoff = Backoff(base=1.0, cap=30.0)
+    previous = backoff.current
+    for _ in range(500):
+        delay = backoff.next()
+        assert backoff.base <= delay <= min(backoff.cap, previous * 3)
+        previous = delay
+    backoff.reset()
+    assert backoff.current == backoff.base
+
+
+def test_backoff_waits_out_open_circuit():
+    backoff = Backoff(base=1.0, cap=2.0)
+    assert backoff.delay_for(CircuitOpenError('api', 50.0)) == 50.0
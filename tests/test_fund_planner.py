@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from fund_planner import FundPlanner
+
+
+class StubExchange:
+    def __init__(self, spot, funding=0.0, savings=0.0):
+        self.spot = spot
+        self.funding = funding
+        self.savings = savings
+        self.moves = []
+
+    async def fetch_balance(self):
+        return {'free': {'USDT': self.spot}}
+
+    async def fetch_funding_balance(self):
+        return {'USDT': self.funding}
+
+    async def fetch_savings_balance(self):
+        return {'USDT': self.savings}
+
+    async def funds_transfer(self, ccy, amt, from_, to):
+        self.moves.append(('transfer', ccy, amt, from_, to))
+        return {'code': '0'}
+
+    async def savings_order(self, ccy, amt, side):
+        self.moves.append((side, ccy, amt))
+        return {'code': '0'}
+
+    async def wait_for_balance(self, account, asset, minimum, timeout, interval):
+        return True
+
+
+@pytest.mark.parametrize('balances, kwargs, legs', [
+    # 现货不足且资金账户不够：先赎回缺口，再合并为一次 资金账户→现货
+    ((10, 5, 100), {'floor': 50}, [('redeem', 35), ('to_spot', 40)]),
+    # 现货超出上限：超出部分转入资金账户，与原有余额合并为一次申购
+    ((100, 20, 0), {'floor': 10, 'ceiling': 50, 'sweep': True}, [('to_funding', 50), ('purchase', 70)]),
+    # 资金账户余额在目标以内：全部转入现货，不申购
+    ((10, 20, 0), {'floor': 10, 'ceiling': 50, 'sweep': True}, [('to_spot', 20)]),
+    # 资金账户余额超出目标：补到上限，剩余直接申购，不经过现货
+    ((10, 100, 0), {'floor': 10, 'ceiling': 50, 'sweep': True}, [('to_spot', 40), ('purchase', 60)]),
+    # 缺口小于最小赎回金额时按最小金额赎回，多出的留在资金账户
+    ((10, 0, 100), {'floor': 10.5}, [('redeem', 1.0), ('to_spot', 0.5)]),
+    # 理财余额低于最小赎回金额：无法赎回，也没有可转入的资金
+    ((10, 0, 0.5), {'floor': 10.5}, []),
+    # 现货在目标范围内：无需划转
+    ((30, 0, 100), {'floor': 10, 'ceiling': 50}, []),
+])
+def test_plan_nets_transfers(balances, kwargs, legs):
+    planner = FundPlanner(None, ['USDT'])
+    result = planner.plan('USDT', *balances, **kwargs)
+    assert [leg for leg, _ in result] == [leg for leg, _ in legs]
+    assert [amount for _, amount in result] == pytest.approx([amount for _, amount in legs])
+
+
+def test_ensure_moves_funding_balance_into_spot():
+    exchange = StubExchange(spot=10.0, funding=50.0)
+    planner = FundPlanner(exchange, ['USDT'])
+    assert asyncio.run(planner.ensure('USDT', 20.0)) is True
+    # 多补 buffer（5%）：20 × 1.05 − 10
+    assert exchange.moves == [('transfer', 'USDT', '11.00', '6', '18')]
+
+
+def test_ensure_without_redeem_ignores_savings():
+    exchange = StubExchange(spot=10.0, funding=5.0, savings=100.0)
+    planner = FundPlanner(exchange, ['USDT'])
+    assert asyncio.run(planner.ensure('USDT', 50.0, redeem=False)) is False
+    assert exchange.moves == []
+
+
+def test_ensure_fails_when_legs_cannot_cover_required():
+    exchange = StubExchange(spot=10.0, funding=5.0, savings=10.0)
+    planner = FundPlanner(exchange, ['USDT'])
+    assert asyncio.run(planner.ensure('USDT', 50.0)) is False
+    assert exchange.moves == []
+
+
+def test_order_path_does_not_wait_for_a_transfer_in_progress():
+    planner = FundPlanner(StubExchange(spot=100.0), ['USDT'])
+
+    async def scenario():
+        async with planner._locks['USDT']:
+            # 后台补足或再平衡持有锁时，下单路径不排队等待，立即返回 None
+            busy = await asyncio.wait_for(planner.ensure('USDT', 50.0, redeem=False, wait=False), timeout=0.5)
+        return busy, await planner.ensure('USDT', 50.0, redeem=False, wait=False)
+
+    busy, ready = asyncio.run(scenario())
+    assert busy is None
+    assert ready is True
+    assert planner.stats['busy'] == 1
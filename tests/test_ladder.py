@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+from ladder import GridLadder
+from order_registry import OrderRegistry, OrderState, normalize_okx_order
+
+
+class StubExchange:
+    def __init__(self, open_orders):
+        self.open_orders = open_orders
+        self.cancelled = []
+
+    async def fetch_open_orders(self, symbol):
+        return [normalize_okx_order(dict(order)) for order in self.open_orders]
+
+    async def cancel_order(self, order_id, symbol, params=None, client_order_id=None):
+        self.cancelled.append(client_order_id)
+        return {'clOrdId': client_order_id}
+
+
+def okx_order(ord_id, cl_ord_id, side, px):
+    return {'ordId': ord_id, 'clOrdId': cl_ord_id, 'side': side, 'px': str(px), 'sz': '1', 'accFillSz': '0',
+            'avgPx': '', 'state': 'live'}
+
+
+def make_ladder(open_orders):
+    trader = SimpleNamespace(
+        config=SimpleNamespace(SYMBOL='OKB/USDT'),
+        exchange=StubExchange(open_orders),
+        order_tracker=SimpleNamespace(orders=OrderRegistry()),
+        failover=None
+    )
+    return GridLadder(trader)
+
+
+def test_takeover_restores_replicated_rungs_and_adopts_or_cancels_the_rest():
+    primary = make_ladder([])
+    primary.restore({'buy': {'cl_ord_id': 'ladb1a1', 'price': 98.0, 'amount': 1.0}})
+    state = primary.export_rungs()
+    assert state == {'buy': {'cl_ord_id': 'ladb1a1', 'price': 98.0, 'amount': 1.0}}
+
+    standby = make_ladder([
+        okx_order('1', 'ladb1a1', 'buy', 98),
+        okx_order('2', 'ladb2a2', 'buy', 97),    # 同一侧多出来的挂单
+        okx_order('3', 'lads3a3', 'sell', 102),  # 复制状态之后才挂出的卖单
+        okx_order('4', 'gridb4a0', 'buy', 96),   # 其他策略的订单不处理
+    ])
+    standby.restore(state)
+    asyncio.run(standby.adopt_open_orders())
+
+    buy, sell = standby.rungs['buy'], standby.rungs['sell']
+    assert (buy.ord_id, buy.state) == ('1', OrderState.LIVE)
+    assert (sell.ord_id, sell.cl_ord_id, sell.price) == ('3', 'lads3a3', 102.0)
+    assert standby.trader.exchange.cancelled == ['ladb2a2']
+
+
+def test_exit_after_losing_the_lease_leaves_rungs_to_the_new_primary():
+    ladder = make_ladder([])
+    ladder.restore({'buy': {'cl_ord_id': 'ladb1a1', 'price': 98.0, 'amount': 1.0}})
+    ladder.trader.failover = SimpleNamespace(role='standby')  # failover.run 因 LeaseLostError 退出时的状态
+    asyncio.run(ladder.shutdown())
+    assert ladder.trader.exchange.cancelled == []
+    assert ladder.rungs['buy'] is not None
+
+    ladder.trader.failover = SimpleNamespace(role='active')
+    asyncio.run(ladder.shutdown())
+    assert ladder.trader.exchange.cancelled == ['ladb1a1']
+
+
+def test_exit_without_failover_cancels_rungs():
+    ladder = make_ladder([])
+    ladder.restore({'sell': {'cl_ord_id': 'lads1a1', 'price': 102.0, 'amount': 1.0}})
+    asyncio.run(ladder.shutdown())
+    assert ladder.trader.exchange.cancelled == ['lads1a1']
@@ -0,0 +1,116 @@
+"""NotificationDispatcher：用本地 aiohttp 服务代替企业微信 Webhook，验证重试退避与汇总"""
+import asyncio
+import time
+
+from aiohttp import web
+
+from metrics import NOTIFICATIONS
+from notifier import NotificationDispatcher
+
+
+def counter(result):
+    return NOTIFICATIONS._values[NOTIFICATIONS._slots[(result,)]]
+
+
+class StubWebhook:
+    """按预设的状态码序列应答，记录每次请求的时间和消息"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+
+    async def handle(self, request):
+        self.requests.append((time.monotonic(), await request.json()))
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        if status == 200:
+            return web.json_response({'errcode': 0, 'errmsg': 'ok'})
+        return web.json_response({'errcode': -1, 'errmsg': 'busy'}, status=status)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post('/hook', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}/hook'
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, '等待超时'
+        await asyncio.sleep(0.01)
+
+
+async def run_dispatcher(hook, **params):
+    dispatcher = NotificationDispatcher(hook.url, **params)
+    task = asyncio.create_task(dispatcher.run())
+    await wait_for(lambda: dispatcher.running)
+    return dispatcher, task
+
+
+async def stop(dispatcher, task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await dispatcher.close()
+
+
+def test_retries_with_exponential_backoff_until_success():
+    async def scenario():
+        async with StubWebhook([500, 500, 200]) as hook:
+            dispatcher, task = await run_dispatcher(hook, max_retries=3, backoff_base=0.05)
+            sent = counter('sent')
+            dispatcher.notify('内容', '系统通知')
+            await wait_for(lambda: counter('sent') == sent + 1)
+            await stop(dispatcher, task)
+        times = [t for t, _ in hook.requests]
+        assert len(times) == 3
+        # 第 n 次重试等待 backoff_base * 2^(n-1) ~ 1.5 倍
+        assert 0.05 <= times[1] - times[0] < 0.5
+        assert 0.1 <= times[2] - times[1] < 0.5
+        assert hook.requests[0][1]['markdown']['content'].startswith('### 系统通知')
+
+    asyncio.run(scenario())
+
+
+def test_gives_up_after_max_retries():
+    async def scenario():
+        async with StubWebhook([503]) as hook:
+            dispatcher, task = await run_dispatcher(hook, max_retries=2, backoff_base=0.01)
+            failed = counter('failed')
+            dispatcher.notify('内容', '系统通知')
+            await wait_for(lambda: counter('failed') == failed + 1)
+            await stop(dispatcher, task)
+        assert len(hook.requests) == 2
+
+    asyncio.run(scenario())
+
+
+def test_digest_coalesces_messages_within_window():
+    async def scenario():
+        async with StubWebhook([200]) as hook:
+            dispatcher, task = await run_dispatcher(
+                hook, digest_window=0.3, digest_titles=('交易成功通知',), backoff_base=0.01
+            )
+            for i in range(3):
+                dispatcher.notify(f'成交 {i}', '交易成功通知')
+            # 第一条立即发送，其余两条在窗口结束时合并为一条
+            await wait_for(lambda: len(hook.requests) == 1)
+            await asyncio.sleep(0.1)
+            assert len(hook.requests) == 1
+            await wait_for(lambda: len(hook.requests) == 2)
+            await stop(dispatcher, task)
+        first = hook.requests[0][1]['markdown']['content']
+        digest = hook.requests[1][1]['markdown']['content']
+        assert '成交 0' in first
+        assert digest.startswith('### 2 条通知汇总')
+        assert '成交 1' in digest and '成交 2' in digest
+        assert hook.requests[1][0] - hook.requests[0][0] >= 0.25
+
+    asyncio.run(scenario())
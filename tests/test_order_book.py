@@ -0,0 +1,60 @@
+"""本地订单簿离线回放：录制的 books 频道消息中含一次校验和不符和一次序号跳号"""
+import os
+
+import pytest
+
+from order_book import OrderBookError, replay
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'okx_books_replay.ndjson')
+
+
+def prefix(tmp_path, lines):
+    """取录制文件的前 lines 行（含开头的订阅确认事件）"""
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        content = f.readlines()[:lines]
+    path = tmp_path / 'partial.ndjson'
+    path.write_text(''.join(content), encoding='utf-8')
+    return str(path)
+
+
+def test_checksum_mismatch_resets_book(tmp_path):
+    feed = replay(prefix(tmp_path, 4))
+    book = feed.books['OKB-USDT']
+    assert feed.resyncs == 1
+    assert '校验和' in feed.last_error
+    assert not book.synced
+    assert len(book.bids) == 0 and len(book.asks) == 0
+    assert book.seq_id is None
+
+
+def test_updates_are_dropped_until_next_snapshot(tmp_path):
+    # 第5行是校验和出错后的增量，收到新快照前不应用
+    feed = replay(prefix(tmp_path, 5))
+    book = feed.books['OKB-USDT']
+    assert feed.resyncs == 1
+    assert not book.synced and len(book.bids) == 0
+
+
+def test_sequence_gap_resets_book(tmp_path):
+    feed = replay(prefix(tmp_path, 8))
+    book = feed.books['OKB-USDT']
+    assert feed.resyncs == 2
+    assert '序号不连续' in feed.last_error
+    assert not book.synced
+    assert len(book.bids) == 0 and len(book.asks) == 0
+
+
+def test_full_replay_recovers_from_later_snapshot():
+    feed = replay(FIXTURE)
+    book = feed.books['OKB-USDT']
+    assert feed.resyncs == 2
+    assert book.synced and book.seq_id == 301
+    assert book.to_rest(5)['bids'] == [['50.10', '7'], ['50.09', '4'], ['50.05', '20']]
+    assert book.to_rest(5)['asks'] == [['50.12', '8'], ['50.20', '15']]
+    assert book.best_bid() == (50.10, 7.0)
+    assert feed.get('OKB-USDT') is book
+
+
+def test_strict_replay_raises_on_first_inconsistency():
+    with pytest.raises(OrderBookError, match='校验和'):
+        replay(FIXTURE, strict=True)
@@ -0,0 +1,58 @@
+import time
+
+from order_registry import OrderRegistry, OrderState
+
+
+def test_illegal_and_out_of_order_transitions_are_ignored():
+    registry = OrderRegistry()
+    record = registry.add('buy', 100, 1, ord_id='1')
+    # 已挂单的订单不能再被拒绝
+    assert registry.transition(record, OrderState.LIVE)
+    assert not registry.transition(record, OrderState.REJECTED)
+    assert registry.transition(record, OrderState.PARTIALLY_FILLED, filled=0.4)
+    # 乱序到达的旧状态（部分成交后又收到 live）被忽略
+    assert not registry.transition(record, OrderState.LIVE)
+    assert record.state is OrderState.PARTIALLY_FILLED and record.filled == 0.4
+    assert registry.transition(record, OrderState.FILLED, filled=1, avg_price=100.5)
+    # 终态不能再转换
+    assert not registry.transition(record, OrderState.CANCELLED)
+    assert record.state is OrderState.FILLED and record.avg_price == 100.5
+    assert registry.by_state(OrderState.FILLED) == [record]
+    assert registry.active() == []
+
+
+def test_expired_skips_extended_and_terminal_entries():
+    registry = OrderRegistry()
+    extended = registry.add('buy', 100, 1, ord_id='1', timeout=10)
+    finished = registry.add('sell', 110, 1, ord_id='2', timeout=10)
+    due = registry.add('buy', 90, 1, ord_id='3', timeout=10)
+    registry.extend_deadline(extended, 100)
+    registry.transition(finished, OrderState.CANCELLED)
+    now = time.time() + 20
+    # 延期前的旧条目和已终结订单的条目在弹出时惰性丢弃
+    assert registry.expired(now) == [due]
+    assert registry.expired(now) == []
+    assert registry.expired(time.time() + 200) == [extended]
+
+
+def test_terminal_orders_are_evicted_with_their_indexes():
+    registry = OrderRegistry(max_terminal=2)
+    records = [registry.add('buy', 100, 1, ord_id=str(i), cl_ord_id=f'c{i}') for i in range(3)]
+    for record in records:
+        registry.transition(record, OrderState.FILLED)
+    oldest = records[0]
+    assert registry.get('0') is None and registry.get_by_cl_ord_id('c0') is None
+    assert oldest not in registry.by_state(OrderState.FILLED)
+    assert [registry.get(str(i)) for i in (1, 2)] == records[1:]
+    assert len(registry) == 2
+
+
+def test_update_from_exchange_binds_ord_id_via_cl_ord_id():
+    registry = OrderRegistry()
+    record = registry.add('sell', 110, 1, cl_ord_id='grids1a0')
+    order = {'ordId': '987', 'clOrdId': 'grids1a0', 'state': 'partially_filled', 'accFillSz': '0.25', 'avgPx': '110.2'}
+    assert registry.update_from_exchange(order) is record
+    assert record.ord_id == '987' and registry.get('987') is record
+    assert record.state is OrderState.PARTIALLY_FILLED
+    assert (record.filled, record.avg_price) == (0.25, 110.2)
+    assert registry.update_from_exchange({'ordId': 'unknown', 'clOrdId': 'other', 'state': 'live'}) is None
@@ -0,0 +1,44 @@
+import json
+import os
+import time
+
+from order_tracker import OrderTracker
+
+
+def make_trade(i, side):
+    return {'timestamp': time.time() + i, 'side': side, 'price': 100.0 + i, 'amount': 1.0, 'order_id': f'o{i}'}
+
+
+def test_add_trade_persists_on_writer_thread(tmp_path):
+    tracker = OrderTracker(data_dir=str(tmp_path))
+    try:
+        tracker.add_trade(make_trade(0, 'buy'))
+        tracker.add_trade(make_trade(1, 'sell'))
+        # 内存中的账本和交易历史立即更新
+        assert tracker.trade_history[-1]['profit'] > 0
+        assert tracker.pnl_ledger.position == 0
+        assert tracker.flush()
+        with open(os.path.join(tmp_path, 'trade_history.json'), encoding='utf-8') as f:
+            assert [t['order_id'] for t in json.load(f)] == ['o0', 'o1']
+        with open(os.path.join(tmp_path, 'pnl_ledger.json'), encoding='utf-8') as f:
+            assert [order_id for order_id, _ in json.load(f)['order_pnl']] == ['o0', 'o1']
+        assert [t['order_id'] for t in tracker.trade_store.page(limit=10)['trades']] == ['o1', 'o0']
+    finally:
+        tracker.close()
+
+
+def test_overflow_is_archived_before_history_is_trimmed(tmp_path):
+    tracker = OrderTracker(data_dir=str(tmp_path))
+    try:
+        for i in range(502):
+            tracker.add_trade(make_trade(i, 'buy'))
+        assert len(tracker.trade_history) == 500
+    finally:
+        tracker.close()
+    archived = []
+    for name in os.listdir(os.path.join(tmp_path, 'archives')):
+        with open(os.path.join(tmp_path, 'archives', name), encoding='utf-8') as f:
+            archived.extend(json.loads(line)['order_id'] for line in f)
+    assert sorted(archived) == ['o0', 'o1']
+    with open(os.path.join(tmp_path, 'trade_history.json'), encoding='utf-8') as f:
+        assert len(json.load(f)) == 500
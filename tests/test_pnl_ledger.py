@@ -0,0 +1,85 @@
+import pytest
+
+from pnl_ledger import PnLLedger
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'pnl_ledger.json')
+
+
+def test_fifo_matches_oldest_lots_first_and_splits_partial_lots(path):
+    ledger = PnLLedger(path)
+    ledger.record_fill('buy', 100, 1)
+    ledger.record_fill('buy', 110, 2)
+    assert ledger.record_fill('sell', 120, 1.5) == pytest.approx(180 - (100 + 0.5 * 110))
+    assert [list(lot) for lot in ledger.lots] == [[pytest.approx(1.5), 110]]
+    assert ledger.position == pytest.approx(1.5)
+    assert ledger.cost_basis == pytest.approx(165)
+    assert ledger.record_fill('sell', 100, 1.5) == pytest.approx(-15)
+    assert not ledger.lots and ledger.position == 0 and ledger.cost_basis == 0
+    assert (ledger.wins, ledger.losses, ledger.realized_pnl) == (1, 1, pytest.approx(10))
+
+
+def test_average_method_merges_lots_into_one_cost(path):
+    ledger = PnLLedger(path, method='average')
+    ledger.record_fill('buy', 100, 1)
+    ledger.record_fill('buy', 110, 1)
+    assert len(ledger.lots) == 1
+    assert ledger.avg_cost == pytest.approx(105)
+    assert ledger.record_fill('sell', 120, 1) == pytest.approx(15)
+    assert ledger.avg_cost == pytest.approx(105)
+
+
+def test_base_coin_buy_fee_shrinks_the_lot(path):
+    ledger = PnLLedger(path)
+    ledger.record_fill('buy', 100, 1, fee=-0.001, fee_ccy='OKB')
+    assert ledger.position == pytest.approx(0.999)
+    assert ledger.cost_basis == pytest.approx(100)
+    assert ledger.fees == pytest.approx(0.1)
+    pnl = ledger.record_fill('sell', 110, 0.999, fee=-0.1, fee_ccy='USDT')
+    assert pnl == pytest.approx(0.999 * 110 - 0.1 - 100)
+
+
+def test_rebate_reduces_cost(path):
+    ledger = PnLLedger(path)
+    ledger.record_fill('buy', 100, 1, fee=0.05, fee_ccy='USDT')
+    assert ledger.cost_basis == pytest.approx(99.95)
+    assert ledger.fees == pytest.approx(-0.05)
+    assert ledger.record_fill('sell', 100, 1, fee=0.05, fee_ccy='USDT') == pytest.approx(0.1)
+
+
+def test_sell_beyond_position_is_recorded_as_unmatched(path):
+    ledger = PnLLedger(path)
+    ledger.record_fill('buy', 100, 1)
+    # 有成本记录的 1 个按成本匹配，其余 0.5 个按零盈亏处理
+    assert ledger.record_fill('sell', 120, 1.5) == pytest.approx(20)
+    assert ledger.unmatched == pytest.approx(0.5)
+    assert ledger.position == 0 and ledger.cost_basis == 0
+
+
+def test_duplicate_order_id_is_not_counted_twice(path):
+    ledger = PnLLedger(path)
+    ledger.record_fill('buy', 100, 2, order_id='b1')
+    first = ledger.record_fill('sell', 110, 1, order_id='s1')
+    assert ledger.record_fill('sell', 110, 1, order_id='s1') == first
+    assert ledger.record_fill('buy', 100, 2, order_id='b1') == 0
+    assert ledger.position == pytest.approx(1)
+    assert ledger.realized_pnl == pytest.approx(first)
+
+
+def test_state_round_trips_through_load(path):
+    ledger = PnLLedger(path)
+    ledger.record_fill('buy', 100, 1, fee=-0.1, order_id='b1')
+    ledger.record_fill('buy', 110, 1, order_id='b2')
+    ledger.record_fill('sell', 120, 0.5, order_id='s1', save=False)
+    state = ledger.state()
+    ledger.lots[0][0] = 99  # state() 是独立副本，之后的修改不影响已取出的状态
+    assert state['lots'][0][0] == pytest.approx(0.5)
+    ledger.lots[0][0] = state['lots'][0][0]
+    ledger.write(state)
+
+    restored = PnLLedger(path)
+    assert [list(lot) for lot in restored.lots] == [list(lot) for lot in ledger.lots]
+    assert list(restored.order_pnl.items()) == list(ledger.order_pnl.items())
+    assert restored.snapshot(120) == ledger.snapshot(120)
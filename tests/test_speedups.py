@@ -0,0 +1,24 @@
+import json
+import math
+
+import pytest
+
+import speedups
+
+
+@pytest.fixture
+def orjson_backend(monkeypatch):
+    if speedups.orjson is None:
+        pytest.skip('未安装 orjson')
+    monkeypatch.setattr(speedups, 'JSON_BACKEND', 'orjson')
+
+
+def test_loads_falls_back_for_stdlib_nan(orjson_backend):
+    data = speedups.loads(json.dumps({'pnl': float('nan'), 'cap': float('inf'), 'qty': 1.5}))
+    assert math.isnan(data['pnl']) and data['cap'] == math.inf and data['qty'] == 1.5
+    assert speedups.loads(b'{"a": [1, 2]}') == {'a': [1, 2]}
+
+
+def test_loads_still_rejects_invalid_json(orjson_backend):
+    with pytest.raises(ValueError):
+        speedups.loads('{"a": ')
@@ -0,0 +1,27 @@
+from trade_store import TradeStore, decode_cursor
+
+
+def test_keyset_pages_split_rows_sharing_timestamp_and_order_id(tmp_path):
+    store = TradeStore(str(tmp_path / 'trades.db'))
+    store.add_many([
+        {'timestamp': 1.0, 'order_id': 'a', 'side': 'buy', 'price': 1, 'amount': 1},
+        {'timestamp': 2.0, 'order_id': 'b', 'side': 'buy', 'price': 1, 'amount': 1},
+        {'timestamp': 2.0, 'order_id': 'b', 'side': 'sell', 'price': 1, 'amount': 1},
+    ])
+    seen, cursor = [], None
+    while True:
+        page = store.page(limit=1, before=cursor)
+        seen.extend((t['order_id'], t['side']) for t in page['trades'])
+        cursor = page['next']
+        if cursor is None:
+            break
+    assert seen == [('b', 'sell'), ('b', 'buy'), ('a', 'buy')]
+
+    page = store.page(limit=1, after=store.page(limit=1, before='2.0:b:sell')['next'])
+    assert [(t['order_id'], t['side']) for t in page['trades']] == [('b', 'sell')]
+
+
+def test_decode_cursor_accepts_partial_cursors():
+    assert decode_cursor('2.5') == (2.5, '', '')
+    assert decode_cursor('2.5:b') == (2.5, 'b', '')
+    assert decode_cursor('2.5:b:SELL') == (2.5, 'b', 'sell')
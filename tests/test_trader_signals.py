@@ -0,0 +1,87 @@
+"""资金到账前推迟的信号：价格反弹回轨道内侧后仍在后续轮次触发"""
+import asyncio
+import functools
+import time
+
+import pytest
+
+import trader as trader_module
+from circuit_breaker import CircuitBreakers
+from config import TradingConfig
+from order_tracker import OrderTracker
+
+
+class StubClock:
+    def now_ms(self):
+        return int(time.time() * 1000)
+
+
+class StubExchange:
+    def __init__(self):
+        self.clock = StubClock()
+        self.circuits = CircuitBreakers(enabled=False)
+        self.candle_feed = None
+
+
+@pytest.fixture
+def trader(tmp_path, monkeypatch):
+    monkeypatch.setattr(trader_module, 'OrderTracker', functools.partial(OrderTracker, data_dir=str(tmp_path)))
+    grid = trader_module.GridTrader(StubExchange(), TradingConfig())
+    grid.base_price = 100.0
+    grid.grid_size = 2.0  # 下轨 98，上轨 102，回撤阈值 0.4%
+    yield grid
+    grid.order_tracker.close()
+
+
+def run_ticks(grid, check, prices, balance_results):
+    """按价格序列逐轮检测信号，余额检查依次返回 balance_results，返回每轮的信号结果"""
+    results = iter(balance_results)
+
+    async def balance(*args, **kwargs):
+        return next(results)
+
+    setattr(grid, 'check_buy_balance' if check == '_check_buy_signal' else 'check_sell_balance', balance)
+
+    async def scenario():
+        signals = []
+        for price in prices:
+            grid.current_price = price
+            signals.append(await getattr(grid, check)())
+        return signals
+
+    return asyncio.run(scenario())
+
+
+def test_deferred_buy_executes_after_price_rebounds_above_band(trader):
+    # 97 创新低 → 97.5 反弹触发但资金到账中 → 98.5 已回到下轨之上，资金到账后仍触发买入
+    signals = run_ticks(trader, '_check_buy_signal', [97.0, 97.5, 98.5], [None, True])
+    assert signals == [False, False, True]
+    assert trader.deferred_signal is None
+    assert trader.buying_or_selling is False
+
+
+def test_deferred_sell_executes_after_price_falls_below_band(trader):
+    signals = run_ticks(trader, '_check_sell_signal', [103.0, 102.5, 101.5], [None, True])
+    assert signals == [False, False, True]
+    assert trader.deferred_signal is None
+
+
+def test_insufficient_balance_drops_the_signal(trader):
+    signals = run_ticks(trader, '_check_buy_signal', [97.0, 97.5, 98.5], [False])
+    assert signals == [False, False, False]
+    assert trader.deferred_signal is None
+
+
+def test_deferred_signal_is_dropped_at_the_opposite_band_or_on_expiry(trader):
+    run_ticks(trader, '_check_buy_signal', [97.0, 97.5], [None])
+    assert trader.deferred_signal[0] == 'buy'
+    trader.current_price = 102.5
+    assert asyncio.run(trader._check_buy_signal()) is False
+    assert trader.deferred_signal is None
+
+    trader.lowest = None
+    run_ticks(trader, '_check_buy_signal', [97.0, 97.5], [None])
+    trader.deferred_signal = ('buy', time.time() - 1)
+    trader.current_price = 98.5
+    assert asyncio.run(trader._check_buy_signal()) is False
+    assert trader.deferred_signal is None
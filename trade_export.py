@@ -0,0 +1,174 @@
+import csv
+import io
+import os
+import re
+import zlib
+from datetime import datetime
+
+import speedups
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# 导出的字段，缺失的字段输出为空
+FIELDS = ('timestamp', 'side', 'price', 'amount', 'fee', 'fee_ccy', 'profit', 'order_id', 'strategy')
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'columnar': ('application/gzip', 'cols.jsonl.gz'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+_ARCHIVE_NAME = re.compile(r'^trades_(\d{6})\.(json|ndjson)$')
+
+
+def parse_time(value):
+    """解析时间参数：Unix 秒数或 YYYY-MM-DD[ HH:MM:SS]，为空时返回 None"""
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析时间: {value}")
+
+
+def archive_files(archive_dir, start=None, end=None):
+    """按月份升序列出归档文件，跳过整月都在时间范围外的文件"""
+    if not os.path.isdir(archive_dir):
+        return []
+    start_month = datetime.fromtimestamp(start).strftime('%Y%m') if start is not None else None
+    end_month = datetime.fromtimestamp(end).strftime('%Y%m') if end is not None else None
+    files = []
+    for name in os.listdir(archive_dir):
+        match = _ARCHIVE_NAME.match(name)
+        if not match:
+            continue
+        month = match.group(1)
+        if (start_month and month < start_month) or (end_month and month > end_month):
+            continue
+        # 同一月份旧格式 .json 排在 .ndjson 之前
+        files.append((month, match.group(2) == 'ndjson', os.path.join(archive_dir, name)))
+    return [path for _, _, path in sorted(files)]
+
+
+def _read_archive(path):
+    if path.endswith('.ndjson'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield speedups.loads(line)
+    else:
+        # 旧格式为整月一个 JSON 数组，只能整体读入（内存占用以单月为上限）
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from speedups.load(f)
+
+
+def iter_trades(tracker, start=None, end=None, side=None):
+    """按时间顺序逐条产出交易记录：先各月归档，再当前交易历史
+
+    Args:
+        start/end: 时间范围（Unix 秒，含端点），None 表示不限
+        side: 'buy' / 'sell'，None 表示全部
+    """
+    sources = [_read_archive(path) for path in archive_files(tracker.archive_dir, start, end)]
+    sources.append(list(tracker.trade_history))
+    for source in sources:
+        for trade in source:
+            ts = trade.get('timestamp', 0)
+            if (start is not None and ts < start) or (end is not None and ts > end):
+                continue
+            if side and str(trade.get('side', '')).lower() != side:
+                continue
+            yield trade
+
+
+def _batched(trades, size):
+    batch = []
+    for trade in trades:
+        batch.append(trade)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(trades, batch_size=1000):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for batch in _batched(trades, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(trades, batch_size=1000):
+    for batch in _batched(trades, batch_size):
+        yield ''.join(
+            speedups.dumps({field: trade.get(field) for field in FIELDS}) + '\n'
+            for trade in batch
+        ).encode('utf-8')
+
+
+def columnar_chunks(trades, row_group=5000):
+    """gzip 压缩的列式格式：每行是一个行组 {"字段": [值, ...]}，可逐组解压读取"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 输出 gzip 格式
+    for batch in _batched(trades, row_group):
+        group = {field: [trade.get(field) for trade in batch] for field in FIELDS}
+        data = compressor.compress(speedups.dumps_bytes(group) + b'\n')
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_parquet(trades, path, row_group=5000):
+    """按行组写入 Parquet（需要安装 pyarrow）"""
+    if pq is None:
+        raise RuntimeError("导出 Parquet 需要安装 pyarrow")
+    schema = pa.schema([
+        ('timestamp', pa.float64()), ('side', pa.string()), ('price', pa.float64()),
+        ('amount', pa.float64()), ('fee', pa.float64()), ('fee_ccy', pa.string()),
+        ('profit', pa.float64()), ('order_id', pa.string()), ('strategy', pa.string())
+    ])
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for batch in _batched(trades, row_group):
+            columns = {field: [trade.get(field) for trade in batch] for field in FIELDS}
+            writer.write_table(pa.table(columns, schema=schema))
+
+
+def export_chunks(trades, fmt):
+    """按格式返回字节块生成器（parquet 需写文件，使用 write_parquet）"""
+    if fmt == 'csv':
+        return csv_chunks(trades)
+    if fmt == 'ndjson':
+        return ndjson_chunks(trades)
+    if fmt == 'columnar':
+        return columnar_chunks(trades)
+    raise ValueError(f"不支持的导出格式: {fmt}")
+
+
+def export_to_file(trades, path, fmt):
+    """流式写入导出文件，返回写入的字节数"""
+    if fmt == 'parquet':
+        write_parquet(trades, path)
+        return os.path.getsize(path)
+    size = 0
+    with open(path, 'wb') as f:
+        for chunk in export_chunks(trades, fmt):
+            f.write(chunk)
+            size += len(chunk)
+    return size
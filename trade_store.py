@@ -0,0 +1,180 @@
+import logging
+import sqlite3
+import threading
+import traceback
+
+# 日统计按北京时间（UTC+8）划分自然日
+DAY_OFFSET = '+8 hours'
+
+
+def encode_cursor(trade):
+    return f"{trade['timestamp']!r}:{trade['order_id']}:{trade['side']}"
+
+
+def decode_cursor(cursor):
+    """游标格式为 "时间戳:订单ID:方向"（与主键一致），省略的部分视为空串"""
+    ts, _, rest = str(cursor).partition(':')
+    order_id, _, side = rest.partition(':')
+    return float(ts), order_id, side.lower()
+
+
+class TradeStore:
+    """交易记录的 SQLite 索引，用于分页查询和按日汇总
+
+    主键为 (timestamp, order_id, side)，翻页使用键集分页（keyset）：以上一页最后一条的
+    完整主键 (timestamp, order_id, side) 作为游标，沿索引直接定位，单页代价只与页大小有关，
+    不随历史总量增长（不使用 OFFSET）。首次创建时从月度归档和当前交易历史回填一次。
+    """
+
+    COLUMNS = ('timestamp', 'order_id', 'side', 'price', 'amount', 'fee', 'profit', 'strategy')
+
+    def __init__(self, path):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS trades (
+                timestamp REAL NOT NULL,
+                order_id TEXT NOT NULL,
+                side TEXT NOT NULL,
+                price REAL,
+                amount REAL,
+                fee REAL,
+                profit REAL,
+                strategy TEXT,
+                PRIMARY KEY (timestamp, order_id, side)
+            ) WITHOUT ROWID
+        ''')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._conn.commit()
+
+    @property
+    def backfilled(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'backfilled'").fetchone()
+        return row is not None
+
+    def backfill(self, trades):
+        """导入已有交易记录（只在首次创建时调用一次），返回导入条数"""
+        count = self.add_many(trades)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', '1')")
+            self._conn.commit()
+        self.logger.info(f"交易记录索引回填完成 | 条数: {count}")
+        return count
+
+    def add_many(self, trades, batch_size=1000):
+        """批量写入，已存在的记录忽略，返回新写入条数"""
+        count = 0
+        try:
+            with self._lock:
+                batch = []
+                for trade in trades:
+                    batch.append(self._row(trade))
+                    if len(batch) >= batch_size:
+                        count += self._insert(batch)
+                        batch = []
+                if batch:
+                    count += self._insert(batch)
+                self._conn.commit()
+        except Exception as e:
+            self.logger.error(f"写入交易记录索引失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+        return count
+
+    def add(self, trade):
+        return self.add_many([trade])
+
+    def _row(self, trade):
+        return (
+            float(trade['timestamp']), str(trade.get('order_id') or ''), str(trade.get('side', '')).lower(),
+            trade.get('price'), trade.get('amount'), trade.get('fee'), trade.get('profit'), trade.get('strategy')
+        )
+
+    def _insert(self, rows):
+        cursor = self._conn.executemany(
+            'INSERT OR IGNORE INTO trades (timestamp, order_id, side, price, amount, fee, profit, strategy) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows
+        )
+        return cursor.rowcount
+
+    @staticmethod
+    def _filters(side, start, end):
+        clauses, params = [], []
+        if side:
+            clauses.append('side = ?')
+            params.append(side.lower())
+        if start is not None:
+            clauses.append('timestamp >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('timestamp <= ?')
+            params.append(end)
+        return clauses, params
+
+    def page(self, limit=50, before=None, after=None, side=None, start=None, end=None):
+        """按时间倒序返回一页交易记录
+
+        Args:
+            before: 游标，返回比它更早的记录（向后翻页）
+            after: 游标，返回比它更晚的记录（向前翻页）；与 before 同时给出时以 before 为准
+
+        Returns:
+            dict: trades（新到旧）、next（更早一页的游标，没有时为 None）、prev（更新一页的游标）
+        """
+        clauses, params = self._filters(side, start, end)
+        if before is not None:
+            clauses.append('(timestamp, order_id, side) < (?, ?, ?)')
+            params.extend(decode_cursor(before))
+            order = 'DESC'
+        elif after is not None:
+            clauses.append('(timestamp, order_id, side) > (?, ?, ?)')
+            params.extend(decode_cursor(after))
+            order = 'ASC'
+        else:
+            order = 'DESC'
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        sql = (f"SELECT {', '.join(self.COLUMNS)} FROM trades {where} "
+               f"ORDER BY timestamp {order}, order_id {order}, side {order} LIMIT ?")
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, (*params, limit + 1))]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if order == 'ASC':
+            rows.reverse()
+        older_exists = has_more if order == 'DESC' else after is not None
+        newer_exists = has_more if order == 'ASC' else before is not None
+        return {
+            'trades': rows,
+            'next': encode_cursor(rows[-1]) if rows and older_exists else None,
+            'prev': encode_cursor(rows[0]) if rows and newer_exists else None
+        }
+
+    def daily(self, side=None, start=None, end=None):
+        """按自然日（UTC+8）汇总：成交笔数、买卖笔数、成交额、手续费和已实现盈亏"""
+        clauses, params = self._filters(side, start, end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        sql = f'''
+            SELECT date(timestamp, 'unixepoch', '{DAY_OFFSET}') AS day,
+                   COUNT(*) AS trades,
+                   SUM(side = 'buy') AS buys,
+                   SUM(side = 'sell') AS sells,
+                   SUM(price * amount) AS volume,
+                   SUM(COALESCE(fee, 0)) AS fees,
+                   SUM(COALESCE(profit, 0)) AS profit
+            FROM trades {where}
+            GROUP BY day ORDER BY day DESC
+        '''
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM trades').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,6 +1,9 @@
-from config import TradingConfig, FLIP_THRESHOLD, SAFETY_MARGIN, COOLDOWN, BASE_CURRENCY, BASE_SYMBOL
+from config import TradingConfig, FLIP_THRESHOLD, SAFETY_MARGIN, COOLDOWN, BASE_CURRENCY, BASE_SYMBOL, FLAG
 from exchange_client import ExchangeClient
 from order_tracker import OrderTracker, OrderThrottler
+from order_registry import OrderState, make_client_order_id
+from exchange_client import OrderRejectedError, count_calls
+from circuit_breaker import Backoff, CircuitOpenError
 from risk_manager import AdvancedRiskManager
 import logging
 import asyncio
@@ -12,9 +15,24 @@ from helpers import send_pushplus_message, format_trade_message, LogHelper
 import json
 from monitor import TradingMonitor
 from position_controller_s1 import PositionControllerS1
+from latency_monitor import LatencyMonitor
+from order_book import OrderBookFeed
+from ladder import GridLadder
+from cadence import LoopCadence
+from scheduler import HousekeepingScheduler
+from trigger_index import TriggerIndex
+from candles import CandleFeed
+from fund_planner import FundPlanner
+from liquidity_manager import LiquidityManager
+from metrics import REGISTRY, CACHE_REQUESTS, ORDERS, RETRIES, TOTAL_ASSETS, ORDER_BOOK_EVENTS, TRIGGER_CROSSINGS, histogram_collector
 import traceback
 
 class GridTrader:
+    # 主备切换时复制给备用节点的交易器状态
+    REPLICATED_STATE = ('base_price', 'grid_size', 'highest', 'lowest', 'current_price', 'last_trade_time',
+                        'last_trade_price', 'last_grid_adjust_time', 'risk_triggered')
+    REPLICATED_S1_STATE = ('s1_daily_high', 's1_daily_low', 's1_last_data_update_ts')
+
     def __init__(self, exchange, config):
         """初始化网格交易器"""
         self.exchange = exchange
@@ -27,8 +45,7 @@ class GridTrader:
         self.highest = None
         self.lowest = None
         self.current_price = None
-        self.active_orders = {'buy': None, 'sell': None}
-        self.order_tracker = OrderTracker()
+        self.order_tracker = OrderTracker()  # 交易历史与订单注册表（order_tracker.orders）
         self.risk_manager = AdvancedRiskManager(self)
         self.total_assets = 0
         self.last_trade_time = None
@@ -37,9 +54,6 @@ class GridTrader:
         self.last_grid_adjust_time = time.time()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.symbol_info = {'base': BASE_SYMBOL}
-        self.monitored_orders = []
-        self.pending_orders = {}
-        self.order_timestamps = {}
         self.throttler = OrderThrottler(limit=10, interval=60)
         self.last_price_check = 0  # 新增价格检查时间戳
         self.ORDER_TIMEOUT = 10  # 订单超时时间（秒）
@@ -61,10 +75,48 @@ class GridTrader:
         self.funding_cache_ttl = 60  # 理财余额缓存60秒
         self.position_controller_s1 = PositionControllerS1(self)
         self.buying_or_selling = False #不在等待买入或卖出
-        self.last_funding_transfer_check = 0  # 上次资金账户转账检查时间
-        self.funding_transfer_interval = 300  # 每5分钟检查一次资金账户并转账
+        self.deferred_signal = None  # (方向, 到期时间)：已触发但资金尚未到账的信号，到账后按原追踪状态重新触发
+        self.risk_triggered = False  # 最近一次风控检查是否触发，触发时暂停S1和网格调整
+        self.order_lock = asyncio.Lock()  # 网格交易与S1调仓互斥下单
+        self.latency_monitor = LatencyMonitor(**config.LATENCY_PARAMS)  # 事件循环与交易链路延迟监控
+        self.cadence = LoopCadence(**config.CADENCE_PARAMS)  # 主循环自适应轮询间隔
+        self.trigger_index = TriggerIndex()  # 上下轨的有序索引（跨越检测、最近触发价）
+        self._trigger_key = None
+        self._bands = None
+        self.order_book_feed = OrderBookFeed([self.symbol], flag=FLAG, **config.ORDER_BOOK_PARAMS)  # WebSocket本地订单簿
+        self.order_book_feed.clock = self.exchange.clock
+        self.candle_feed = CandleFeed(self.exchange, self.symbol, flag=FLAG, **config.CANDLE_PARAMS)  # 1分钟K线聚合为各周期K线
+        self.exchange.candle_feed = self.candle_feed
+        self.fund_planner = FundPlanner(self.exchange, ['USDT', BASE_SYMBOL], targets=self._fund_targets, **config.FUND_PARAMS)  # 资金划转净额合并
+        self.liquidity = LiquidityManager(self, **config.LIQUIDITY_PARAMS)  # 预测下一笔交易所需资金，提前备在现货
+        self.ladder = GridLadder(self, **config.LADDER_PARAMS) if config.EXECUTION_MODE == 'ladder' else None  # 挂单模式
+        self.housekeeping = HousekeepingScheduler(jitter=config.HOUSEKEEPING_PARAMS['jitter'])  # 后台例行任务
+        self.failover = None  # 主备切换协调器，启用主备模式时由 main.py 设置
+        self._register_housekeeping_jobs()
+        REGISTRY.register_collector(self._collect_metrics)
+        REGISTRY.register_collector(histogram_collector(
+            'grid_loop_lag_seconds', '事件循环延迟（秒）', self.latency_monitor.loop_lag.histogram
+        ))
+
+    def export_state(self):
+        state = {key: getattr(self, key) for key in self.REPLICATED_STATE}
+        state['s1'] = {key: getattr(self.position_controller_s1, key) for key in self.REPLICATED_S1_STATE}
+        if self.ladder is not None:
+            state['ladder'] = self.ladder.export_rungs()
+        return state
 
-    async def initialize(self):
+    def restore_state(self, state):
+        for key in self.REPLICATED_STATE:
+            if key in state:
+                setattr(self, key, state[key])
+        for key, value in state.get('s1', {}).items():
+            if key in self.REPLICATED_S1_STATE:
+                setattr(self.position_controller_s1, key, value)
+        if self.ladder is not None and state.get('ladder'):
+            self.ladder.restore(state['ladder'])
+
+    async def initialize(self, resume_state=None):
+        """初始化交易器；resume_state 为主备切换时的复制状态，给出时沿用原主节点的基准价和追踪状态"""
         if self.initialized:
             return
         
@@ -73,6 +125,7 @@ class GridTrader:
         try:
             # 确保市场数据加载成功
             retry_count = 0
+            backoff = Backoff(**self.config.RETRY_BACKOFF)
             while not self.exchange.markets_loaded and retry_count < 3:
                 try:
                     await self.exchange.load_markets()
@@ -80,15 +133,22 @@ class GridTrader:
                 except Exception as e:
                     self.logger.warning(f"加载市场数据失败: {str(e)}")
                     retry_count += 1
+                    RETRIES.labels('load_markets').inc()
                     if retry_count >= 3:
                         raise
-                    await asyncio.sleep(2)
+                    await backoff.sleep(e)
             
             # 初始化交易对信息
             self.symbol_info = {'base': BASE_SYMBOL}
             
-            # 优先使用.env配置的基准价
-            if self.config.INITIAL_BASE_PRICE > 0:
+            # 接管时沿用复制的基准价，否则优先使用.env配置的基准价
+            if resume_state:
+                self.restore_state(resume_state)
+                self.logger.info(
+                    f"从复制状态恢复 | 基准价: {self.base_price} | 网格大小: {self.grid_size}% | "
+                    f"最高价: {self.highest} | 最低价: {self.lowest}"
+                )
+            elif self.config.INITIAL_BASE_PRICE > 0:
                 self.base_price = self.config.INITIAL_BASE_PRICE
                 self.logger.info(f"使用预设基准价: {self.base_price}")
             else:
@@ -103,7 +163,7 @@ class GridTrader:
             # 发送启动通知
             threshold = FLIP_THRESHOLD(self.grid_size)  # 计算实际阈值
             send_pushplus_message(
-                f"网格交易启动成功\n"
+                f"{'备用节点接管成功' if resume_state else '网格交易启动成功'}\n"
                 f"交易对: {self.config.SYMBOL}\n"
                 f"基准价: {self.base_price} USDT\n"
                 f"网格大小: {self.grid_size}%\n"
@@ -118,45 +178,65 @@ class GridTrader:
                 f"价差: {price_diff:+.2f}%"
             )
 
-            # 获取并更新最新的10条交易记录
-            try:
-                self.logger.info("正在获取最近10条交易记录...")
-                latest_trades = await self.exchange.fetch_my_trades(self.config.SYMBOL, limit=10)
-                if latest_trades:
-                    # 转换格式以匹配 OrderTracker 期望的格式 (如果需要)
-                    formatted_trades = []
-                    for trade in latest_trades['data']:
-                        # 跳过未成交或部分成交的订单（fillPx为空）
-                        if not trade.get('fillPx') or trade['fillPx'] == '':
-                            continue
+            # 接管时交易记录和盈亏账本以原主节点写入的文件为准，否则获取并更新最新的10条交易记录
+            if resume_state:
+                self.order_tracker.reload()
+            else:
+                try:
+                    self.logger.info("正在获取最近10条交易记录...")
+                    latest_trades = await self.exchange.fetch_my_trades(self.config.SYMBOL, limit=10)
+                    if latest_trades:
+                        # 转换格式以匹配 OrderTracker 期望的格式 (如果需要)
+                        formatted_trades = []
+                        ledger = self.order_tracker.pnl_ledger
+                        seen_orders = set()
+                        for trade in latest_trades['data']:
+                            # 跳过未成交或部分成交的订单（fillPx为空）
+                            if not trade.get('fillPx') or trade['fillPx'] == '':
+                                continue
                         
-                        try:
-                            # 注意: ccxt 返回的 trade 结构可能需要调整
-                            # 假设 OrderTracker 需要 timestamp(秒), side, price, amount, profit, order_id
-                            # profit 可能需要后续计算或默认为0
-                            formatted_trade = {
-                                'timestamp': int(trade['uTime']) / 1000, # ms to s
-                                'side': trade['side'],
-                                'price': float(trade['fillPx']),
-                                'amount': float(trade['sz']),
-                                'cost': float(trade['fillSz']) * float(trade['fillPx']), # 保留原始 cost
-                                # 'fee': trade.get('fee', {}).get('cost', 0), # 提取手续费
-                                'fee': 0, # 提取手续费
-                                'order_id': trade.get('ordId'), # 关联订单ID
-                                'profit': 0 # 初始化时设为0，或者后续计算
-                            }
-                            formatted_trades.append(formatted_trade)
-                        except (ValueError, KeyError) as e:
-                            self.logger.warning(f"跳过无效交易记录: {e}")
+                            try:
+                                # 注意: ccxt 返回的 trade 结构可能需要调整
+                                # 假设 OrderTracker 需要 timestamp(秒), side, price, amount, profit, order_id
+                                # profit 可能需要后续计算或默认为0
+                                formatted_trade = {
+                                    'timestamp': int(trade['uTime']) / 1000, # ms to s
+                                    'side': trade['side'],
+                                    'price': float(trade['fillPx']),
+                                    'amount': float(trade['sz']),
+                                    'cost': float(trade['fillSz']) * float(trade['fillPx']), # 保留原始 cost
+                                    'fee': -float(trade.get('fee') or 0), # 手续费成本（单位见 fee_ccy，返佣为负数）
+                                    'fee_ccy': trade.get('feeCcy'),
+                                    'order_id': trade.get('ordId'), # 关联订单ID
+                                    # 已实现盈亏取自盈亏账本（同一订单多笔成交只记在第一笔上），账本外的成交记为0
+                                    'profit': ledger.order_pnl.get(trade.get('ordId'), 0) if trade.get('ordId') not in seen_orders else 0
+                                }
+                                seen_orders.add(trade.get('ordId'))
+                                formatted_trades.append(formatted_trade)
+                            except (ValueError, KeyError) as e:
+                                self.logger.warning(f"跳过无效交易记录: {e}")
                     
-                    # 直接替换 OrderTracker 中的历史记录
-                    self.order_tracker.trade_history = formatted_trades
-                    self.order_tracker.save_trade_history() # 保存到文件
-                    self.logger.info(f"已使用最新的 {len(formatted_trades)} 条交易记录更新历史。")
-                else:
-                    self.logger.info("未能获取到最新的交易记录，将使用本地历史。")
-            except Exception as trade_fetch_error:
-                self.logger.error(f"获取或处理最新交易记录时出错: {str(trade_fetch_error)} | 堆栈信息: {traceback.format_exc()}")
+                        # 直接替换 OrderTracker 中的历史记录
+                        self.order_tracker.trade_history = formatted_trades
+                        self.order_tracker.save_trade_history() # 保存到文件
+                        self.order_tracker.trade_store.add_many(formatted_trades)
+                        self.logger.info(f"已使用最新的 {len(formatted_trades)} 条交易记录更新历史。")
+                    else:
+                        self.logger.info("未能获取到最新的交易记录，将使用本地历史。")
+                except Exception as trade_fetch_error:
+                    self.logger.error(f"获取或处理最新交易记录时出错: {str(trade_fetch_error)} | 堆栈信息: {traceback.format_exc()}")
+
+            # 盈亏账本首次建立时，以当前市价登记已有持仓作为期初批次
+            if self.order_tracker.pnl_ledger.empty:
+                try:
+                    position_value = await self.risk_manager._get_position_value()
+                    self.order_tracker.pnl_ledger.seed(position_value / market_price, market_price)
+                except Exception as e:
+                    self.logger.error(f"登记期初持仓失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
+
+            # 挂单模式：先收养原主节点（或上次运行）留下的挂单，再开始 reconcile
+            if self.ladder is not None:
+                await self.ladder.adopt_open_orders()
 
             self.initialized = True
         except Exception as e:
@@ -182,15 +262,46 @@ class GridTrader:
             self.logger.error(f"获取最新价格失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
             return self.base_price
 
+    def _collect_metrics(self):
+        """抓取 /metrics 时读取的网格状态指标"""
+        return [
+            ('grid_size_percent', 'gauge', '当前网格大小（%）', [('', {}, self.grid_size)]),
+            ('grid_base_price', 'gauge', '当前基准价', [('', {}, self.base_price)]),
+            ('grid_current_price', 'gauge', '最新成交价', [('', {}, self.current_price)]),
+            ('grid_loop_interval_seconds', 'gauge', '主循环当前轮询间隔（秒）', [('', {}, self.cadence.interval)]),
+            ('grid_circuit_state', 'gauge', '交易所接口熔断状态（0=关闭 1=半开 2=打开）',
+             [('', {'endpoint': endpoint}, value) for endpoint, value in self.exchange.circuits.states().items()]),
+        ]
+
+    def _grid_levels(self):
+        """返回 (下轨, 上轨, 回撤阈值)，只在基准价或网格大小变化时重新计算并重建触发价索引"""
+        key = (self.base_price, self.grid_size)
+        if key != self._trigger_key:
+            step = self.grid_size / 100
+            self._bands = (self.base_price * (1 - step), self.base_price * (1 + step), FLIP_THRESHOLD(self.grid_size))
+            self.trigger_index.rebuild(self.symbol, key, [(self._bands[0], 'buy'), (self._bands[1], 'sell')])
+            self._trigger_key = key
+        return self._bands
+
     def _get_upper_band(self):
-        return self.base_price * (1 + self.grid_size / 100)
+        return self._grid_levels()[1]
     
     def _get_lower_band(self):
-        return self.base_price * (1 - self.grid_size / 100)
+        return self._grid_levels()[0]
+
+    def _record_crossings(self, prev_price, price):
+        """记录两次行情之间跨越的上下轨（只用于日志和指标，信号仍按当前价与上下轨比较）"""
+        for level_price, side in self.trigger_index.crossed(self.symbol, prev_price, price):
+            TRIGGER_CROSSINGS.labels(side).inc()
+            self.logger.info(
+                f"价格跨越{'下轨' if side == 'buy' else '上轨'}: {level_price:.4f} | {prev_price:.4f} → {price:.4f}"
+            )
     
     async def _check_buy_signal(self):
         current_price = self.current_price
-        if current_price <= self._get_lower_band():
+        lower_band, _, threshold = self._grid_levels()
+        # 推迟的买入信号在价格反弹回下轨之上后仍继续追踪，资金到账后再次触发
+        if current_price <= lower_band or self._is_deferred('buy', current_price):
             self.buying_or_selling = True    # 在买入或卖出
             # 记录最低价
             new_lowest = current_price if self.lowest is None else min(self.lowest, current_price)
@@ -200,35 +311,41 @@ class GridTrader:
                 self.logger.info(
                     f"买入监测 | "
                     f"当前价: {current_price:.2f} | "
-                    f"触发价: {self._get_lower_band():.5f} | "
+                    f"触发价: {lower_band:.5f} | "
                     f"最低价: {self.lowest:.2f} | "
-                    f"网格下限: {self._get_lower_band():.2f} | "
-                    f"反弹阈值: {FLIP_THRESHOLD(self.grid_size)*100:.2f}%"
+                    f"网格下限: {lower_band:.2f} | "
+                    f"反弹阈值: {threshold*100:.2f}%"
                 )
-            threshold = FLIP_THRESHOLD(self.grid_size)
             # 从最低价反弹指定比例时触发买入
             if self.lowest and current_price >= self.lowest * (1 + threshold):
                 self.buying_or_selling = False # 不在买入或卖出
+                self.latency_monitor.trade.mark('signal')
                 trigger_price = self.lowest * (1 + threshold)
                 rebound_pct = (current_price/self.lowest-1)*100
                 LogHelper.log_trade_signal(
                     self.logger, "买入", current_price, trigger_price, rebound_pct
                 )
-                # 检查买入余额是否充足
-                if not await self.check_buy_balance(current_price):
+                # 检查买入余额是否充足；资金正在到账时保留信号，下一轮重新检查
+                ok = await self.check_buy_balance(current_price)
+                if ok is None:
+                    self._defer_signal('buy')
+                    return False
+                self.deferred_signal = None
+                if not ok:
                     return False
+                self.latency_monitor.trade.mark('balance')
                 return True
         return False
     
     async def _check_sell_signal(self):
         current_price = self.current_price
-        initial_upper_band = self._get_upper_band()  # 初始上轨价格
+        _, initial_upper_band, threshold = self._grid_levels()  # 初始上轨价格
         
-        if current_price >= initial_upper_band:
+        # 推迟的卖出信号在价格回落到上轨之下后仍继续追踪，资金到账后再次触发
+        if current_price >= initial_upper_band or self._is_deferred('sell', current_price):
             self.buying_or_selling = True    # 在买入或卖出
             # 记录最高价
             new_highest = current_price if self.highest is None else max(self.highest, current_price)
-            threshold = FLIP_THRESHOLD(self.grid_size)
             
             # 计算动态触发价格 (基于最高价的回调阈值)
             dynamic_trigger_price = new_highest * (1 - threshold) if new_highest is not None else initial_upper_band
@@ -249,17 +366,43 @@ class GridTrader:
             # 从最高价下跌指定比例时触发卖出
             if self.highest and current_price <= self.highest * (1 - threshold):
                 self.buying_or_selling = False # 不在买入或卖出
+                self.latency_monitor.trade.mark('signal')
                 trigger_price = self.highest * (1 - threshold)
                 drop_pct = (1-current_price/self.highest)*100
                 LogHelper.log_trade_signal(
                     self.logger, "卖出", current_price, trigger_price, drop_pct
                 )
-                # 检查卖出余额是否充足
-                if not await self.check_sell_balance():
+                # 检查卖出余额是否充足；资金正在到账时保留信号，下一轮重新检查
+                ok = await self.check_sell_balance()
+                if ok is None:
+                    self._defer_signal('sell')
+                    return False
+                self.deferred_signal = None
+                if not ok:
                     return False
+                self.latency_monitor.trade.mark('balance')
                 return True
         return False
     
+    def _defer_signal(self, side):
+        """余额检查返回"资金到账中"时保留信号：最高/最低价不重置，继续追踪，下一轮回撤条件仍成立即重新触发"""
+        if self.deferred_signal is None or self.deferred_signal[0] != side:
+            self.logger.info(f"{'买入' if side == 'buy' else '卖出'}信号等待资金到账，保留追踪状态 | 最长 {self.liquidity.deferred_ttl} 秒")
+            self.deferred_signal = (side, time.time() + self.liquidity.deferred_ttl)
+        self.buying_or_selling = True
+
+    def _is_deferred(self, side, price):
+        """是否有仍然有效的推迟信号；超时或价格已到达另一侧轨道时放弃"""
+        if self.deferred_signal is None or self.deferred_signal[0] != side:
+            return False
+        lower_band, upper_band, _ = self._grid_levels()
+        crossed = price >= upper_band if side == 'buy' else price <= lower_band
+        if crossed or time.time() > self.deferred_signal[1]:
+            self.logger.warning(f"放弃推迟的{'买入' if side == 'buy' else '卖出'}信号 | 原因: {'价格已到达另一侧轨道' if crossed else '等待资金到账超时'}")
+            self.deferred_signal = None
+            return False
+        return True
+
     async def _calculate_order_amount(self, order_type):
         """计算目标订单金额 (总资产的10%)\n"""
         try:
@@ -269,7 +412,9 @@ class GridTrader:
             cache_key = f'order_amount_target' # 使用不同的缓存键
             if hasattr(self, cache_key) and \
                current_time - getattr(self, f'{cache_key}_time') < 60:  # 1分钟缓存
+                CACHE_REQUESTS.labels('order_amount', 'hit').inc()
                 return getattr(self, cache_key)
+            CACHE_REQUESTS.labels('order_amount', 'miss').inc()
             
             total_assets = await self._get_total_assets()
             
@@ -339,63 +484,97 @@ class GridTrader:
     async def main_loop(self):
         """主交易循环"""
         LogHelper.log_section(self.logger, "启动主交易循环")
+        backoff = Backoff(**self.config.RETRY_BACKOFF)
         
         while True:
             try:
+                # 只统计本轮循环自身的请求（例行任务、后台补足、状态发布等不计入）
+                calls = count_calls()
                 if not self.initialized:
                     await self.initialize()
                     await self.position_controller_s1.update_daily_s1_levels()
 
-                # 保留S1水平更新
-                await self.position_controller_s1.update_daily_s1_levels()
-
                 # 获取当前价格
                 current_price = await self._get_latest_price()
                 if not current_price:
                     await asyncio.sleep(5)
                     continue
-                self.current_price = current_price
+                prev_price, self.current_price = self.current_price, current_price
+                self._record_crossings(prev_price, current_price)
+                self.cadence.observe(current_price)
+                self.latency_monitor.trade.mark('tick')
 
-                # 定期检查资金账户并自动转到现货（每5分钟）
-                if time.time() - self.last_funding_transfer_check > self.funding_transfer_interval:
-                    try:
-                        await self._transfer_funding_to_spot()
-                        self.last_funding_transfer_check = time.time()
-                    except Exception as e:
-                        self.logger.warning(f"资金账户自动转账失败: {str(e)}")
+                # 处理超时未完成的订单（无到期订单时只是一次堆顶比较）
+                await self._check_and_cancel_timeout_orders()
 
-                # 优先检查买入卖出信号，不执行风控检查
-                # 添加重试机制确保买入卖出检测正常运行
-                sell_signal = await self._check_signal_with_retry(self._check_sell_signal, "卖出检测")
-                if sell_signal:
-                    await self.execute_order('sell')
-                else:
-                    buy_signal = await self._check_signal_with_retry(self._check_buy_signal, "买入检测")
-                    if buy_signal:
-                        await self.execute_order('buy')
-                    else:
-                        # 只有在没有交易信号时才执行其他操作
-                        
-                        # 执行风控检查
-                        if await self.risk_manager.multi_layer_check():
-                            await asyncio.sleep(5)
-                            continue
+                # 主备模式下租约即将过期时不再下单，等待心跳续约或退出
+                if self.failover is not None and not self.failover.is_active():
+                    self.logger.warning("租约即将过期，暂停下单")
+                    await asyncio.sleep(1)
+                    continue
 
-                        # 执行S1策略
-                        await self.position_controller_s1.check_and_execute()
-                        
-                        # 如果时间到了并且不在买入或卖出调整网格大小
-                        dynamic_interval_seconds = await self._calculate_dynamic_interval_seconds()
-                        if time.time() - self.last_grid_adjust_time > dynamic_interval_seconds and not self.buying_or_selling:
-                            self.logger.info(f"时间到了，准备调整网格大小 (间隔: {dynamic_interval_seconds/3600} 小时).")
-                            await self.adjust_grid_size()
-                            self.last_grid_adjust_time = time.time()
+                # 资金划转、风控、S1、网格调整由 self.housekeeping 在后台运行，主循环只负责 价格 → 信号 → 下单
+                async with self.order_lock:
+                    # 挂单模式：核对并调整上下轨的常驻挂单，成交由挂单直接完成，不再检测信号
+                    if self.ladder is not None:
+                        await self.ladder.reconcile()
+                    else:
+                        # 优先检查卖出信号，添加重试机制确保买入卖出检测正常运行
+                        if await self._check_signal_with_retry(self._check_sell_signal, "卖出检测"):
+                            await self.execute_order('sell')
+                        elif await self._check_signal_with_retry(self._check_buy_signal, "买入检测"):
+                            await self.execute_order('buy')
 
-                await asyncio.sleep(5)
+                backoff.reset()
+                await asyncio.sleep(self.cadence.next_interval(
+                    self.current_price, self._trigger_prices(), calls[0], tracking=self.buying_or_selling
+                ))
 
+            except CircuitOpenError as e:
+                delay = await backoff.sleep(e)
+                self.logger.warning(f"主循环暂停 {delay:.1f}秒: {str(e)}")
             except Exception as e:
                 self.logger.error(f"Main loop error: {e}", exc_info=True)
-                await asyncio.sleep(30)
+                await backoff.sleep(e)
+
+    def _register_housekeeping_jobs(self):
+        """注册后台例行任务：未初始化或正在追踪触发价时跳过，风控触发时暂停S1和网格调整"""
+        jobs = self.config.HOUSEKEEPING_PARAMS['jobs']
+        idle = lambda: self.initialized and not self.buying_or_selling
+        risk_ok = lambda: idle() and not self.risk_triggered
+        self.housekeeping.add('s1_levels', self.position_controller_s1.update_daily_s1_levels, condition=idle, **jobs['s1_levels'])
+        self.housekeeping.add('fund_rebalance', self.fund_planner.rebalance, condition=idle, **jobs['fund_rebalance'])
+        self.housekeeping.add('liquidity', self.liquidity.top_up, condition=idle, **jobs['liquidity'])
+        self.housekeeping.add('risk_check', self._run_risk_check, condition=idle, **jobs['risk_check'])
+        self.housekeeping.add('s1_check', self._run_s1_check, condition=risk_ok, **jobs['s1_check'])
+        self.housekeeping.add('grid_adjust', self._run_grid_adjust, condition=risk_ok, **jobs['grid_adjust'])
+
+    async def _run_risk_check(self):
+        self.risk_triggered = bool(await self.risk_manager.multi_layer_check())
+
+    async def _run_s1_check(self):
+        async with self.order_lock:
+            await self.position_controller_s1.check_and_execute()
+
+    async def _run_grid_adjust(self):
+        """到达按波动率计算的调整间隔后调整网格大小"""
+        dynamic_interval_seconds = await self._calculate_dynamic_interval_seconds()
+        if time.time() - self.last_grid_adjust_time > dynamic_interval_seconds:
+            self.logger.info(f"时间到了，准备调整网格大小 (间隔: {dynamic_interval_seconds/3600} 小时).")
+            await self.adjust_grid_size()
+            self.last_grid_adjust_time = time.time()
+
+    def _trigger_prices(self):
+        """当前所有可能触发交易的价格：网格上下轨、追踪中的回撤触发价和S1高低点"""
+        _, _, threshold = self._grid_levels()
+        nearest = self.trigger_index.nearest(self.symbol, self.current_price)
+        prices = [nearest[0] if nearest else None,
+                  self.position_controller_s1.s1_daily_high, self.position_controller_s1.s1_daily_low]
+        if self.lowest:
+            prices.append(self.lowest * (1 + threshold))
+        if self.highest:
+            prices.append(self.highest * (1 - threshold))
+        return prices
                 
     async def _check_signal_with_retry(self, check_func, check_name, max_retries=3, retry_delay=2):
         """带重试机制的信号检测函数
@@ -404,61 +583,37 @@ class GridTrader:
             check_func: 要执行的检测函数 (_check_buy_signal 或 _check_sell_signal)
             check_name: 检测名称，用于日志
             max_retries: 最大重试次数
-            retry_delay: 重试间隔（秒）
+            retry_delay: 重试间隔的退避下限（秒），连续出错时按去相关抖动增长
             
         Returns:
-            bool: 检测结果
+            bool: 检测结果；依赖的接口熔断中时直接返回 False，由主循环退避后再检测
         """
         retries = 0
+        backoff = Backoff(retry_delay, self.config.RETRY_BACKOFF['cap'])
         while retries <= max_retries:
             try:
                 return await check_func()
+            except CircuitOpenError as e:
+                self.logger.warning(f"{check_name}跳过: {str(e)}")
+                return False
             except Exception as e:
                 retries += 1
+                RETRIES.labels('signal_check').inc()
                 if retries <= max_retries:
-                    self.logger.warning(f"{check_name}出错，{retry_delay}秒后进行第{retries}次重试: {str(e)}")
-                    await asyncio.sleep(retry_delay)
+                    delay = backoff.next()
+                    self.logger.warning(f"{check_name}出错，{delay:.1f}秒后进行第{retries}次重试: {str(e)}")
+                    await asyncio.sleep(delay)
                 else:
                     self.logger.error(f"{check_name}失败，达到最大重试次数({max_retries}次): {str(e)} | 堆栈信息: {traceback.format_exc()}")
                     return False
         return False
 
     async def _ensure_trading_funds(self):
-        """确保现货账户有足够的交易资金"""
+        """确保现货账户有足够的交易资金（两倍最小交易额）"""
         try:
-            balance = await self.exchange.fetch_balance()
-            current_price = self.current_price
-            
-            # 计算所需资金
             required_usdt = self.config.MIN_TRADE_AMOUNT * 2  # 保持两倍最小交易额
-            required_okb = required_usdt / current_price
-            
-            # 获取现货余额
-            spot_usdt = float(balance['free'].get('USDT', 0))
-            spot_okb = float(balance['free'].get('OKB', 0))
-            
-            # 一次性检查和赎回所需资金
-            transfers = []
-            if spot_usdt < required_usdt:
-                transfers.append({
-                    'asset': 'USDT',
-                    'amount': required_usdt - spot_usdt
-                })
-            if spot_okb < required_okb:
-                transfers.append({
-                    'asset': 'OKB',
-                    'amount': required_okb - spot_okb
-                })
-            
-            # 如果需要赎回，一次性执行所有赎回操作
-            if transfers:
-                self.logger.info("开始资金赎回操作...")
-                for transfer in transfers:
-                    self.logger.info(f"从理财赎回 {transfer['amount']:.8f} {transfer['asset']}")
-                    await self.exchange.transfer_to_spot(transfer['asset'], transfer['amount'])
-                self.logger.info("资金赎回完成")
-                # 等待资金到账
-                await asyncio.sleep(2)
+            await self.fund_planner.ensure('USDT', required_usdt)
+            await self.fund_planner.ensure(self.symbol_info['base'], required_usdt / self.current_price)
         except Exception as e:
             self.logger.error(f"资金检查和划转失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
 
@@ -466,7 +621,10 @@ class GridTrader:
         try:
             open_orders = await self.exchange.fetch_open_orders(self.config.SYMBOL)
             for order in open_orders:
-                await self.exchange.cancel_order(order['id'])
+                await self.exchange.cancel_order(order['id'], self.config.SYMBOL)
+                record = self.order_tracker.orders.update_from_exchange(order)
+                if record is not None:
+                    self.order_tracker.orders.transition(record, OrderState.CANCELLED)
             send_pushplus_message("程序紧急停止", "系统通知")
             self.logger.critical("所有交易已停止，进入复盘程序")
         except Exception as e:
@@ -493,16 +651,22 @@ class GridTrader:
         """执行订单，带重试机制"""
         max_retries = 10  # 最大重试次数
         retry_count = 0
-        check_interval = 3  # 下单后等待检查时间（秒）
+        chase = self.config.ORDER_CHASE_PARAMS
+        check_interval = chase['check_interval']  # 下单后等待检查时间（秒）
+        intent_id = int(time.time() * 1000)  # 本次交易意图的ID，每次尝试的 clOrdId 由它和尝试次数确定
+        chase_deadline = time.time() + chase['time_budget']  # 追价总时长上限
+        amends_left = chase['max_amends']
+        backoff = Backoff(**self.config.RETRY_BACKOFF)
 
         while retry_count < max_retries:
             try:
                 # 获取最新订单簿数据
-                order_book = await self.exchange.fetch_order_book(self.config.SYMBOL, limit=5)
+                order_book = await self._get_order_book()
                 if not order_book or not order_book.get('asks') or not order_book.get('bids'):
                     self.logger.error("获取订单簿数据失败或数据不完整")
                     retry_count += 1
-                    await asyncio.sleep(3)
+                    RETRIES.labels('execute_order').inc()
+                    await backoff.sleep()
                     continue
 
                 # 使用买1/卖1价格
@@ -516,163 +680,77 @@ class GridTrader:
                 amount = self._adjust_amount_precision(amount_usdt / order_price)
                 
                 # 检查余额是否足够
-                if side == 'buy':
-                    if not await self.check_buy_balance(order_price):
-                        self.logger.warning(f"买入余额不足，第 {retry_count + 1} 次尝试中止")
-                        return False
-                else:
-                    if not await self.check_sell_balance():
-                        self.logger.warning(f"卖出余额不足，第 {retry_count + 1} 次尝试中止")
-                        return False
+                ok = await (self.check_buy_balance(order_price) if side == 'buy' else self.check_sell_balance())
+                if ok is None:
+                    # 资金正在到账：保留信号，下一轮重新触发
+                    self._defer_signal(side)
+                    return False
+                if not ok:
+                    self.logger.warning(f"{'买入' if side == 'buy' else '卖出'}余额不足，第 {retry_count + 1} 次尝试中止")
+                    return False
 
                 LogHelper.log_order_execution(
                     self.logger, side, retry_count + 1, max_retries,
                     order_price, amount, amount_usdt
                 )
                 
-                # 创建订单
-                order = await self.exchange.create_order(
-                    self.config.SYMBOL,
-                    'limit',
-                    side,
-                    amount,
-                    order_price
+                # 创建订单（受下单频率限制）
+                await self.throttler.acquire()
+                self.latency_monitor.trade.mark('submit')
+                record, order = await self._submit_order(
+                    side, 'limit', amount, order_price,
+                    make_client_order_id('grid', side, intent_id, retry_count)
                 )
-
-                order['id'] = order['ordId']
-                order['status'] = 'open'
-                # 更新活跃订单状态
-                order_id = order['id']
-                self.active_orders[side] = order_id
-                self.order_tracker.add_order(order)
+                self.latency_monitor.trade.mark('ack')
+                ORDERS.labels(side, 'placed').inc()
+                order_id = record.ord_id
                 
                 # 等待指定时间后检查订单状态
                 self.logger.info(f"订单已提交，等待 {check_interval} 秒后检查状态")
                 await asyncio.sleep(check_interval)
                 
                 # 检查订单状态
-                updated_order = await self.exchange.fetch_order(order_id, self.config.SYMBOL)
+                updated_order = await self.exchange.fetch_order(None, self.config.SYMBOL, client_order_id=record.cl_ord_id)
+                self.order_tracker.orders.update_from_exchange(updated_order)
                 
                 # 订单已成交
                 if updated_order['status'] == 'closed':
-                    LogHelper.log_order_result(
-                        self.logger, side, order_id, 'closed',
-                        float(updated_order['price']), float(updated_order['filled'])
-                    )
-                    # 更新基准价
-                    self.base_price = float(updated_order['price'])
-                    # 重置最高价和最低价，让策略基于新基准价重新开始
-                    self.lowest = None
-                    self.highest = None
-                    # 清除活跃订单状态
-                    self.active_orders[side] = None
-                    
-                    # 更新交易记录
-                    trade_info = {
-                        'timestamp': time.time(),
-                        'side': side,
-                        'price': float(updated_order['price']),
-                        'amount': float(updated_order['filled']),
-                        'order_id': updated_order['id']
-                    }
-                    self.order_tracker.add_trade(trade_info)
-                    
-                    # 更新最后交易时间和价格
-                    self.last_trade_time = time.time()
-                    self.last_trade_price = float(updated_order['price'])
-                    
-                    # 更新总资产信息
-                    await self._update_total_assets()
-                    
-                    self.logger.info(f"基准价已更新: {self.base_price}")
-                    
-                    # 发送通知
-                    # 使用更清晰的格式发送交易成功消息
-                    trade_side = 'buy' if side == 'buy' else 'sell'
-                    trade_price = float(updated_order['price'])
-                    trade_amount = float(updated_order['filled']) 
-                    trade_total = trade_price * trade_amount
-                    
-                    # 使用format_trade_message函数处理消息格式
-                    message = format_trade_message(
-                        side=trade_side,
-                        symbol=self.config.SYMBOL,
-                        price=trade_price,
-                        amount=trade_amount,
-                        total=trade_total,
-                        grid_size=self.grid_size,
-                        retry_count=(retry_count + 1, max_retries)
-                    )
-                    
-                    send_pushplus_message(message, "交易成功通知")
-                    
-                    # 交易完成后，检查并转移多余资金到理财
-                    await self._transfer_excess_funds()
-                    
+                    await self._handle_filled_order(side, updated_order, (retry_count + 1, max_retries))
                     return updated_order
                 
+                # 追价模式：原地改价追随最优价，订单和排队位置保留，数量不变因此无需重新检查余额
+                if chase['mode'] == 'amend' and updated_order['status'] == 'open' and amends_left > 0:
+                    updated_order, amends_used = await self._chase_order(
+                        side, record, amends_left, chase_deadline, chase['price_step'], check_interval
+                    )
+                    amends_left -= amends_used
+                    if updated_order['status'] == 'closed':
+                        await self._handle_filled_order(side, updated_order, (retry_count + 1, max_retries))
+                        return updated_order
+                
                 # 如果订单未成交，取消订单并重试
                 self.logger.warning(f"订单未成交，尝试取消 | ID: {order_id} | 状态: {updated_order['status']}")
                 try:
-                    await self.exchange.cancel_order(order_id, self.config.SYMBOL)
+                    await self.exchange.cancel_order(None, self.config.SYMBOL, client_order_id=record.cl_ord_id)
+                    self.order_tracker.orders.transition(record, OrderState.CANCELLED)
+                    ORDERS.labels(side, 'cancelled').inc()
                     self.logger.info(f"订单已取消，准备重试 | ID: {order_id}")
                 except Exception as e:
                     # 如果取消订单时出错，检查是否已成交
                     self.logger.warning(f"取消订单时出错: {str(e)}，再次检查订单状态")
                     try:
-                        check_order = await self.exchange.fetch_order(order_id, self.config.SYMBOL)
+                        check_order = await self.exchange.fetch_order(None, self.config.SYMBOL, client_order_id=record.cl_ord_id)
+                        self.order_tracker.orders.update_from_exchange(check_order)
                         if check_order['status'] == 'closed':
                             self.logger.info(f"订单已经成交 | ID: {order_id}")
-                            # 处理已成交的订单（与上面相同的逻辑）
-                            self.base_price = float(check_order['price'])
-                            # 重置最高价和最低价，让策略基于新基准价重新开始
-                            self.lowest = None
-                            self.highest = None
-                            self.active_orders[side] = None
-                            trade_info = {
-                                'timestamp': time.time(),
-                                'side': side,
-                                'price': float(check_order['price']),
-                                'amount': float(check_order['filled']),
-                                'order_id': check_order['id']
-                            }
-                            self.order_tracker.add_trade(trade_info)
-                            self.last_trade_time = time.time()
-                            self.last_trade_price = float(check_order['price'])
-                            await self._update_total_assets()
-                            self.logger.info(f"基准价已更新: {self.base_price}")
-                            
-                            # 使用更清晰的格式发送交易成功消息
-                            trade_side = 'buy' if side == 'buy' else 'sell'
-                            trade_price = float(check_order['price'])
-                            trade_amount = float(check_order['filled']) 
-                            trade_total = trade_price * trade_amount
-                            
-                            # 使用format_trade_message函数处理消息格式
-                            message = format_trade_message(
-                                side=trade_side,
-                                symbol=self.config.SYMBOL,
-                                price=trade_price,
-                                amount=trade_amount,
-                                total=trade_total,
-                                grid_size=self.grid_size,
-                                retry_count=(retry_count + 1, max_retries)
-                            )
-                            
-                            send_pushplus_message(message, "交易成功通知")
-                            
-                            # 交易完成后，检查并转移多余资金到理财
-                            await self._transfer_excess_funds()
-                            
+                            await self._handle_filled_order(side, check_order, (retry_count + 1, max_retries))
                             return check_order
                     except Exception as check_e:
                         self.logger.error(f"检查订单状态失败: {str(check_e)} | 堆栈信息: {traceback.format_exc()}")
                 
-                # 清除活跃订单状态
-                self.active_orders[side] = None
-                
                 # 增加重试计数
                 retry_count += 1
+                RETRIES.labels('execute_order').inc()
                 
                 # 如果还有重试次数，等待一秒后继续
                 if retry_count < max_retries:
@@ -682,18 +760,24 @@ class GridTrader:
             except Exception as e:
                 self.logger.error(f"执行{side}单失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
                 
-                # 尝试清理可能存在的订单
-                if 'order_id' in locals() and self.active_orders.get(side) == order_id:
+                # 尝试清理可能存在的订单（未清理成功的由超时检查兜底）
+                if 'record' in locals() and record.ord_id and not record.state.terminal:
                     try:
-                        await self.exchange.cancel_order(order_id, self.config.SYMBOL)
-                        self.logger.info(f"已取消错误订单 | ID: {order_id}")
+                        await self.exchange.cancel_order(None, self.config.SYMBOL, client_order_id=record.cl_ord_id)
+                        self.order_tracker.orders.transition(record, OrderState.CANCELLED)
+                        ORDERS.labels(side, 'cancelled').inc()
+                        self.logger.info(f"已取消错误订单 | ID: {record.ord_id}")
                     except Exception as cancel_e:
                         self.logger.error(f"取消错误订单失败: {str(cancel_e)} | 堆栈信息: {traceback.format_exc()}")
-                    finally:
-                        self.active_orders[side] = None
                 
                 # 增加重试计数
                 retry_count += 1
+                RETRIES.labels('execute_order').inc()
+                
+                # 下单链路上的接口熔断中：放弃本次交易，由主循环在熔断结束后重新检测信号
+                if isinstance(e, CircuitOpenError):
+                    self.logger.warning(f"{side}单中止: {str(e)}")
+                    return False
                 
                 # 如果是关键错误，停止重试
                 if "资金不足" in str(e) or "Insufficient" in str(e):
@@ -708,10 +792,11 @@ class GridTrader:
                     send_pushplus_message(error_message, "交易错误通知")
                     return False
                 
-                # 如果还有重试次数，稍等后继续
+                # 如果还有重试次数，退避后继续
                 if retry_count < max_retries:
-                    self.logger.info(f"等待2秒后进行第 {retry_count + 1} 次尝试")
-                    await asyncio.sleep(2)
+                    delay = backoff.next()
+                    self.logger.info(f"等待{delay:.1f}秒后进行第 {retry_count + 1} 次尝试")
+                    await asyncio.sleep(delay)
         
         # 达到最大重试次数后仍未成功
         if retry_count >= max_retries:
@@ -726,6 +811,151 @@ class GridTrader:
         
         return False
 
+    async def _get_order_book(self, limit=5):
+        """优先读取WebSocket维护的本地订单簿，未就绪或已过期时回退到REST"""
+        book = self.order_book_feed.get(self.config.SYMBOL)
+        if book is not None and len(book.bids) and len(book.asks):
+            return book.to_rest(limit)
+        ORDER_BOOK_EVENTS.labels('rest_fallback').inc()
+        return await self.exchange.fetch_order_book(self.config.SYMBOL, limit=limit)
+
+    def _chase_price(self, side, order_book, price_step):
+        """追价目标价：买单取卖1、卖单取买1，再按 price_step 额外让价，精度与盘口价格一致"""
+        raw = order_book['asks'][0][0] if side == 'buy' else order_book['bids'][0][0]
+        decimals = len(raw.split('.')[1]) if '.' in raw else 0
+        price = float(raw) * (1 + price_step if side == 'buy' else 1 - price_step)
+        return round(price, decimals)
+
+    async def _chase_order(self, side, record, max_amends, deadline, price_step, check_interval):
+        """用改单把未成交的限价单移动到最新最优价，直到成交、改价次数用完或超出时间预算
+
+        每轮只需 订单簿 + 改单 + 查询 三次请求；最优价未变化时不改单，保留排队位置。
+
+        Returns:
+            tuple: (最新订单数据, 已使用的改价次数)
+        """
+        amends = 0
+        order = None
+        while time.time() < deadline:
+            order_book = await self._get_order_book()
+            if order_book and order_book.get('asks') and order_book.get('bids'):
+                new_price = self._chase_price(side, order_book, price_step)
+                if new_price != record.price:
+                    if amends >= max_amends:
+                        break
+                    try:
+                        await self.exchange.amend_order(
+                            self.config.SYMBOL, client_order_id=record.cl_ord_id, new_price=new_price
+                        )
+                    except Exception as e:
+                        # 改单失败多半是订单刚好成交或已撤销，以查询结果为准
+                        self.logger.warning(f"改单失败，检查订单状态: {str(e)}")
+                        order = await self.exchange.fetch_order(None, self.config.SYMBOL, client_order_id=record.cl_ord_id)
+                        self.order_tracker.orders.update_from_exchange(order)
+                        break
+                    amends += 1
+                    ORDERS.labels(side, 'amended').inc()
+                    self.logger.info(
+                        f"改价追单 [{amends}/{max_amends}] | ID: {record.ord_id} | "
+                        f"{record.price} → {new_price}"
+                    )
+                    record.price = new_price
+                    self.order_tracker.orders.extend_deadline(record, self.ORDER_TIMEOUT + check_interval)
+            await asyncio.sleep(check_interval)
+            order = await self.exchange.fetch_order(None, self.config.SYMBOL, client_order_id=record.cl_ord_id)
+            self.order_tracker.orders.update_from_exchange(order)
+            if order['status'] != 'open':
+                break
+        if order is None:
+            order = await self.exchange.fetch_order(None, self.config.SYMBOL, client_order_id=record.cl_ord_id)
+            self.order_tracker.orders.update_from_exchange(order)
+        return order, amends
+
+    async def _submit_order(self, side, order_type, amount, price, client_order_id, params=None, timeout=None):
+        """按 clOrdId 幂等提交订单并登记到订单注册表
+
+        交易所明确拒绝时订单一定不存在，直接抛出；超时、网络错误等结果未知的情况，
+        只需按 clOrdId 查询一次即可确定订单是否已创建，不需要撤单或反复查询。
+        若这次查询也失败，订单保持 NEW 状态，由超时检查再按 clOrdId 核对。
+        timeout 默认为 ORDER_TIMEOUT，传 0 表示常驻挂单，不参与超时撤单。
+
+        Returns:
+            tuple: (订单记录, 交易所返回的订单数据)
+        """
+        record = self.order_tracker.orders.add(
+            side, price, amount, cl_ord_id=client_order_id,
+            timeout=self.ORDER_TIMEOUT if timeout is None else timeout
+        )
+        try:
+            order = await self.exchange.create_order(
+                self.config.SYMBOL, order_type, side, amount, price,
+                client_order_id=client_order_id, params=params
+            )
+        except (OrderRejectedError, CircuitOpenError):
+            # 熔断中的请求未发送，与明确拒绝一样订单一定不存在
+            self.order_tracker.orders.transition(record, OrderState.REJECTED)
+            raise
+        except Exception as e:
+            self.logger.warning(f"下单结果未知，按clOrdId核对 | clOrdId: {client_order_id} | 错误: {str(e)}")
+            order = await self.exchange.fetch_order_by_client_id(client_order_id, self.config.SYMBOL)
+            if order is None:
+                self.order_tracker.orders.transition(record, OrderState.REJECTED)
+                raise
+            self.order_tracker.orders.update_from_exchange(order)
+            self.logger.info(f"订单已在交易所创建 | clOrdId: {client_order_id} | ID: {order['ordId']}")
+        self.order_tracker.orders.bind(record, order['ordId'])
+        self.order_tracker.add_order(record)
+        return record, order
+
+    async def _handle_filled_order(self, side, order, retry_count=None):
+        """处理已成交订单：更新基准价、记录交易、更新资产并发送通知"""
+        self.latency_monitor.trade.mark('fill')
+        ORDERS.labels(side, 'filled').inc()
+        trade_price = float(order['price'])
+        trade_amount = float(order['filled'])
+        LogHelper.log_order_result(self.logger, side, order['id'], 'closed', trade_price, trade_amount)
+        # 更新基准价
+        self.base_price = trade_price
+        # 重置最高价和最低价，让策略基于新基准价重新开始
+        self.lowest = None
+        self.highest = None
+        self.deferred_signal = None
+        
+        # 更新交易记录
+        self.order_tracker.add_trade({
+            'timestamp': time.time(),
+            'side': side,
+            'price': trade_price,
+            'amount': trade_amount,
+            'order_id': order['id'],
+            'fee': order.get('fee') or 0,
+            'fee_ccy': order.get('feeCcy')
+        })
+        
+        # 更新最后交易时间和价格
+        self.last_trade_time = time.time()
+        self.last_trade_price = trade_price
+        
+        # 更新总资产信息
+        await self._update_total_assets()
+        
+        self.logger.info(f"基准价已更新: {self.base_price}")
+        
+        # 使用format_trade_message函数处理消息格式
+        message = format_trade_message(
+            side=side,
+            symbol=self.config.SYMBOL,
+            price=trade_price,
+            amount=trade_amount,
+            total=trade_price * trade_amount,
+            grid_size=self.grid_size,
+            retry_count=retry_count
+        )
+        send_pushplus_message(message, "交易成功通知")
+        
+        # 交易完成后，在后台把多余资金转入理财（延迟执行并合并多次成交，不计入交易延迟）
+        self.fund_planner.schedule_rebalance()
+
     async def _wait_for_balance(self, side, amount, price):
         """等待直到有足够的余额可用"""
         max_attempts = 10
@@ -788,23 +1018,15 @@ class GridTrader:
             amount = float(order['amount'])
             total = price * amount
             
-            # 计算利润
-            profit = 0
-            if side == 'sell':
-                # 卖出时计算利润 = 卖出价格 - 基准价格
-                profit = (price - self.base_price) * amount
-            elif side == 'buy':
-                # 买入时利润为0
-                profit = 0
-            
-            # 只在这里添加交易记录
+            # 只在这里添加交易记录，利润由盈亏账本按批次匹配计算
             self.order_tracker.add_trade({
                 'timestamp': time.time(),
                 'side': side,
                 'price': price,
                 'amount': amount,
-                'profit': profit,
-                'order_id': order['id']
+                'order_id': order['id'],
+                'fee': order.get('fee') or 0,
+                'fee_ccy': order.get('feeCcy')
             })
             
             # 发送通知
@@ -828,10 +1050,12 @@ class GridTrader:
             
             # 重置关键状态
             self.exchange = ExchangeClient()
+            self.fund_planner.exchange = self.exchange
             self.order_tracker.reset()
             self.base_price = None
             self.highest = None
             self.lowest = None
+            self.deferred_signal = None
             self.grid_size = self.config.GRID_PARAMS['initial']
             self.last_trade = 0
             self.initialized = False  # 确保重置初始化状态
@@ -845,56 +1069,34 @@ class GridTrader:
             raise
 
     async def _check_and_cancel_timeout_orders(self):
-        """检查并取消超时订单"""
-        current_time = time.time()
-        for order_id, timestamp in list(self.order_timestamps.items()):
-            if current_time - timestamp > self.ORDER_TIMEOUT:
-                try:
-                    params = {
-                        'timestamp': int(time.time() * 1000 + self.exchange.time_diff),
-                        'recvWindow': 5000
-                    }
-                    order = await self.exchange.fetch_order(order_id, self.config.SYMBOL, params)
-                    
-                    if order['status'] == 'closed':
-                        old_base_price = self.base_price
-                        self.base_price = order['price']
-                        await self._adjust_grid_after_trade()
-                        # 更新最后成交信息
-                        self.last_trade_price = order['price']
-                        self.last_trade_time = current_time
-                        self.logger.info(f"订单已成交 | ID: {order_id} | 价格: {order['price']} | 基准价从 {old_base_price} 更新为 {self.base_price}")
-                        # 清除活跃订单标记
-                        for side, active_id in self.active_orders.items():
-                            if active_id == order_id:
-                                self.active_orders[side] = None
-                        # 发送成交通知
-                        send_pushplus_message(
-                            f"OKB {{'买入' if side == 'buy' else '卖出'}}单成交\\n"
-                            f"价格: {order['price']} USDT"
-                        )
-                    elif order['status'] == 'open':
-                        # 取消未成交订单
-                        params = {
-                            'timestamp': int(time.time() * 1000 + self.exchange.time_diff),
-                            'recvWindow': 5000
-                        }
-                        await self.exchange.cancel_order(order_id, self.config.SYMBOL, params)
-                        self.logger.info(f"取消超时订单 | ID: {order_id}")
-                        # 清除活跃订单标记
-                        for side, active_id in self.active_orders.items():
-                            if active_id == order_id:
-                                self.active_orders[side] = None
-                    
-                    # 清理订单记录
-                    self.pending_orders.pop(order_id, None)
-                    self.order_timestamps.pop(order_id, None)
-                except Exception as e:
-                    self.logger.error(f"检查订单状态失败: {str(e)} | 订单ID: {order_id} | 堆栈信息: {traceback.format_exc()}")
-                    # 如果是时间同步错误，等待一秒后继续
-                    if "Timestamp for this request" in str(e):
-                        await asyncio.sleep(1)
-                        continue
+        """检查并取消超时订单（从截止时间堆中只取出已到期的订单）"""
+        for record in self.order_tracker.orders.expired():
+            try:
+                if record.ord_id:
+                    order = await self.exchange.fetch_order(record.ord_id, self.config.SYMBOL)
+                elif record.cl_ord_id:
+                    # 提交结果未知的订单，按 clOrdId 核对是否已创建
+                    order = await self.exchange.fetch_order_by_client_id(record.cl_ord_id, self.config.SYMBOL)
+                else:
+                    order = None
+                if order is None:
+                    self.order_tracker.orders.transition(record, OrderState.REJECTED)
+                    continue
+                self.order_tracker.orders.update_from_exchange(order)
+                
+                if order['status'] == 'closed':
+                    self.logger.info(f"超时检查发现订单已成交 | ID: {record.ord_id}")
+                    await self._handle_filled_order(record.side, order)
+                elif order['status'] == 'open':
+                    # 取消未成交订单
+                    await self.exchange.cancel_order(record.ord_id, self.config.SYMBOL)
+                    self.order_tracker.orders.transition(record, OrderState.CANCELLED)
+                    ORDERS.labels(record.side, 'cancelled').inc()
+                    self.logger.info(f"取消超时订单 | ID: {record.ord_id}")
+            except Exception as e:
+                self.logger.error(f"检查订单状态失败: {str(e)} | 订单ID: {record.ord_id} | 堆栈信息: {traceback.format_exc()}")
+                # 查询或撤单失败，稍后再试
+                self.order_tracker.orders.extend_deadline(record, self.ORDER_TIMEOUT)
 
     async def adjust_grid_size(self):
         """根据波动率和市场趋势调整网格大小"""
@@ -967,7 +1169,7 @@ class GridTrader:
     async def _get_order_price(self, side):
         """获取订单价格"""
         try:
-            order_book = await self.exchange.fetch_order_book(self.config.SYMBOL)
+            order_book = await self._get_order_book()
             ask_price = float(order_book['asks'][0][0])  # 卖一价
             bid_price = float(order_book['bids'][0][0])  # 买一价
             
@@ -990,72 +1192,25 @@ class GridTrader:
 
     # 已删除未使用的 _get_price_percentile 和 _calculate_required_funds 方法
 
-    async def _transfer_excess_funds(self):
-        """将超出总资产16%目标的部分资金转回理财账户"""
-        try:
-            balance = await self.exchange.fetch_balance()
-            current_price = await self._get_latest_price()
-            total_assets = await self._get_total_assets()
-            
-            # 如果无法获取价格或总资产，则跳过
-            if not current_price or current_price <= 0 or total_assets <= 0:
-                self.logger.warning("无法获取价格或总资产，跳过资金转移检查")
-                return
-
-            # 计算目标保留金额 (总资产的15%，为交易金额10%的1.5倍缓冲)
-            target_usdt_hold = total_assets * 0.15
-            target_coin_hold_value = total_assets * 0.15
-            target_coin_hold_amount = target_coin_hold_value / current_price
-
-            # 获取当前现货可用余额
-            spot_usdt_balance = float(balance.get('free', {}).get('USDT', 0))
-            spot_coin_balance = float(balance.get('free', {}).get(self.symbol_info['base'], 0))
+    async def _fund_targets(self):
+        """资金再平衡的现货目标 {币种: (下限, 上限)}
 
-            self.logger.info(
-                f"资金转移检查 | 总资产: {total_assets:.2f} USDT | "
-                f"目标USDT持有: {target_usdt_hold:.2f} | 现货USDT: {spot_usdt_balance:.2f} | "
-                f"目标{self.symbol_info['base']}持有(等值): {target_coin_hold_value:.2f} USDT ({target_coin_hold_amount:.4f} {self.symbol_info['base']}) | "
-                f"现货{self.symbol_info['base']}: {spot_coin_balance:.4f}"
-            )
-
-            transfer_executed = False # 标记是否执行了划转
-
-            # 处理USDT：如果现货超出目标，转移多余部分
-            if spot_usdt_balance > target_usdt_hold:
-                transfer_amount = spot_usdt_balance - target_usdt_hold
-                # 增加最小划转金额判断，避免无效操作
-                # 将阈值提高到 1.0 USDT
-                if transfer_amount > 1.0: 
-                    self.logger.info(f"转移多余USDT到理财: {transfer_amount:.2f}")
-                    try:
-                        await self.exchange.transfer_to_savings('USDT', transfer_amount)
-                        transfer_executed = True
-                    except Exception as transfer_e:
-                        self.logger.error(f"转移USDT到理财失败: {str(transfer_e)} | 堆栈信息: {traceback.format_exc()}")
-                else:
-                    self.logger.info(f"USDT超出部分 ({transfer_amount:.2f}) 过小，不执行划转")
-
-            # 处理OKB：如果现货超出目标，转移多余部分
-            if spot_coin_balance > target_coin_hold_amount:
-                transfer_amount = spot_coin_balance - target_coin_hold_amount
-                # 检查转移金额是否大于等于 0.01 OKB
-                if transfer_amount >= 0.01:
-                    self.logger.info(f"转移多余{self.symbol_info['base']}到理财: {transfer_amount:.4f}")
-                    try:
-                        await self.exchange.transfer_to_savings(self.symbol_info['base'], transfer_amount)
-                        transfer_executed = True
-                    except Exception as transfer_e:
-                        self.logger.error(f"转移{self.symbol_info['base']}到理财失败: {str(transfer_e)} | 堆栈信息: {traceback.format_exc()}")
-                else:
-                    self.logger.info(f"{self.symbol_info['base']}超出部分 ({transfer_amount:.4f}) 低于最小申购额 0.01 {self.symbol_info['base']}，不执行划转")
-                
-            # 如果没有执行划转且没有检查到的错误，更新资金检查时间
-            if not transfer_executed:
-                self.logger.info("资金检查完成，无需调整")
-            
-        except Exception as e:
-            self.logger.error(f"检查和划转资金失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
-            return False
+        上限为总资产的 hold_ratio（默认15%，为交易金额10%的1.5倍缓冲），USDT 和币（等值）各一份；
+        下限为流动性管理器预测的交易储备，上限不低于下限，储备不会被申购回理财。
+        """
+        current_price = await self._get_latest_price()
+        total_assets = await self._get_total_assets()
+        # 如果无法获取价格或总资产，则跳过
+        if not current_price or current_price <= 0 or total_assets <= 0:
+            self.logger.warning("无法获取价格或总资产，跳过资金再平衡")
+            return None
+        hold = total_assets * self.fund_planner.hold_ratio
+        reserves = (await self.liquidity.predict() if self.liquidity.enabled else None) or {}
+        base = self.symbol_info['base']
+        return {
+            'USDT': (reserves.get('USDT', 0.0), hold),
+            base: (reserves.get(base, 0.0), hold / current_price)
+        }
 
     # 已删除未使用的 _check_flip_signal 和 _pre_transfer_funds 方法
 
@@ -1080,60 +1235,6 @@ class GridTrader:
             )
         )
 
-    async def _transfer_funding_to_spot(self):
-        """将资金账户余额自动转到现货账户（定期执行）"""
-        try:
-            funding_balance = await self.exchange.fetch_funding_balance()
-            funding_usdt = float(funding_balance.get('USDT', 0))
-            funding_okb = float(funding_balance.get(self.symbol_info['base'], 0))
-            
-            # 转移USDT
-            if funding_usdt >= 0.01:  # 最小转账金额
-                self.logger.info(f"检测到资金账户USDT: {funding_usdt:.2f}，自动转到现货")
-                try:
-                    transfer_result = await asyncio.to_thread(
-                        self.exchange.funding_api.funds_transfer,
-                        ccy='USDT',
-                        amt="{:.2f}".format(funding_usdt),
-                        from_='6',  # 6 = 资金账户
-                        to='18',    # 18 = 现货账户
-                        type='0'    # 0 = 账户内划转
-                    )
-                    if transfer_result['code'] == '0':
-                        self.logger.info(f"✓ 资金账户→现货: {funding_usdt:.2f} USDT")
-                        # 清除缓存
-                        self.exchange.balance_cache = {'timestamp': 0, 'data': None}
-                        self.exchange.funding_balance_cache = {'timestamp': 0, 'data': {}}
-                    else:
-                        self.logger.warning(f"资金账户USDT转账失败: {transfer_result['msg']}")
-                except Exception as e:
-                    self.logger.warning(f"资金账户USDT转账异常: {str(e)}")
-            
-            # 转移基础币种
-            if funding_okb >= 0.001:  # 最小转账金额
-                self.logger.info(f"检测到资金账户{self.symbol_info['base']}: {funding_okb:.8f}，自动转到现货")
-                try:
-                    transfer_result = await asyncio.to_thread(
-                        self.exchange.funding_api.funds_transfer,
-                        ccy=self.symbol_info['base'],
-                        amt="{:.8f}".format(funding_okb),
-                        from_='6',  # 6 = 资金账户
-                        to='18',    # 18 = 现货账户
-                        type='0'    # 0 = 账户内划转
-                    )
-                    if transfer_result['code'] == '0':
-                        self.logger.info(f"✓ 资金账户→现货: {funding_okb:.8f} {self.symbol_info['base']}")
-                        # 清除缓存
-                        self.exchange.balance_cache = {'timestamp': 0, 'data': None}
-                        self.exchange.funding_balance_cache = {'timestamp': 0, 'data': {}}
-                    else:
-                        self.logger.warning(f"资金账户{self.symbol_info['base']}转账失败: {transfer_result['msg']}")
-                except Exception as e:
-                    self.logger.warning(f"资金账户{self.symbol_info['base']}转账异常: {str(e)}")
-                    
-        except Exception as e:
-            self.logger.error(f"检查资金账户余额失败: {str(e)}")
-
     # 已删除未使用的 _check_and_transfer_initial_funds 方法（从未被调用）
 
     async def _get_total_assets(self):
@@ -1143,7 +1244,9 @@ class GridTrader:
             current_time = time.time()
             if hasattr(self, '_assets_cache') and \
                current_time - self._assets_cache['time'] < 60:  # 1分钟缓存
+                CACHE_REQUESTS.labels('total_assets', 'hit').inc()
                 return self._assets_cache['value']
+            CACHE_REQUESTS.labels('total_assets', 'miss').inc()
             
             # 设置一个默认返回值，以防发生异常
             default_total = self._assets_cache['value'] if hasattr(self, '_assets_cache') else 0
@@ -1197,6 +1300,7 @@ class GridTrader:
                 'time': current_time,
                 'value': total_assets
             }
+            TOTAL_ASSETS.set(total_assets)
             
             # 只在资产变化超过1%时才记录日志
             if not hasattr(self, '_last_logged_assets') or \
@@ -1350,8 +1454,25 @@ class GridTrader:
             ema = (price - ema) * multiplier + ema
         return ema
     
-    async def check_buy_balance(self, current_price):
-        """检查买入前的余额，如果不够则从资金账户或理财赎回"""
+    async def _request_liquidity(self, asset, required, liquid):
+        """下单路径现货不足且需要赎回理财时，转为后台补足并推迟本次信号（见 _defer_signal）
+
+        Returns:
+            bool: 理财余额足以补足（已安排后台补足）；False 表示总资金不足，由调用方发送通知
+        """
+        savings = float((await self.exchange.fetch_savings_balance()).get(asset, 0) or 0)
+        if liquid + savings < required:
+            return False
+        self.logger.warning(f"现货{asset}低于本次所需，需要从理财赎回，已安排后台补足，本次信号稍后重试 | 所需: {required:.8f}")
+        self.liquidity.request_top_up()
+        return True
+
+    async def check_buy_balance(self, current_price, notify=True):
+        """检查买入前的余额，如果不够则从资金账户或理财赎回；notify 为 False 时资金不足不发送通知
+
+        Returns:
+            True 余额充足；False 余额不足；None 资金正在到账（后台补足或划转进行中），稍后重试
+        """
         try:
             # 计算所需买入资金
             amount_usdt = await self._calculate_order_amount('buy')
@@ -1401,106 +1522,43 @@ class GridTrader:
             if trading_usdt >= amount_usdt:
                 return True
                 
-            # 交易账户不足，先检查资金账户
-            self.logger.info(f"交易账户USDT不足，尝试从资金账户转账...")
-            
-            # 如果资金账户有余额，尝试从资金账户转到交易账户
-            if funding_usdt > 0:
-                # 计算需要转账的金额（增加5%缓冲，但不超过资金账户余额）
-                needed_from_funding = min((amount_usdt - trading_usdt) * 1.05, funding_usdt)
-                
-                if needed_from_funding >= 0.01:  # 最小转账金额
-                    self.logger.info(f"从资金账户转账 {needed_from_funding:.2f} USDT 到交易账户")
-                    try:
-                        # 使用funding_api直接转账
-                        transfer_result = await asyncio.to_thread(
-                            self.exchange.funding_api.funds_transfer,
-                            ccy='USDT',
-                            amt="{:.2f}".format(needed_from_funding),
-                            from_='6',  # 6 = 资金账户
-                            to='18',    # 18 = 交易账户（统一交易账户）
-                            type='0'    # 0 = 账户内划转
-                        )
-                        
-                        if transfer_result['code'] == '0':
-                            self.logger.info(f"资金账户→交易账户转账成功")
-                            # 清除缓存
-                            self.exchange.balance_cache = {'timestamp': 0, 'data': None}
-                            self.exchange.funding_balance_cache = {'timestamp': 0, 'data': {}}
-                            
-                            # 等待资金到账
-                            await asyncio.sleep(2)
-                            
-                            # 再次检查交易账户余额
-                            new_balance = await self.exchange.fetch_balance()
-                            if new_balance and 'free' in new_balance:
-                                trading_usdt = float(new_balance.get('free', {}).get('USDT', 0) or 0)
-                                self.logger.info(f"转账后交易账户USDT: {trading_usdt:.2f}")
-                                
-                                # 如果现在余额足够，返回成功
-                                if trading_usdt >= amount_usdt:
-                                    return True
-                        else:
-                            self.logger.warning(f"资金账户转账失败: {transfer_result['msg']}")
-                    except Exception as e:
-                        self.logger.warning(f"资金账户转账异常: {str(e)}")
-            
-            # 如果资金账户转账后仍不足，尝试从简单赚币赎回
-            self.logger.info(f"交易账户+资金账户仍不足，尝试从简单赚币赎回...")
+            # 交易账户不足，由资金规划器从资金账户和简单赚币一次性补足（合并划转，轮询确认到账）；
+            # 启用流动性管理时下单路径只用资金账户余额，需要赎回时改为后台补足，本次信号稍后重试
+            self.logger.info(f"交易账户USDT不足，从资金账户/简单赚币补足...")
+            ensured = await self.fund_planner.ensure('USDT', amount_usdt, redeem=not self.liquidity.enabled, wait=False)
+            if ensured:
+                return True
+            if ensured is None:
+                # 后台补足或再平衡正在划转USDT，不在下单路径上等待，本次信号稍后重试
+                return None
+            if self.liquidity.enabled and await self._request_liquidity('USDT', amount_usdt, trading_usdt + funding_usdt):
+                return None
+
+            # 补足失败，发送通知
             savings_balance = await self.exchange.fetch_savings_balance()
             savings_usdt = float(savings_balance.get('USDT', 0) or 0)
-            
-            self.logger.info(f"简单赚币USDT余额: {savings_usdt:.2f}")
-            
-            # 检查总余额是否足够
-            total_available = trading_usdt + savings_usdt
-            if total_available < amount_usdt:
-                # 总资金不足，发送通知
-                error_msg = f"资金不足通知\\n交易类型: 买入\\n所需USDT: {amount_usdt:.2f}\\n" \
-                           f"交易账户余额: {trading_usdt:.2f}\\n资金账户余额: {funding_usdt:.2f}\\n" \
-                           f"简单赚币余额: {savings_usdt:.2f}\\n" \
-                           f"缺口: {amount_usdt - total_available:.2f}"
-                self.logger.error(f"买入资金不足: 交易账户+资金账户+简单赚币总额不足以执行交易")
+            total_available = trading_usdt + funding_usdt + savings_usdt
+            error_msg = f"资金不足通知\\n交易类型: 买入\\n所需USDT: {amount_usdt:.2f}\\n" \
+                       f"交易账户余额: {trading_usdt:.2f}\\n资金账户余额: {funding_usdt:.2f}\\n" \
+                       f"简单赚币余额: {savings_usdt:.2f}\\n" \
+                       f"缺口: {max(amount_usdt - total_available, 0):.2f}"
+            self.logger.error(f"买入资金不足: 交易账户+资金账户+简单赚币无法补足本次交易")
+            if notify:
                 send_pushplus_message(error_msg, "资金不足警告")
-                return False
-                
-            # 计算需要赎回的金额（增加5%缓冲）
-            needed_amount = (amount_usdt - trading_usdt) * 1.05
-            
-            # 从理财赎回到交易账户
-            self.logger.info(f"从理财赎回 {needed_amount:.2f} USDT 到交易账户")
-            await self.exchange.transfer_to_spot('USDT', needed_amount)
-            
-            # 等待资金到账
-            await asyncio.sleep(5)
-            
-            # 再次检查余额
-            new_balance = await self.exchange.fetch_balance()
-            
-            # 防御性检查：确保返回的余额是有效的
-            if not new_balance or 'free' not in new_balance:
-                self.logger.error("赎回后获取交易账户余额失败，返回无效数据")
-                return False
-                
-            new_usdt = float(new_balance.get('free', {}).get('USDT', 0) or 0)
-            
-            self.logger.info(f"赎回后余额检查 | 交易账户USDT: {new_usdt:.2f}")
-            
-            if new_usdt >= amount_usdt:
-                return True
-            else:
-                error_msg = f"资金赎回后仍不足\\n交易类型: 买入\\n所需USDT: {amount_usdt:.2f}\\n交易账户余额: {new_usdt:.2f}"
-                self.logger.error(error_msg)
-                send_pushplus_message(error_msg, "资金不足警告")
-                return False
+            return False
                 
         except Exception as e:
             self.logger.error(f"检查买入余额失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
-            send_pushplus_message(f"余额检查错误\\n交易类型: 买入\\n错误信息: {str(e)}", "系统错误")
+            if notify:
+                send_pushplus_message(f"余额检查错误\\n交易类型: 买入\\n错误信息: {str(e)}", "系统错误")
             return False
             
-    async def check_sell_balance(self):
-        """检查卖出所需的余额是否足够，如果不足则尝试从资金账户或理财账户赎回"""
+    async def check_sell_balance(self, notify=True):
+        """检查卖出所需的余额是否足够，如果不足则尝试从资金账户或理财账户赎回；notify 为 False 时不发送通知
+
+        Returns:
+            True 余额充足；False 余额不足；None 资金正在到账（后台补足或划转进行中），稍后重试
+        """
         try:
             # 获取当前价格用于计算币种需求
             current_price = await self._get_latest_price()
@@ -1552,103 +1610,33 @@ class GridTrader:
                 self.logger.info(f"现货{self.symbol_info['base']}余额充足，可以卖出")
                 return True
             
-            # 现货不足，先检查资金账户（使用已获取的funding_balance）
+            # 现货不足，由资金规划器从资金账户和简单赚币一次性补足（合并划转，轮询确认到账）
+            self.logger.info(f"现货{self.symbol_info['base']}不足，从资金账户/简单赚币补足...")
+            ensured = await self.fund_planner.ensure(
+                self.symbol_info['base'], coin_needed, redeem=not self.liquidity.enabled, wait=False
+            )
+            if ensured:
+                self.logger.info(f"补足后{self.symbol_info['base']}余额充足，可以卖出")
+                return True
+            if ensured is None:
+                # 后台补足或再平衡正在划转，不在下单路径上等待，本次信号稍后重试
+                return None
+
             funding_okb = float(funding_balance.get(self.symbol_info['base'], 0) or 0)
-            self.logger.info(f"现货{self.symbol_info['base']}不足 | 资金账户{self.symbol_info['base']}余额: {funding_okb:.8f}")
-            
-            # 如果资金账户有余额，尝试从资金账户转到现货
-            if funding_okb > 0:
-                # 计算需要转账的金额（增加5%缓冲，但不超过资金账户余额）
-                needed_from_funding = min((coin_needed - spot_okb) * 1.05, funding_okb)
-                
-                if needed_from_funding >= 0.001:  # 最小转账金额
-                    self.logger.info(f"从资金账户转账 {needed_from_funding:.8f} {self.symbol_info['base']} 到现货账户")
-                    try:
-                        # 使用funding_api直接转账
-                        transfer_result = await asyncio.to_thread(
-                            self.exchange.funding_api.funds_transfer,
-                            ccy=self.symbol_info['base'],
-                            amt="{:.8f}".format(needed_from_funding),
-                            from_='6',  # 6 = 资金账户
-                            to='18',    # 18 = 现货账户
-                            type='0'    # 0 = 账户内划转
-                        )
-                        
-                        if transfer_result['code'] == '0':
-                            self.logger.info(f"资金账户→现货转账成功")
-                            # 清除缓存
-                            self.exchange.balance_cache = {'timestamp': 0, 'data': None}
-                            self.exchange.funding_balance_cache = {'timestamp': 0, 'data': {}}
-                            
-                            # 等待资金到账
-                            await asyncio.sleep(2)
-                            
-                            # 再次检查现货余额
-                            new_balance = await self.exchange.fetch_balance()
-                            if new_balance and 'free' in new_balance:
-                                spot_okb = float(new_balance.get('free', {}).get(self.symbol_info['base'], 0) or 0)
-                                self.logger.info(f"转账后现货{self.symbol_info['base']}: {spot_okb:.8f}")
-                                
-                                # 如果现在余额足够，返回成功
-                                if spot_okb >= coin_needed:
-                                    return True
-                        else:
-                            self.logger.warning(f"资金账户转账失败: {transfer_result['msg']}")
-                    except Exception as e:
-                        self.logger.warning(f"资金账户转账异常: {str(e)}")
-            
-            # 如果资金账户转账后仍不足，检查简单赚币账户
-            self.logger.info(f"现货+资金账户仍不足，尝试从简单赚币赎回...")
+            if self.liquidity.enabled and await self._request_liquidity(self.symbol_info['base'], coin_needed, spot_okb + funding_okb):
+                return None
+
+            # 补足失败，发送通知
             savings_balance = await self.exchange.fetch_savings_balance()
             savings_okb = float(savings_balance.get(self.symbol_info['base'], 0) or 0)
-            
-            self.logger.info(f"简单赚币{self.symbol_info['base']}余额: {savings_okb:.8f}")
-            
-            # 检查总余额是否足够
-            total_available = spot_okb + savings_okb
-            if total_available < coin_needed:
-                # 发送资金不足通知
-                error_msg = f"资金不足通知\\n交易类型: 卖出\\n所需{self.symbol_info['base']}: {coin_needed:.8f}\\n" \
-                           f"现货余额: {spot_okb:.8f}\\n资金账户余额: {funding_okb:.8f}\\n" \
-                           f"简单赚币余额: {savings_okb:.8f}\\n" \
-                           f"缺口: {coin_needed - total_available:.8f}"
+            total_available = spot_okb + funding_okb + savings_okb
+            error_msg = f"资金不足通知\\n交易类型: 卖出\\n所需{self.symbol_info['base']}: {coin_needed:.8f}\\n" \
+                       f"现货余额: {spot_okb:.8f}\\n资金账户余额: {funding_okb:.8f}\\n" \
+                       f"简单赚币余额: {savings_okb:.8f}\\n" \
+                       f"缺口: {max(coin_needed - total_available, 0):.8f}"
+            if notify:
                 send_pushplus_message(error_msg, "余额不足")
-                return False
-            
-            # 计算需要从简单赚币赎回的数量，考虑手续费和划转最低限额
-            needed_amount = min(
-                coin_needed - spot_okb,  # 实际需要的差额
-                savings_okb  # 不能超过简单赚币账户可用余额
-            )
-            
-            if needed_amount <= 0:
-                self.logger.warning(f"赎回计算错误: {needed_amount}")
-                return False
-            
-            # 尝试从简单赚币赎回
-            try:
-                self.logger.info(f"从简单赚币赎回 {needed_amount:.8f} {self.symbol_info['base']}")
-                await self.exchange.transfer_to_spot(self.symbol_info['base'], needed_amount)
-                
-                # 等待短暂时间让划转生效
-                await asyncio.sleep(1.5)
-                
-                # 重新检查余额
-                new_balance = await self.exchange.fetch_balance()
-                new_okb = float(new_balance.get('free', {}).get(self.symbol_info['base'], 0) or 0)
-                
-                self.logger.info(f"赎回后余额检查 | 现货{self.symbol_info['base']}: {new_okb:.8f}")
-                
-                if new_okb >= coin_needed:
-                    self.logger.info(f"赎回后{self.symbol_info['base']}余额充足，可以卖出")
-                    return True
-                else:
-                    error_msg = f"资金赎回后仍不足\\n交易类型: 卖出\\n所需{self.symbol_info['base']}: {coin_needed:.8f}\\n现货余额: {new_okb:.8f}"
-                    send_pushplus_message(error_msg, "余额不足")
-                    return False
-            except Exception as e:
-                self.logger.error(f"从简单赚币赎回{self.symbol_info['base']}失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
-                return False
+            return False
         except Exception as e:
             self.logger.error(f"检查卖出余额失败: {str(e)} | 堆栈信息: {traceback.format_exc()}")
             return False
@@ -0,0 +1,52 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class TriggerIndex:
+    """触发价索引
+
+    每个交易对的全部触发价按升序存放在 array('d') 中，只在生成参数（如基准价、
+    网格大小）变化时重建。每次行情只需二分查找即可找出上一次价格到本次价格之间
+    跨越的所有档位，或离当前价最近的档位，单次查询代价 O(log n)，与档位数和
+    交易对数量无关。
+    """
+
+    def __init__(self):
+        self._prices = {}
+        self._tags = {}
+        self._keys = {}
+
+    def rebuild(self, symbol, key, levels):
+        """按 key 判断是否需要重建，levels 为 (价格, 标签) 的可迭代对象；返回是否重建"""
+        if self._keys.get(symbol) == key:
+            return False
+        pairs = sorted(levels, key=lambda level: level[0])
+        self._prices[symbol] = array('d', (price for price, _ in pairs))
+        self._tags[symbol] = [tag for _, tag in pairs]
+        self._keys[symbol] = key
+        return True
+
+    def levels(self, symbol):
+        return list(zip(self._prices.get(symbol, ()), self._tags.get(symbol, ())))
+
+    def crossed(self, symbol, prev_price, price):
+        """返回从 prev_price 移动到 price 时跨越（含到达）的档位，按经过的先后顺序排列"""
+        prices = self._prices.get(symbol)
+        if not prices or prev_price is None or price == prev_price:
+            return []
+        tags = self._tags[symbol]
+        if price > prev_price:
+            lo, hi = bisect_right(prices, prev_price), bisect_right(prices, price)
+            return list(zip(prices[lo:hi], tags[lo:hi]))
+        lo, hi = bisect_left(prices, price), bisect_left(prices, prev_price)
+        return list(zip(prices[lo:hi], tags[lo:hi]))[::-1]
+
+    def nearest(self, symbol, price):
+        """离 price 最近的档位 (价格, 标签)，没有档位时返回 None"""
+        prices = self._prices.get(symbol)
+        if not prices:
+            return None
+        index = bisect_left(prices, price)
+        if index == len(prices) or (index > 0 and price - prices[index - 1] <= prices[index] - price):
+            index -= 1
+        return prices[index], self._tags[symbol][index]
@@ -8,6 +8,13 @@ import psutil
 import secrets
 from aiohttp_session import setup, get_session
 from aiohttp_session.cookie_storage import EncryptedCookieStorage
+from metrics import REGISTRY
+from speedups import json_response
+from profiler import SamplingProfiler, ProfilerBusyError
+import trade_export
+from trade_store import decode_cursor
+import tempfile
+import asyncio
 
 class IPLogger:
     def __init__(self):
@@ -40,6 +47,65 @@ class IPLogger:
     def get_records(self):
         return self.ip_records
 
+class TraderSource:
+    """内嵌模式的面板数据来源：直接读取交易进程中的 trader
+
+    cached=True 时状态只取内存中的数据（最新价、缓存的余额、账本与注册表快照），
+    不发起任何交易所请求，用于独立面板模式下的定期发布。
+    """
+
+    def __init__(self, trader, cached=False):
+        self.trader = trader
+        self.cached = cached
+        self.symbol = trader.symbol
+        self.base_symbol = trader.base_symbol
+        self.trade_store = trader.order_tracker.trade_store
+        self.trade_files = trader.order_tracker  # trade_export.iter_trades 读取归档与当前交易历史
+
+    def log_end(self):
+        return None
+
+    async def status(self):
+        return await collect_status(self.trader, cached=self.cached)
+
+    async def latency(self):
+        return {
+            **self.trader.latency_monitor.snapshot(),
+            'cadence': self.trader.cadence.snapshot(),
+            'clock': self.trader.exchange.clock.snapshot(),
+            'order_book_push': self.trader.order_book_feed.push_latency.snapshot()
+        }
+
+    async def housekeeping(self):
+        return {'risk_triggered': self.trader.risk_triggered, 'jobs': self.trader.housekeeping.snapshot()}
+
+    async def failover(self):
+        if self.trader.failover is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.trader.failover.snapshot()}
+
+    async def metrics(self):
+        return REGISTRY.render()
+
+    async def snapshot(self):
+        """全部面板数据，供独立面板进程使用"""
+        log_path = os.path.join(LogConfig.LOG_DIR, 'trading_system.log')
+        try:
+            status = await self.status()
+        except Exception as e:
+            logging.error(f"获取状态数据失败: {str(e)}", exc_info=True)
+            status = {'error': str(e)}
+        return {
+            'symbol': self.symbol,
+            'base_symbol': self.base_symbol,
+            'status': status,
+            'latency': await self.latency(),
+            'housekeeping': await self.housekeeping(),
+            'failover': await self.failover(),
+            'metrics': await self.metrics(),
+            'log': {'size': os.path.getsize(log_path) if os.path.exists(log_path) else 0}
+        }
+
 def get_system_stats():
     """获取系统资源使用情况"""
     cpu_percent = psutil.cpu_percent(interval=1)
@@ -53,17 +119,27 @@ def get_system_stats():
         'memory_percent': memory.percent
     }
 
-async def _read_log_content():
-    """公共的日志读取函数"""
+async def _read_log_content(end=None, tail_bytes=256 * 1024):
+    """公共的日志读取函数：只读取文件末尾 tail_bytes 字节
+
+    Args:
+        end: 读取到的文件偏移（独立面板进程使用交易进程发布的日志大小），None 表示读到文件末尾
+    """
     log_path = os.path.join(LogConfig.LOG_DIR, 'trading_system.log')
     if not os.path.exists(log_path):
         return None
         
-    async with aiofiles.open(log_path, mode='r', encoding='utf-8') as f:
-        content = await f.read()
+    async with aiofiles.open(log_path, mode='rb') as f:
+        size = await f.seek(0, os.SEEK_END)
+        end = size if end is None else min(end, size)
+        start = max(0, end - tail_bytes)
+        await f.seek(start)
+        data = await f.read(end - start)
         
-    # 将日志按行分割
-    lines = content.strip().split('\n')
+    # 将日志按行分割（从中间开始读时第一行可能不完整，丢弃）
+    lines = data.decode('utf-8', errors='replace').strip().split('\n')
+    if start > 0:
+        lines = lines[1:]
     
     # 过滤掉包含 [httpx] INFO: HTTP Request: GET 的行
     filtered_lines = [line for line in lines if '[httpx] INFO: HTTP Request: GET' not in line]
@@ -147,12 +223,12 @@ async def handle_login(request):
         if password == correct_password:
             session = await get_session(request)
             session['authenticated'] = True
-            return web.json_response({'success': True})
+            return json_response({'success': True})
         else:
-            return web.json_response({'success': False, 'error': '密码错误'})
+            return json_response({'success': False, 'error': '密码错误'})
     except Exception as e:
         logging.error(f"登录处理失败: {str(e)}")
-        return web.json_response({'success': False, 'error': str(e)}, status=500)
+        return json_response({'success': False, 'error': str(e)}, status=500)
 
 async def handle_logout(request):
     """处理登出请求"""
@@ -174,11 +250,17 @@ async def auth_middleware(request, handler):
     if request.path in public_paths:
         return await handler(request)
     
+    # Prometheus 抓取无法登录，配置了 METRICS_TOKEN 时可用 Bearer Token 访问 /metrics
+    metrics_token = os.getenv('METRICS_TOKEN', '')
+    if request.path == '/metrics' and metrics_token:
+        if secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {metrics_token}'):
+            return await handler(request)
+    
     # 检查会话
     session = await get_session(request)
     if not session.get('authenticated'):
         if request.path.startswith('/api/'):
-            return web.json_response({'error': '未授权'}, status=401)
+            return json_response({'error': '未授权'}, status=401)
         else:
             return web.Response(status=302, headers={'Location': '/'})
     
@@ -190,11 +272,12 @@ async def handle_log(request):
         ip = request.remote
         request.app['ip_logger'].add_record(ip, request.path)
         
-        # 获取系统资源状态
-        system_stats = get_system_stats()
+        # 获取系统资源状态（cpu_percent 会阻塞1秒，放到线程中）
+        system_stats = await asyncio.to_thread(get_system_stats)
+        source = request.app['source']
         
         # 读取日志内容
-        content = await _read_log_content()
+        content = await _read_log_content(source.log_end())
         if content is None:
             return web.Response(text="日志文件不存在", status=404)
             
@@ -246,7 +329,7 @@ async def handle_log(request):
                         <div class="space-y-2">
                             <div class="flex justify-between">
                                 <span>交易对</span>
-                                <span class="status-value">{request.app['trader'].symbol}</span>
+                                <span class="status-value">{source.symbol}</span>
                             </div>
                             <div class="flex justify-between">
                                 <span>基准价格</span>
@@ -309,7 +392,7 @@ async def handle_log(request):
                                 <span class="status-value" id="usdt-balance">--</span>
                             </div>
                             <div class="flex justify-between">
-                                <span>{request.app['trader'].base_symbol}余额</span>
+                                <span>{source.base_symbol}余额</span>
                                 <span class="status-value" id="okb-balance">--</span>
                             </div>
                             <div class="flex justify-between">
@@ -342,6 +425,12 @@ async def handle_log(request):
                     </div>
                 </div>
 
+                <!-- 交易所接口熔断 -->
+                <div class="card mb-8">
+                    <h2 class="text-lg font-semibold mb-4">接口熔断</h2>
+                    <div class="space-y-2" id="circuit-status">--</div>
+                </div>
+
                 <!-- 最近交易记录 -->
                 <div class="card mt-4 mb-8">
                     <h2 class="text-lg font-semibold mb-4">最近交易</h2>
@@ -469,6 +558,17 @@ async def handle_log(request):
                             </tr>
                         `; }}).join('');
                         
+                        // 更新接口熔断状态：只列出未关闭的熔断器
+                        const circuits = Object.entries(data.circuits || {{}}).filter(function(entry) {{ return entry[1].state !== 'closed'; }});
+                        document.querySelector('#circuit-status').innerHTML = circuits.length ? circuits.map(function(entry) {{ return `
+                            <div class="flex justify-between">
+                                <span>${{entry[0]}}</span>
+                                <span class="status-value loss">
+                                    ${{entry[1].state === 'open' ? '熔断中' : '半开探测'}}${{entry[1].retry_after != null ? ' (' + entry[1].retry_after + '秒)' : ''}}
+                                </span>
+                            </div>
+                        `; }}).join('') : '<div class="text-gray-500">全部接口正常</div>';
+                        
                         // 更新目标委托金额
                         document.querySelector('#target-order-amount').textContent = 
                             data.target_order_amount ? data.target_order_amount.toFixed(2) + ' USDT' : '--';
@@ -499,110 +599,261 @@ async def handle_log(request):
     except Exception as e:
         return web.Response(text=f"Error: {str(e)}", status=500)
 
-async def handle_status(request):
-    """处理状态API请求"""
-    try:
-        trader = request.app['trader']
-        s1_controller = trader.position_controller_s1 # 获取 S1 控制器实例
+async def collect_status(trader, cached=False):
+    """汇总状态面板数据；cached=True 时只读内存中的最新价和缓存数据，不请求交易所"""
+    s1_controller = trader.position_controller_s1 # 获取 S1 控制器实例
 
-        # 获取交易所数据
+    # 获取交易所数据
+    if cached:
+        balance = trader.exchange.balance_cache['data'] or {'total': {}}
+        current_price = trader.current_price or 0
+    else:
         balance = await trader.exchange.fetch_balance()
         current_price = await trader._get_latest_price() or 0 # 提供默认值以防失败
-        
-        # 获取理财账户余额
-        funding_balance = await trader.exchange.fetch_funding_balance()
-        
-        # 获取网格参数
-        grid_size = trader.grid_size
-        grid_size_decimal = grid_size / 100 if grid_size else 0
-        threshold = grid_size_decimal / 5
-        
-        # ---> 新增：计算网格上下轨 <---
-        # 确保 trader.base_price 和 trader.grid_size 是有效的
-        upper_band = None
-        lower_band = None
-        if trader.base_price is not None and trader.grid_size is not None:
-             try:
-                 # 调用 trader.py 中已有的方法
-                 upper_band = trader._get_upper_band()
-                 lower_band = trader._get_lower_band()
-             except Exception as band_e:
-                 logging.warning(f"计算网格上下轨失败: {band_e}")
-        
-        
-        # 计算总资产
-        coin_balance = float(balance['total'].get(trader.symbol_info['base'], 0))
-        usdt_balance = float(balance['total'].get('USDT', 0))
-        total_assets = usdt_balance + (coin_balance * current_price)
-        
-        # 计算总盈亏和盈亏率
-        initial_principal = trader.config.INITIAL_PRINCIPAL
-        total_profit = 0.0
-        profit_rate = 0.0
-        if initial_principal > 0:
-            total_profit = total_assets - initial_principal
-            profit_rate = (total_profit / initial_principal) * 100
-        else:
-            logging.warning("初始本金未设置或为0，无法计算盈亏率")
-        
-        # 获取最近交易信息
-        last_trade_price = trader.last_trade_price
-        last_trade_time = trader.last_trade_time
-        last_trade_time_str = datetime.fromtimestamp(last_trade_time).strftime('%Y-%m-%d %H:%M:%S') if last_trade_time else '--'
-        
-        # 获取交易历史
-        trade_history = []
-        if hasattr(trader, 'order_tracker'):
-            trades = trader.order_tracker.get_trade_history()
-            trade_history = [{
-                'timestamp': datetime.fromtimestamp(trade['timestamp']).strftime('%Y-%m-%d %H:%M:%S'),
-                'side': trade.get('side', '--'),
-                'price': trade.get('price', 0),
-                'amount': trade.get('amount', 0),
-                'profit': trade.get('profit', 0)
-            } for trade in trades[-10:]]  # 只取最近10笔交易
-        
+    
+    # 获取网格参数
+    grid_size = trader.grid_size
+    grid_size_decimal = grid_size / 100 if grid_size else 0
+    threshold = grid_size_decimal / 5
+    
+    # ---> 新增：计算网格上下轨 <---
+    # 确保 trader.base_price 和 trader.grid_size 是有效的
+    upper_band = None
+    lower_band = None
+    if trader.base_price is not None and trader.grid_size is not None:
+         try:
+             # 调用 trader.py 中已有的方法
+             upper_band = trader._get_upper_band()
+             lower_band = trader._get_lower_band()
+         except Exception as band_e:
+             logging.warning(f"计算网格上下轨失败: {band_e}")
+    
+    
+    # 计算总资产
+    coin_balance = float(balance['total'].get(trader.symbol_info['base'], 0))
+    usdt_balance = float(balance['total'].get('USDT', 0))
+    total_assets = usdt_balance + (coin_balance * current_price)
+    
+    # 计算总盈亏和盈亏率
+    initial_principal = trader.config.INITIAL_PRINCIPAL
+    total_profit = 0.0
+    profit_rate = 0.0
+    if initial_principal > 0:
+        total_profit = total_assets - initial_principal
+        profit_rate = (total_profit / initial_principal) * 100
+    else:
+        logging.warning("初始本金未设置或为0，无法计算盈亏率")
+    
+    # 获取最近交易信息
+    last_trade_price = trader.last_trade_price
+    last_trade_time = trader.last_trade_time
+    last_trade_time_str = datetime.fromtimestamp(last_trade_time).strftime('%Y-%m-%d %H:%M:%S') if last_trade_time else '--'
+    
+    # 获取交易历史（只取最近10笔，完整历史通过 /api/trades 分页查询）
+    trade_history = []
+    if hasattr(trader, 'order_tracker'):
+        trade_history = trader.order_tracker.recent_trades(10)
+    
+    if cached:
+        # 目标委托金额和仓位比例取最近一次计算的结果
+        target_order_amount = getattr(trader, 'order_amount_target', 0)
+        position_ratio = trader.risk_manager.position_ratio or 0
+    else:
         # 计算目标委托金额 (总资产的10%)
         target_order_amount = await trader._calculate_order_amount('buy') # buy/sell 结果一样
         
         # 获取仓位百分比 - 使用风控管理器的方法获取最准确的仓位比例
         position_ratio = await trader.risk_manager._get_position_ratio()
-        position_percentage = position_ratio * 100
-        
-        # 获取 S1 高低价
-        s1_high = s1_controller.s1_daily_high if s1_controller else None
-        s1_low = s1_controller.s1_daily_low if s1_controller else None
-        
-        # 构建响应数据
-        status = {
-            "base_price": trader.base_price,
-            "current_price": current_price,
-            "grid_size": grid_size_decimal,
-            "threshold": threshold,
-            "total_assets": total_assets,
-            "usdt_balance": usdt_balance,
-            "coin_balance": coin_balance,
-            "target_order_amount": target_order_amount,
-            "trade_history": trade_history or [],
-            "last_trade_price": last_trade_price,
-            "last_trade_time": last_trade_time,
-            "last_trade_time_str": last_trade_time_str,
-            "total_profit": total_profit,
-            "profit_rate": profit_rate,
-            "s1_daily_high": s1_high,
-            "s1_daily_low": s1_low,
-            "position_percentage": position_percentage,
-            # ---> 新增：添加上下轨到响应数据 <---
-            "grid_upper_band": upper_band,
-            "grid_lower_band": lower_band
-        }
-        
-        return web.json_response(status)
+    position_percentage = position_ratio * 100
+    
+    # 获取 S1 高低价
+    s1_high = s1_controller.s1_daily_high if s1_controller else None
+    s1_low = s1_controller.s1_daily_low if s1_controller else None
+    
+    # 构建响应数据
+    status = {
+        "base_price": trader.base_price,
+        "current_price": current_price,
+        "grid_size": grid_size_decimal,
+        "threshold": threshold,
+        "total_assets": total_assets,
+        "usdt_balance": usdt_balance,
+        "coin_balance": coin_balance,
+        "target_order_amount": target_order_amount,
+        "trade_history": trade_history or [],
+        "last_trade_price": last_trade_price,
+        "last_trade_time": last_trade_time,
+        "last_trade_time_str": last_trade_time_str,
+        "total_profit": total_profit,
+        "profit_rate": profit_rate,
+        "s1_daily_high": s1_high,
+        "s1_daily_low": s1_low,
+        "position_percentage": position_percentage,
+        # ---> 新增：添加上下轨到响应数据 <---
+        "grid_upper_band": upper_band,
+        "grid_lower_band": lower_band,
+        # 批次匹配盈亏账本：已实现/未实现盈亏、持仓成本、手续费
+        "pnl": trader.order_tracker.pnl_ledger.snapshot(current_price),
+        # 流动性储备：预测的两侧成交笔数与现货储备
+        "liquidity": trader.liquidity.snapshot(),
+        # 交易所接口熔断状态
+        "circuits": trader.exchange.circuits.snapshot()
+    }
+    
+    return status
+
+async def handle_status(request):
+    """处理状态API请求"""
+    try:
+        return json_response(await request.app['source'].status())
     except Exception as e:
         logging.error(f"获取状态数据失败: {str(e)}", exc_info=True)
-        return web.json_response({"error": str(e)}, status=500)
+        return json_response({"error": str(e)}, status=500)
 
-async def start_web_server(trader):
+async def handle_latency(request):
+    """返回事件循环延迟、交易链路耗时直方图和主循环节奏统计"""
+    try:
+        return json_response(await request.app['source'].latency())
+    except Exception as e:
+        logging.error(f"获取延迟数据失败: {str(e)}", exc_info=True)
+        return json_response({"error": str(e)}, status=500)
+
+async def handle_housekeeping(request):
+    """返回各例行任务的运行状态"""
+    try:
+        return json_response(await request.app['source'].housekeeping())
+    except Exception as e:
+        logging.error(f"获取例行任务状态失败: {str(e)}", exc_info=True)
+        return json_response({"error": str(e)}, status=500)
+
+async def handle_failover(request):
+    """返回主备模式的角色与租约状态"""
+    try:
+        return json_response(await request.app['source'].failover())
+    except Exception as e:
+        logging.error(f"获取主备状态失败: {str(e)}", exc_info=True)
+        return json_response({"error": str(e)}, status=500)
+
+async def handle_metrics(request):
+    """Prometheus 文本格式的指标导出"""
+    return web.Response(
+        text=await request.app['source'].metrics(),
+        content_type='text/plain',
+        headers={'X-Content-Type-Options': 'nosniff'},
+        charset='utf-8'
+    )
+
+async def handle_profile(request):
+    """按需启动采样分析，返回折叠栈格式（可用 flamegraph.pl 或 speedscope 打开）
+
+    仅在设置了 WEB_PASSWORD 时开放（会话认证由 auth_middleware 完成），
+    采样在线程中进行，不影响交易循环。
+    """
+    if not os.getenv('WEB_PASSWORD', ''):
+        return json_response({'error': '未设置WEB_PASSWORD，管理接口已禁用'}, status=403)
+    try:
+        seconds = float(request.query.get('seconds', 10))
+    except ValueError:
+        return json_response({'error': 'seconds 参数无效'}, status=400)
+    profiler = request.app['profiler']
+    try:
+        logging.info(f"开始采样分析 | 时长: {seconds}s | 来源: {request.remote}")
+        collapsed = await asyncio.to_thread(profiler.profile, seconds)
+    except ProfilerBusyError as e:
+        return json_response({'error': str(e)}, status=409)
+    except Exception as e:
+        logging.error(f"采样分析失败: {str(e)}", exc_info=True)
+        return json_response({"error": str(e)}, status=500)
+    filename = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.collapsed"
+    return web.Response(
+        text=collapsed,
+        content_type='text/plain',
+        charset='utf-8',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+async def handle_trades(request):
+    """分页查询交易记录（键集分页），可选按日汇总
+
+    参数: limit（默认50，最大500）、before/after（上一页返回的 next/prev 游标）、
+    side=buy|sell、start/end（Unix 秒或 YYYY-MM-DD）、aggregate=daily
+    """
+    try:
+        limit = min(max(int(request.query.get('limit', 50)), 1), 500)
+        start = trade_export.parse_time(request.query.get('start'))
+        end = trade_export.parse_time(request.query.get('end'))
+        before = request.query.get('before') or None
+        after = request.query.get('after') or None
+        for cursor in (before, after):
+            if cursor is not None:
+                decode_cursor(cursor)
+    except ValueError as e:
+        return json_response({'error': f'参数无效: {str(e)}'}, status=400)
+    side = request.query.get('side') or None
+    store = request.app['source'].trade_store
+    try:
+        if request.query.get('aggregate') == 'daily':
+            return json_response({'daily': await asyncio.to_thread(store.daily, side, start, end)})
+        page = await asyncio.to_thread(store.page, limit, before, after, side, start, end)
+        return json_response(page)
+    except Exception as e:
+        logging.error(f"查询交易记录失败: {str(e)}", exc_info=True)
+        return json_response({"error": str(e)}, status=500)
+
+async def handle_trades_export(request):
+    """流式导出交易记录（含月度归档），分块传输，服务端内存占用与记录总数无关
+
+    参数: format=csv|ndjson|columnar|parquet, start/end（Unix 秒或 YYYY-MM-DD）, side=buy|sell
+    """
+    fmt = request.query.get('format', 'csv')
+    if fmt not in trade_export.FORMATS:
+        return json_response({'error': f'format 仅支持 {", ".join(trade_export.FORMATS)}'}, status=400)
+    if fmt == 'parquet' and trade_export.pq is None:
+        return json_response({'error': '服务器未安装 pyarrow，无法导出 Parquet'}, status=501)
+    try:
+        start = trade_export.parse_time(request.query.get('start'))
+        end = trade_export.parse_time(request.query.get('end'))
+    except ValueError as e:
+        return json_response({'error': str(e)}, status=400)
+    side = request.query.get('side') or None
+    trades = trade_export.iter_trades(request.app['source'].trade_files, start, end, side)
+    content_type, extension = trade_export.FORMATS[fmt]
+    filename = f"trades_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    response = web.StreamResponse(headers={
+        'Content-Type': content_type,
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    })
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    try:
+        if fmt == 'parquet':
+            # Parquet 的元数据写在文件末尾，先在线程中写入临时文件再分块发送
+            fd, tmp_path = tempfile.mkstemp(suffix='.parquet')
+            os.close(fd)
+            try:
+                await asyncio.to_thread(trade_export.write_parquet, trades, tmp_path)
+                async with aiofiles.open(tmp_path, 'rb') as f:
+                    while chunk := await f.read(65536):
+                        await response.write(chunk)
+            finally:
+                os.remove(tmp_path)
+        else:
+            # 读归档文件和编码在线程中进行，每次取一个数据块
+            chunks = trade_export.export_chunks(trades, fmt)
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                await response.write(chunk)
+    except Exception as e:
+        logging.error(f"导出交易记录失败: {str(e)}", exc_info=True)
+    await response.write_eof()
+    return response
+
+def create_app(source, profiler=None):
+    """创建Web应用
+
+    Args:
+        source: 面板数据来源，内嵌模式为 TraderSource，独立面板进程为 dashboard.SharedStateSource
+        profiler: 采样分析器，只在交易进程内嵌运行时提供（采样的是当前进程）
+    """
     # 生成密钥用于加密cookie (32字节)
     secret_key = secrets.token_bytes(32)
     
@@ -617,13 +868,13 @@ async def start_web_server(trader):
         try:
             return await handler(request)
         except web.HTTPException as ex:
-            return web.json_response(
+            return json_response(
                 {"error": str(ex)},
                 status=ex.status,
                 headers={'Access-Control-Allow-Origin': '*'}
             )
         except Exception as e:
-            return web.json_response(
+            return json_response(
                 {"error": "Internal Server Error"},
                 status=500,
                 headers={'Access-Control-Allow-Origin': '*'}
@@ -632,8 +883,9 @@ async def start_web_server(trader):
     app.middlewares.append(error_middleware)
     app.middlewares.append(auth_middleware)
     
-    app['trader'] = trader
+    app['source'] = source
     app['ip_logger'] = IPLogger()
+    app['profiler'] = profiler
     
     # 禁用访问日志
     logging.getLogger('aiohttp.access').setLevel(logging.WARNING)
@@ -653,21 +905,51 @@ async def start_web_server(trader):
     app.router.add_get('/dashboard', handle_log)
     app.router.add_get('/api/logs', handle_log_content)
     app.router.add_get('/api/status', handle_status)
+    app.router.add_get('/api/latency', handle_latency)
+    app.router.add_get('/api/housekeeping', handle_housekeeping)
+    app.router.add_get('/api/failover', handle_failover)
+    app.router.add_get('/api/trades', handle_trades)
+    app.router.add_get('/api/trades/export', handle_trades_export)
+    app.router.add_get('/metrics', handle_metrics)
+    if profiler is not None:
+        app.router.add_get('/api/admin/profile', handle_profile)
+    return app
+
+async def start_site(app, port=58181):
     runner = web.AppRunner(app)
     await runner.setup()
-    site = web.TCPSite(runner, '0.0.0.0', 58181)
+    site = web.TCPSite(runner, '0.0.0.0', port)
     await site.start()
 
     # 打印访问地址
     local_ip = "localhost"  # 或者使用实际IP
     logging.info(f"Web服务已启动:")
-    logging.info(f"- 本地访问: http://{local_ip}:58181")
-    logging.info(f"- 局域网访问: http://0.0.0.0:58181")
+    logging.info(f"- 本地访问: http://{local_ip}:{port}")
+    logging.info(f"- 局域网访问: http://0.0.0.0:{port}")
+    return runner
+
+async def start_web_server(trader):
+    """内嵌模式：Web服务与交易循环运行在同一事件循环中"""
+    app = create_app(TraderSource(trader), SamplingProfiler(**trader.config.PROFILER_PARAMS))
+    await start_site(app)
+
+async def publish_state(trader, writer, interval=2.0):
+    """独立面板模式：按固定周期把面板数据写入共享内存，面板进程的访问量不影响交易进程
+
+    发布的数据只取内存状态，不请求交易所，不占用 REST 配额。
+    """
+    source = TraderSource(trader, cached=True)
+    while True:
+        try:
+            writer.publish(await source.snapshot())
+        except Exception as e:
+            logging.error(f"发布面板状态失败: {str(e)}", exc_info=True)
+        await asyncio.sleep(interval)
 
 async def handle_log_content(request):
     """只返回日志内容的API端点"""
     try:
-        content = await _read_log_content()
+        content = await _read_log_content(request.app['source'].log_end())
         if content is None:
             return web.Response(text="", status=404)
             